@@ -0,0 +1,26 @@
+"""Conversation rolling summary for token-budgeted chat history
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("conversations", sa.Column("summary", sa.Text))
+    op.add_column(
+        "conversations",
+        sa.Column("summary_message_count", sa.Integer, nullable=False, server_default="0"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("conversations", "summary_message_count")
+    op.drop_column("conversations", "summary")
@@ -0,0 +1,77 @@
+"""Append-only conversation_messages table with denormalized message_count
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-17
+
+Backfills conversation_messages from conversations.messages (JSONB) and then
+empties the legacy array so it no longer churns TOAST storage.
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "conversation_messages",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("conversation_id", UUID(as_uuid=True), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("seq", sa.Integer, nullable=False),
+        sa.Column("role", sa.String(20), nullable=False),
+        sa.Column("content", sa.Text, nullable=False),
+        sa.Column("created_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("NOW()")),
+    )
+    op.create_index(
+        "ix_conversation_messages_conv_seq", "conversation_messages",
+        ["conversation_id", "seq"], unique=True,
+    )
+    op.add_column(
+        "conversations",
+        sa.Column("message_count", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.create_index("ix_conversations_user_updated", "conversations", ["user_id", "updated_at"])
+
+    # Backfill
+    op.execute("""
+        INSERT INTO conversation_messages (conversation_id, seq, role, content, created_at)
+        SELECT c.id,
+               m.ord - 1,
+               COALESCE(m.value->>'role', 'user'),
+               COALESCE(m.value->>'content', ''),
+               COALESCE((m.value->>'timestamp')::timestamptz, c.updated_at, NOW())
+        FROM conversations c
+        CROSS JOIN LATERAL jsonb_array_elements(c.messages) WITH ORDINALITY AS m(value, ord)
+    """)
+    op.execute("""
+        UPDATE conversations
+        SET message_count = jsonb_array_length(messages),
+            messages = '[]'::jsonb
+        WHERE jsonb_array_length(messages) > 0
+    """)
+
+
+def downgrade() -> None:
+    op.execute("""
+        UPDATE conversations c
+        SET messages = agg.messages
+        FROM (
+            SELECT conversation_id,
+                   jsonb_agg(
+                       jsonb_build_object('role', role, 'content', content, 'timestamp', created_at)
+                       ORDER BY seq
+                   ) AS messages
+            FROM conversation_messages
+            GROUP BY conversation_id
+        ) agg
+        WHERE c.id = agg.conversation_id
+    """)
+    op.drop_index("ix_conversations_user_updated", table_name="conversations")
+    op.drop_column("conversations", "message_count")
+    op.drop_index("ix_conversation_messages_conv_seq", table_name="conversation_messages")
+    op.drop_table("conversation_messages")
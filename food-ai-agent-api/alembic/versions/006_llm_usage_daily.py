@@ -0,0 +1,43 @@
+"""Daily LLM/embedding token and cost rollups per site, agent and model
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "llm_usage_daily",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True, server_default=sa.text("gen_random_uuid()")),
+        sa.Column("usage_date", sa.Date, nullable=False),
+        sa.Column("site_id", UUID(as_uuid=True), nullable=False),
+        sa.Column("agent", sa.String(30), nullable=False),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("requests", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("input_tokens", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("output_tokens", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("cache_creation_input_tokens", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("cache_read_input_tokens", sa.BigInteger, nullable=False, server_default="0"),
+        sa.Column("cost_usd", sa.Numeric(12, 6), nullable=False, server_default="0"),
+        sa.Column("updated_at", sa.TIMESTAMP(timezone=True), server_default=sa.text("NOW()")),
+    )
+    op.create_index(
+        "ix_llm_usage_daily_key", "llm_usage_daily",
+        ["usage_date", "site_id", "agent", "model"], unique=True,
+    )
+    op.create_index("ix_llm_usage_daily_site_date", "llm_usage_daily", ["site_id", "usage_date"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_llm_usage_daily_site_date", table_name="llm_usage_daily")
+    op.drop_index("ix_llm_usage_daily_key", table_name="llm_usage_daily")
+    op.drop_table("llm_usage_daily")
@@ -0,0 +1,32 @@
+"""HNSW index on recipe_documents.embedding for cosine-distance search
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+from app.config import settings
+
+revision = "007"
+down_revision = "006"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_recipe_documents_embedding_hnsw"
+
+
+def upgrade() -> None:
+    # vector_cosine_ops matches the retriever's `<=>` ordering. Built
+    # concurrently so document uploads keep working during the build.
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            f"ON recipe_documents USING hnsw (embedding vector_cosine_ops) "
+            f"WITH (m = {int(settings.rag_hnsw_m)}, ef_construction = {int(settings.rag_hnsw_ef_construction)})"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
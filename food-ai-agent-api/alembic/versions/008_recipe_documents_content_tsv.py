@@ -0,0 +1,34 @@
+"""Stored tsvector column with GIN index for keyword search on recipe_documents
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+INDEX_NAME = "ix_recipe_documents_content_tsv"
+
+
+def upgrade() -> None:
+    # A stored generated column is computed for every existing row when it is
+    # added (the backfill) and kept in sync by PostgreSQL on insert/update.
+    op.execute(
+        "ALTER TABLE recipe_documents ADD COLUMN content_tsv tsvector "
+        "GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} "
+            f"ON recipe_documents USING gin (content_tsv)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {INDEX_NAME}")
+    op.execute("ALTER TABLE recipe_documents DROP COLUMN content_tsv")
@@ -0,0 +1,63 @@
+"""Document grouping key and chunk_index indexes for adjacent-chunk lookups
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("recipe_documents", sa.Column("document_id", UUID(as_uuid=True)))
+
+    # Backfill: recipe chunks are re-indexed per (recipe_id, doc_type), so that
+    # pair is one document. Standalone chunks of one upload share doc_type,
+    # title, source file and created_at (NOW() of the ingest transaction).
+    op.execute("""
+        UPDATE recipe_documents d
+        SET document_id = g.document_id
+        FROM (
+            SELECT recipe_id, doc_type, title, metadata->>'source_file' AS source_file, created_at,
+                   gen_random_uuid() AS document_id
+            FROM recipe_documents
+            WHERE recipe_id IS NULL
+            GROUP BY recipe_id, doc_type, title, metadata->>'source_file', created_at
+            UNION ALL
+            SELECT recipe_id, doc_type, NULL, NULL, NULL, gen_random_uuid()
+            FROM recipe_documents
+            WHERE recipe_id IS NOT NULL
+            GROUP BY recipe_id, doc_type
+        ) g
+        WHERE d.doc_type = g.doc_type
+          AND (
+              (d.recipe_id IS NOT NULL AND d.recipe_id = g.recipe_id)
+              OR (d.recipe_id IS NULL AND g.recipe_id IS NULL
+                  AND d.title = g.title
+                  AND (d.metadata->>'source_file') IS NOT DISTINCT FROM g.source_file
+                  AND d.created_at IS NOT DISTINCT FROM g.created_at)
+          )
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipe_documents_recipe_chunk "
+            "ON recipe_documents (recipe_id, doc_type, chunk_index)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_recipe_documents_document_chunk "
+            "ON recipe_documents (document_id, chunk_index)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_recipe_documents_document_chunk")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_recipe_documents_recipe_chunk")
+    op.drop_column("recipe_documents", "document_id")
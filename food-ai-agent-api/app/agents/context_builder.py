@@ -0,0 +1,163 @@
+"""Conversation context builder - token-budgeted history with a rolling summary.
+
+Recent turns are replayed verbatim, newest first, until the token budget is
+spent. Turns that fall out of that window are folded into
+``Conversation.summary`` after the turn completes, so the next request finds
+the summary ready and prompt size stays bounded on long conversations.
+"""
+import asyncio
+import logging
+from functools import lru_cache
+
+from anthropic import AsyncAnthropic
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-message framing overhead of the Messages API (role, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_PROMPT = """다음은 급식 운영 AI 어시스턴트와 사용자의 이전 대화입니다.
+기존 요약과 새 대화를 합쳐 이후 대화에 필요한 정보만 남긴 한국어 요약을 작성하세요.
+
+규칙:
+- 현장, 날짜, 식수, 메뉴, 품목, 수량, 결정 사항, 미해결 요청을 유지
+- 인사말, 반복 설명, 형식 문구는 제거
+- {max_tokens} 토큰 이내, 글머리표 형식
+
+[기존 요약]
+{summary}
+
+[새 대화]
+{transcript}
+
+요약만 출력하세요."""
+
+
+@lru_cache(maxsize=1)
+def _load_encoding():
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        # tiktoken downloads its BPE file on first use; offline hosts fall back
+        logger.warning(f"tiktoken unavailable, using character estimate: {e}")
+        return None
+
+
+async def load_encoding() -> None:
+    """Load the tokenizer in a thread at startup; the first load may download its BPE file."""
+    await asyncio.to_thread(_load_encoding)
+
+
+def _encoding():
+    if _load_encoding.cache_info().currsize:
+        return _load_encoding()
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return _load_encoding()  # scripts / sync callers may block
+    # Not loaded yet (no lifespan): estimate rather than block the event loop
+    return None
+
+
+def count_tokens(text: str) -> int:
+    """Approximate Claude token count (cl100k_base, or ~3 chars/token for Korean)."""
+    if not text:
+        return 0
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 3 + 1
+    return len(encoding.encode(text))
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(str(message.get("content", ""))) + MESSAGE_OVERHEAD_TOKENS
+
+
+class ConversationContextBuilder:
+    """Select the verbatim history window and maintain the rolling summary."""
+
+    def __init__(
+        self,
+        client: AsyncAnthropic,
+        budget_tokens: int | None = None,
+        summary_max_tokens: int | None = None,
+    ):
+        self.client = client
+        self.budget_tokens = budget_tokens or settings.chat_history_token_budget
+        self.summary_max_tokens = summary_max_tokens or settings.chat_summary_max_tokens
+
+    def window_start(self, messages: list[dict]) -> int:
+        """Index of the oldest message kept verbatim within the token budget.
+
+        Whole user/assistant turns are kept, never a partial one, and the
+        window always starts on a user message as the API requires.
+        """
+        budget = self.budget_tokens
+        start = len(messages)
+        i = len(messages)
+        while i > 0:
+            # Step back one turn: the assistant reply and the user message before it
+            turn_start = i - 1
+            if messages[turn_start].get("role") == "assistant" and turn_start > 0:
+                turn_start -= 1
+            cost = sum(message_tokens(m) for m in messages[turn_start:i])
+            if cost > budget:
+                break
+            budget -= cost
+            start = i = turn_start
+        while start < len(messages) and messages[start].get("role") != "user":
+            start += 1
+        return start
+
+    def build(self, messages: list[dict], summary_message_count: int = 0) -> list[dict]:
+        """Verbatim API messages for the next request (role/content only).
+
+        Messages before the window are expected to be covered by the summary.
+        """
+        start = self.window_start(messages)
+        if start > summary_message_count:
+            logger.info(
+                f"History window skips {start - summary_message_count} unsummarized messages"
+            )
+        return [{"role": m["role"], "content": m["content"]} for m in messages[start:]]
+
+    async def summarize(self, summary: str | None, messages: list[dict]) -> str:
+        """Fold messages into the rolling summary with one lightweight LLM call."""
+        transcript = "\n".join(
+            f"{'사용자' if m.get('role') == 'user' else '어시스턴트'}: {m.get('content', '')}"
+            for m in messages
+        )
+        response = await self.client.messages.create(
+            model=settings.claude_model,
+            max_tokens=self.summary_max_tokens,
+            temperature=0,
+            messages=[{
+                "role": "user",
+                "content": SUMMARY_PROMPT.format(
+                    max_tokens=self.summary_max_tokens,
+                    summary=summary or "(없음)",
+                    transcript=transcript,
+                ),
+            }],
+        )
+        return response.content[0].text.strip()
+
+    async def refresh_summary(self, conversation, messages: list[dict], offset: int = 0) -> bool:
+        """Summarize turns that the next request's window will no longer include.
+
+        ``conversation`` needs ``summary`` and ``summary_message_count``;
+        ``messages`` may be the tail of the conversation starting at position
+        ``offset`` (at most the covered count). Returns True when updated.
+        """
+        covered = conversation.summary_message_count or 0
+        start = offset + self.window_start(messages)
+        if start <= covered:
+            return False
+        conversation.summary = await self.summarize(
+            conversation.summary, messages[covered - offset:start - offset],
+        )
+        conversation.summary_message_count = start
+        return True
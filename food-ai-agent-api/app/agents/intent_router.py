@@ -1,11 +1,22 @@
 """Intent classification and query rewriting using Claude lightweight calls."""
+import dataclasses
 import json
 import logging
+import math
+import re
+from collections import defaultdict
+from collections.abc import Iterable
 from dataclasses import dataclass
 
-from anthropic import AsyncAnthropic
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config import settings
+from app.llm.admission import is_overloaded
+from app.llm.clients import get_anthropic_client
+from app.models.orm.audit_log import AuditLog
+from app.rag.query_text import strip_fillers
+from app.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +35,7 @@ class IntentResult:
     confidence: float
     entities: dict
     agent: str  # menu, recipe, haccp, general
+    source: str = "llm"  # llm, local, fallback (LLM call failed)
 
     @property
     def needs_clarification(self) -> bool:
@@ -58,11 +70,7 @@ INTENT_AGENT_MAP = {
     "generate_quality_report": "claim",
 }
 
-INTENT_SYSTEM_PROMPT = """You are an intent classifier for a Korean food service management system.
-Classify the user message into exactly one intent.
-
-Intents:
-- menu_generate: Creating or modifying meal plans (식단 생성, 식단 짜줘, 메뉴 만들어)
+INTENT_DESCRIPTIONS = """- menu_generate: Creating or modifying meal plans (식단 생성, 식단 짜줘, 메뉴 만들어)
 - menu_validate: Checking nutrition or allergens for existing plans (영양 검증, 알레르겐 확인)
 - recipe_search: Finding recipes or recipe information (레시피 검색, 어떤 요리, 조리법)
 - recipe_scale: Scaling recipes for different serving sizes (몇인분, 재료 환산, 스케일링)
@@ -83,92 +91,277 @@ Intents:
 - manage_claim: 클레임 접수, 민원 등록, 불만 사항 처리 (클레임, 불만, 민원, CS)
 - analyze_claim_root_cause: 클레임 원인 분석, 가설 생성, 재발방지 조치 (원인 분석, 왜, 가설)
 - generate_quality_report: 품질 리포트, 클레임 통계, 월간 품질 현황 (품질 리포트, 클레임 현황)
-- general: General questions, greetings, or unclear requests
+- general: General questions, greetings, or unclear requests"""
 
-Context: current_screen={screen}, user_role={role}, site={site_name}
+# Frequent phrasings the description keywords alone resolve weakly or wrongly
+# (time words like 오늘 also cue dashboard; 재고 + 발주서 is an order request)
+LOCAL_INTENT_EXAMPLES = [
+    ("재고 현황", "inventory_check"),
+    ("오늘 재고 현황", "inventory_check"),
+    ("재고 확인", "inventory_check"),
+    ("식수 예측", "forecast_demand"),
+    ("발주서 만들어", "purchase_order"),
+    ("부족한 품목 발주서", "purchase_order"),
+    ("HACCP 점검 완료", "haccp_checklist"),
+    ("오늘 현황", "dashboard"),
+]
 
-Return ONLY valid JSON: {{"intent": "...", "confidence": 0.0-1.0, "entities": {{}}, "agent": "menu|recipe|haccp|general|purchase|demand|claim"}}"""
+ROUTE_SYSTEM_PROMPT = """You are the request router for a Korean food service management system.
+For the user message, do two things in a single answer:
+1. Classify it into exactly one intent.
+2. Rewrite it as an optimal search query for the internal knowledge base.
 
-QUERY_REWRITE_PROMPT = """You are a search query optimizer for a Korean food service knowledge base.
-Given the user's conversational message and detected intent, rewrite it as an optimal search query.
+Intents:
+""" + INTENT_DESCRIPTIONS + """
 
-Rules:
+Search query rules:
 - Remove conversational fillers (그거, 좀, 해줘)
-- Add implied context (site name, date range, meal type)
 - Keep Korean food terminology
 - Keep it concise (under 50 characters preferred)
 - If the message is already a good search query, return it as-is
 
-User message: {message}
-Intent: {intent}
-Context: site={site_name}, role={role}
+Context: current_screen={screen}, user_role={role}
+
+Return ONLY valid JSON: {{"intent": "...", "confidence": 0.0-1.0, "entities": {{}}, "agent": "menu|recipe|haccp|general|purchase|demand|claim", "search_query": "..."}}"""
+
+
+@dataclass
+class RouteResult:
+    """Combined output of a single routing call: intent + rewritten search query."""
+    intent: IntentResult
+    search_query: str
+
+
+_HANGUL = re.compile(r"[가-힣]")
+_TOKEN = re.compile(r"[가-힣a-zA-Z0-9]+")
+_DESCRIPTION_LINE = re.compile(r"^- (\w+): (.*)$")
+
+
+class LocalIntentClassifier:
+    """In-process char-bigram intent scorer used before falling back to the LLM.
+
+    Each intent gets a profile of syllable bigrams and whole tokens built from
+    its example phrases. A message is scored per intent by the IDF mass of the
+    features it shares with the profile, plus a bonus when an example phrase
+    appears verbatim. Confidence combines the winning margin with the absolute
+    evidence, so single weak matches stay below the escalation threshold.
+    """
+
+    def __init__(self, examples: Iterable[tuple[str, str]] = ()):
+        self._examples: list[tuple[str, str]] = []
+        self._profiles: dict[str, set[str]] = {}
+        self._phrases: dict[str, list[tuple[str, set[str]]]] = {}
+        self._idf: dict[str, float] = {}
+        self.local_hits = 0
+        self.llm_fallbacks = 0
+        self.add_examples(examples)
+
+    @classmethod
+    def from_descriptions(
+        cls, descriptions: str, examples: Iterable[tuple[str, str]] = ()
+    ) -> "LocalIntentClassifier":
+        """Seed from the Korean keywords of an intent description list, plus extra examples."""
+        examples = list(examples)
+        for line in descriptions.splitlines():
+            match = _DESCRIPTION_LINE.match(line.strip())
+            if not match:
+                continue
+            intent, text = match.groups()
+            for fragment in re.split(r"[,()/]", text):
+                fragment = fragment.strip()
+                # Single-syllable cues ("왜") are too ambiguous on their own
+                if len(fragment) >= 2 and _HANGUL.search(fragment):
+                    examples.append((fragment, intent))
+        return cls(examples)
+
+    @staticmethod
+    def _features(text: str) -> set[str]:
+        # Fillers (좀, 알려줘, ...) say nothing about the intent
+        features = set()
+        for token in _TOKEN.findall(strip_fillers(text).lower()):
+            features.add(f"w:{token}")
+            features.update(token[i:i + 2] for i in range(len(token) - 1))
+        return features
+
+    @staticmethod
+    def _compact(text: str) -> str:
+        return re.sub(r"\s+", "", text.lower())
+
+    @property
+    def example_count(self) -> int:
+        return len(self._examples)
+
+    def add_examples(self, examples: Iterable[tuple[str, str]]) -> None:
+        """Add (message, intent) examples and rebuild the profiles."""
+        self._examples.extend((text, intent) for text, intent in examples if intent in INTENT_AGENT_MAP)
+
+        profiles: dict[str, set[str]] = defaultdict(set)
+        phrases: dict[str, list[tuple[str, set[str]]]] = defaultdict(list)
+        for text, intent in self._examples:
+            features = self._features(text)
+            profiles[intent] |= features
+            phrases[intent].append((self._compact(text), features))
+
+        doc_freq: dict[str, int] = defaultdict(int)
+        for features in profiles.values():
+            for feature in features:
+                doc_freq[feature] += 1
+        n_intents = max(len(profiles), 1)
+
+        self._profiles = dict(profiles)
+        self._phrases = dict(phrases)
+        self._idf = {f: math.log((n_intents + 1) / df) for f, df in doc_freq.items()}
+
+    def predict(self, message: str) -> IntentResult | None:
+        """Return the best local guess, or None when nothing matches."""
+        features = self._features(message)
+        compact = self._compact(message)
 
-Return ONLY the rewritten search query text, nothing else."""
+        scores: dict[str, float] = {}
+        for intent, profile in self._profiles.items():
+            score = sum(self._idf[f] for f in features if f in profile)
+            if score:
+                score += max(
+                    (sum(self._idf[f] for f in phrase_features)
+                     for phrase, phrase_features in self._phrases[intent] if phrase and phrase in compact),
+                    default=0.0,
+                )
+            scores[intent] = score
+
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        if not ranked or ranked[0][1] <= 0:
+            return None
+        best_intent, best = ranked[0]
+        runner_up = ranked[1][1] if len(ranked) > 1 else 0.0
+
+        margin = (best - runner_up) / best
+        strength = 1 - math.exp(-best / 6)
+        return IntentResult(
+            intent=best_intent,
+            confidence=round(0.5 * margin + 0.5 * strength, 3),
+            entities={},
+            agent=INTENT_AGENT_MAP.get(best_intent, "general"),
+            source="local",
+        )
+
+    def record(self, hit: bool) -> None:
+        if hit:
+            self.local_hits += 1
+        else:
+            self.llm_fallbacks += 1
+
+    def stats(self) -> dict:
+        total = self.local_hits + self.llm_fallbacks
+        return {
+            "local_hits": self.local_hits,
+            "llm_fallbacks": self.llm_fallbacks,
+            "hit_rate": round(self.local_hits / total, 4) if total else 0.0,
+            "examples": self.example_count,
+        }
+
+    async def load_audit_examples(
+        self, db: AsyncSession, min_confidence: float = 0.85, limit: int = 5000
+    ) -> int:
+        """Learn from past LLM-classified chat turns recorded in audit_logs."""
+        rows = (await db.execute(
+            select(AuditLog.ai_context)
+            .where(AuditLog.action == "ai_chat")
+            .order_by(AuditLog.created_at.desc())
+            .limit(limit)
+        )).scalars().all()
+
+        examples = [
+            (ctx["message"], ctx["intent"])
+            for ctx in rows
+            if ctx
+            and ctx.get("message")
+            and ctx.get("intent_source", "llm") == "llm"
+            and float(ctx.get("confidence") or 0) >= min_confidence
+        ]
+        self.add_examples(examples)
+        logger.info(f"Local intent classifier trained with {len(examples)} audit examples")
+        return len(examples)
+
+
+# Process-wide instance shared by every IntentRouter (hit-rate counters included)
+local_intent_classifier = LocalIntentClassifier.from_descriptions(INTENT_DESCRIPTIONS, LOCAL_INTENT_EXAMPLES)
 
 
 class IntentRouter:
     """Classify user intent and optimize search queries."""
 
-    def __init__(self):
-        self.client = AsyncAnthropic(api_key=settings.anthropic_api_key)
+    def __init__(self, local_classifier: LocalIntentClassifier | None = None, client=None):
+        self.client = client or get_anthropic_client()
+        self.local_classifier = local_classifier or local_intent_classifier
+
+    def classify_local(self, message: str) -> IntentResult | None:
+        """Local fast path: a confident in-process guess, or None to escalate."""
+        if not settings.intent_local_enabled:
+            return None
+        with span("intent_local") as attrs:
+            result = self.local_classifier.predict(message)
+            hit = result is not None and result.confidence >= settings.intent_local_threshold
+            attrs["hit"] = hit
+        self.local_classifier.record(hit)
+        return result if hit else None
+
+    def local_guess(self, message: str, source: str = "local") -> IntentResult:
+        """The local classifier's best guess, even if unconfident (general when it has none)."""
+        guess = self.local_classifier.predict(message)
+        if guess is None:
+            return IntentResult(intent="general", confidence=0.3, entities={}, agent="general", source=source)
+        return dataclasses.replace(guess, source=source)
 
-    async def classify(self, message: str, context: UserContext) -> IntentResult:
-        """Classify user message into one of 11 intents."""
-        system = INTENT_SYSTEM_PROMPT.format(
+    async def route(self, message: str, context: UserContext, allow_llm: bool = True) -> RouteResult:
+        """Classify intent and rewrite the search query in one LLM call.
+
+        Does not depend on site data, so callers can run it concurrently with
+        site and conversation-history loading. Confident local classifications
+        skip the LLM entirely and use the filler-stripped message as query.
+        Without ``allow_llm`` (site over its soft budget) the local best guess
+        is used even when unconfident, as it is when the LLM call fails. An
+        ``AdmissionTimeout`` or a 429/529 that outlasted the retries is raised
+        so the caller can answer "busy" instead of guessing.
+        """
+        local = self.classify_local(message)
+        if local:
+            return RouteResult(intent=local, search_query=strip_fillers(message))
+        if not allow_llm:
+            return RouteResult(intent=self.local_guess(message), search_query=strip_fillers(message))
+
+        system = ROUTE_SYSTEM_PROMPT.format(
             screen=context.current_screen,
             role=context.user_role,
-            site_name=context.site_name,
         )
 
         try:
-            response = await self.client.messages.create(
-                model=settings.claude_model,
-                max_tokens=200,
-                temperature=0,
-                system=system,
-                messages=[{"role": "user", "content": message}],
-            )
+            # Intent classification and query rewrite in one call
+            with span("route"):
+                response = await self.client.messages.create(
+                    model=settings.claude_model,
+                    max_tokens=300,
+                    temperature=0,
+                    system=system,
+                    messages=[{"role": "user", "content": message}],
+                )
 
-            text = response.content[0].text.strip()
-            # Parse JSON response
-            data = json.loads(text)
+            data = json.loads(response.content[0].text.strip())
 
             intent = data.get("intent", "general")
             agent = data.get("agent") or INTENT_AGENT_MAP.get(intent, "general")
+            search_query = (data.get("search_query") or "").strip()
 
-            return IntentResult(
-                intent=intent,
-                confidence=float(data.get("confidence", 0.5)),
-                entities=data.get("entities", {}),
-                agent=agent,
-            )
-        except Exception as e:
-            logger.warning(f"Intent classification failed, falling back to general: {e}")
-            return IntentResult(
-                intent="general",
-                confidence=0.3,
-                entities={},
-                agent="general",
-            )
-
-    async def rewrite_query(self, message: str, intent: str, context: UserContext) -> str:
-        """Rewrite conversational message into optimized search query."""
-        prompt = QUERY_REWRITE_PROMPT.format(
-            message=message,
-            intent=intent,
-            site_name=context.site_name,
-            role=context.user_role,
-        )
-
-        try:
-            response = await self.client.messages.create(
-                model=settings.claude_model,
-                max_tokens=100,
-                temperature=0,
-                messages=[{"role": "user", "content": prompt}],
+            return RouteResult(
+                intent=IntentResult(
+                    intent=intent,
+                    confidence=float(data.get("confidence", 0.5)),
+                    entities=data.get("entities", {}),
+                    agent=agent,
+                ),
+                search_query=search_query or message,
             )
-            rewritten = response.content[0].text.strip()
-            return rewritten if rewritten else message
         except Exception as e:
-            logger.warning(f"Query rewrite failed, using original: {e}")
-            return message
+            if is_overloaded(e):
+                raise
+            logger.warning(f"Routing failed, falling back to the local guess and raw query: {e}")
+            return RouteResult(intent=self.local_guess(message, source="fallback"), search_query=message)
@@ -1,42 +1,77 @@
 """Agent Orchestrator - ReAct agentic loop with Claude Tool Use and SSE streaming."""
+import asyncio
+import dataclasses
 import json
 import logging
 from collections.abc import AsyncGenerator
-from datetime import datetime, timezone
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from anthropic import AsyncAnthropic
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.agents.context_builder import ConversationContextBuilder
 from app.agents.intent_router import IntentRouter, UserContext, IntentResult
-from app.agents.prompts.system import build_system_prompt
-from app.agents.tools.registry import get_tools_for_agent, get_tool_names_for_agent
+from app.agents.persistence_writer import (
+    ConversationTurn,
+    append_conversation_turns,
+    persistence_writer,
+)
+from app.agents.prompts.system import build_system_blocks
+from app.agents.retrieval_policy import (
+    RetrievalPolicy,
+    get_retrieval_policy,
+    retrieval_policy_stats,
+)
+from app.agents.tool_cache import tool_result_cache
+from app.agents.tool_compactor import tool_result_compactor
+from app.agents.tool_executor import ParallelToolExecutor, ToolCall
+from app.agents.tools.dispatch import ToolInputError, get_tool_spec
+from app.agents.tool_selection import EXPAND_TOOL_NAME, select_tools, tool_selection_stats
+from app.agents.tools.registry import get_tool_names_for_agent
 from app.config import settings
+from app.db.database import async_session_factory
+from app.llm.admission import bind_site, is_overloaded
+from app.llm.clients import get_anthropic_client
+from app.llm.usage import (
+    BUDGET_HARD,
+    BUDGET_SOFT,
+    UsageMeter,
+    start_usage_meter,
+    upsert_usage_rollups,
+    usage_ledger,
+    usage_records,
+)
 from app.models.orm.audit_log import AuditLog
-from app.models.orm.conversation import Conversation
+from app.models.orm.conversation import Conversation, ConversationMessage
 from app.models.orm.site import Site
 from app.models.orm.user import User
-from app.rag.pipeline import RAGPipeline
+from app.rag.pipeline import RAGContext, RAGPipeline
+from app.rag.speculation import cosine_similarity, is_same_query, speculation_stats
+from app.tracing import span, start_trace
 
 logger = logging.getLogger(__name__)
 
-# Domain-specific RAG doc_type filters
-AGENT_DOC_TYPES = {
-    "menu": ["recipe", "sop"],
-    "recipe": ["recipe", "sop"],
-    "haccp": ["haccp_guide"],
-    "general": ["recipe", "sop", "haccp_guide", "policy"],
-}
+BUSY_MESSAGE = "현재 요청이 많아 응답이 지연되고 있습니다. 잠시 후 다시 시도해주세요."
+
+# Prompt caching is a beta feature for the pinned SDK; the header enables it
+PROMPT_CACHING_HEADERS = {"anthropic-beta": "prompt-caching-2024-07-31"}
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
 
 
 class AgentOrchestrator:
     """ReAct agent loop: Intent → RAG → Claude (streaming + tool calls) → Response."""
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, client=None):
         self.db = db
-        self.client = AsyncAnthropic(api_key=settings.anthropic_api_key)
-        self.intent_router = IntentRouter()
+        self.client = client or get_anthropic_client()
+        self.intent_router = IntentRouter(client=self.client)
+        self.context_builder = ConversationContextBuilder(self.client)
         self.rag = RAGPipeline(db)
         self.max_iterations = 10
 
@@ -46,206 +81,442 @@ class AgentOrchestrator:
         user: User,
         site_id: UUID,
         conversation_id: UUID | None = None,
+        timing: bool = False,
     ) -> AsyncGenerator[str, None]:
-        """Execute the agentic loop, yielding SSE events."""
+        """Execute the agentic loop, yielding SSE events.
+
+        With ``timing``, a ``timing`` event with per-phase spans precedes ``done``;
+        the spans are always stored in the audit log.
+        """
+        trace = start_trace()
+        meter = start_usage_meter()
+        bind_site(site_id)
+
+        # Routed agent for the usage rollup; "general" until routing succeeds
+        usage_agent = "general"
+        try:
+            # Daily LLM budget: over the soft limit the run is downgraded, over the hard one refused
+            budget = await usage_ledger.budget_status(site_id)
+            if budget == BUDGET_HARD:
+                yield self._sse("text_delta", content="이 현장의 오늘 AI 사용 한도를 초과했습니다. 내일 다시 이용하거나 관리자에게 문의해주세요.")
+                yield self._sse("done")
+                return
 
-        # 1. Load site
-        site = (await self.db.execute(select(Site).where(Site.id == site_id))).scalar_one_or_none()
-        if not site:
-            yield self._sse("text_delta", content="현장 정보를 찾을 수 없습니다.")
-            yield self._sse("done")
-            return
+            # 1. Routing (intent + search query in one LLM call), overlapped with
+            #    site and conversation-history loading on the request session.
+            context = UserContext(
+                user_role=user.role,
+                site_id=str(site_id),
+            )
+            route_task = asyncio.create_task(
+                self.intent_router.route(message, context, allow_llm=budget != BUDGET_SOFT)
+            )
+            # Speculative retrieval on the raw message, overlapped with routing
+            speculative_policy = None
+            speculative_task = None
+            if settings.rag_speculative_enabled and budget != BUDGET_SOFT:
+                speculative_policy = self._guess_policy(message)
+                if not speculative_policy.skip:
+                    speculative_task = asyncio.create_task(
+                        self._speculative_retrieve(message, speculative_policy)
+                    )
+            routed = None
+            try:
+                with span("site"):
+                    site = (await self.db.execute(select(Site).where(Site.id == site_id))).scalar_one_or_none()
+                if not site:
+                    yield self._sse("text_delta", content="현장 정보를 찾을 수 없습니다.")
+                    yield self._sse("done")
+                    return
+                with span("history"):
+                    conversation_history, conversation_summary = await self._load_history(conversation_id)
+                with span("route_wait"):
+                    try:
+                        routed = await route_task
+                    except Exception as e:
+                        if not is_overloaded(e):
+                            raise
+                        logger.warning(f"Routing skipped, LLM calls are overloaded: {e}")
+            finally:
+                if not route_task.done():
+                    route_task.cancel()
+                if routed is None and speculative_task:
+                    speculative_task.cancel()
+            if routed is None:
+                yield self._sse("text_delta", content=BUSY_MESSAGE)
+                yield self._sse("done")
+                return
 
-        # 2. Intent classification
-        context = UserContext(
-            user_role=user.role,
-            site_name=site.name,
-            site_id=str(site_id),
-        )
-        intent = await self.intent_router.classify(message, context)
-        logger.info(f"Intent: {intent.intent} (confidence={intent.confidence}, agent={intent.agent})")
-
-        # 3. Query rewrite for RAG
-        search_query = await self.intent_router.rewrite_query(message, intent.intent, context)
-
-        # 4. RAG Retrieve (domain-specific)
-        doc_types = AGENT_DOC_TYPES.get(intent.agent, ["recipe", "sop"])
-        rag_context = await self.rag.retrieve(search_query, doc_types=doc_types)
-
-        # 5. Build system prompt
-        system_prompt = build_system_prompt(
-            agent_type=intent.agent,
-            user_role=user.role,
-            user_name=user.name,
-            site_name=site.name,
-            site_type=site.type,
-            site_capacity=site.capacity,
-            rag_context=rag_context.to_prompt_section(),
-        )
+            intent = routed.intent
+            usage_agent = intent.agent
+            search_query = routed.search_query
+            logger.info(f"Intent: {intent.intent} (confidence={intent.confidence}, agent={intent.agent})")
+
+            # 2. RAG Retrieve per the intent's policy (skipped for tool-only intents),
+            #    reusing the speculative result when it fits
+            policy = get_retrieval_policy(intent.intent, intent.agent)
+            if budget == BUDGET_SOFT:
+                policy = dataclasses.replace(
+                    policy, top_k=min(policy.top_k or settings.rag_top_k, settings.llm_budget_soft_top_k)
+                )
+            retrieval_policy_stats.record(policy)
+            try:
+                if policy.skip:
+                    if speculative_task:
+                        speculative_task.cancel()
+                    rag_context = RAGContext()
+                elif speculative_task:
+                    rag_context = await self._resolve_speculation(
+                        speculative_task, speculative_policy, message, search_query, policy
+                    )
+                else:
+                    rag_context = await self._retrieve(search_query, policy)
+            except Exception as e:
+                # Embedding calls overloaded: answer without retrieved documents
+                if not is_overloaded(e):
+                    raise
+                logger.warning(f"Retrieval skipped, embedding calls are overloaded: {e}")
+                rag_context = RAGContext()
+
+            # 3. Build system prompt: cacheable static prefix, then site/user/RAG context
+            system_prompt = build_system_blocks(
+                agent_type=intent.agent,
+                user_role=user.role,
+                user_name=user.name,
+                site_name=site.name,
+                site_type=site.type,
+                site_capacity=site.capacity,
+                rag_context=rag_context.to_prompt_section(),
+                conversation_summary=conversation_summary or "",
+                cache=settings.claude_prompt_caching,
+            )
 
-        # 6. Load conversation history
-        conversation_history = await self._load_history(conversation_id)
-
-        # 7. Build messages
-        messages = [
-            *conversation_history[-20:],  # sliding window: last 10 turns
-            {"role": "user", "content": message},
-        ]
-
-        # 8. Get tools for this agent
-        tools = get_tools_for_agent(intent.agent)
-        allowed_tool_names = get_tool_names_for_agent(intent.agent)
-
-        # 9. ReAct Loop
-        full_response_text = ""
-        tool_results_log = []
-
-        for iteration in range(self.max_iterations):
-            response = await self.client.messages.create(
-                model=settings.claude_model,
-                max_tokens=settings.claude_max_tokens,
-                temperature=0.3,
-                system=system_prompt,
-                messages=messages,
-                tools=tools,
+            # 4. Build messages (token-budgeted window; older turns live in the summary)
+            messages = [
+                *conversation_history,
+                {"role": "user", "content": message},
+            ]
+
+            # 5. Tools for this turn: the intent's subset of the agent's tools, re-expanded
+            #    on demand (tool schemas are part of the cached prefix)
+            tool_selection = select_tools(intent)
+            allowed_tool_names = get_tool_names_for_agent(intent.agent)
+
+            # 6. ReAct Loop
+            full_response_text = ""
+            tool_results_log = []
+            usage = dict.fromkeys(USAGE_FIELDS, 0)
+            executor = ParallelToolExecutor(
+                run_tool=lambda name, tool_input, db: self._execute_tool(name, tool_input, user, site_id, db=db),
+                db=self.db,
             )
 
-            # Process response content blocks
-            assistant_content = []
-            for block in response.content:
-                if block.type == "text":
-                    full_response_text += block.text
-                    yield self._sse("text_delta", content=block.text)
-                    assistant_content.append({"type": "text", "text": block.text})
-
-                elif block.type == "tool_use":
-                    tool_name = block.name
-                    tool_input = block.input
-
-                    # Security: verify tool is allowed for this agent
-                    if tool_name not in allowed_tool_names:
-                        logger.warning(f"Tool {tool_name} not allowed for agent {intent.agent}")
-                        continue
-
-                    yield self._sse("tool_call", name=tool_name, status="started")
-                    assistant_content.append({
-                        "type": "tool_use",
-                        "id": block.id,
-                        "name": tool_name,
-                        "input": tool_input,
-                    })
-
-                    # Execute tool
-                    try:
-                        result = await self._execute_tool(tool_name, tool_input, user, site_id)
-                        tool_results_log.append({"tool": tool_name, "input": tool_input, "result": result})
-                        yield self._sse("tool_result", name=tool_name, data=result)
-                    except Exception as e:
-                        logger.error(f"Tool execution error ({tool_name}): {e}")
-                        result = {"error": str(e)}
-                        yield self._sse("tool_result", name=tool_name, data={"error": str(e)})
-
-                    # Add tool result to messages for next iteration
-                    messages.append({"role": "assistant", "content": assistant_content})
-                    messages.append({
-                        "role": "user",
-                        "content": [{
-                            "type": "tool_result",
-                            "tool_use_id": block.id,
-                            "content": json.dumps(result, ensure_ascii=False, default=str),
-                        }],
-                    })
+            try:
+                for iteration in range(self.max_iterations):
                     assistant_content = []
-
-            # Check stop reason
-            if response.stop_reason == "end_turn":
-                # Extract citations from RAG context
-                citations = self._extract_citations(rag_context)
-                if citations:
-                    yield self._sse("citations", sources=citations)
-                yield self._sse("done")
-                break
-            elif response.stop_reason != "tool_use":
-                # Unexpected stop, end gracefully
-                yield self._sse("done")
-                break
-        else:
-            # Max iterations exceeded
-            yield self._sse("text_delta", content="\n\n처리가 복잡하여 부분 결과를 제공합니다.")
+                    expansion_results: dict[str, ToolCall] = {}
+                    tools = tool_selection.tools(cacheable=settings.claude_prompt_caching)
+                    with span("claude", iteration=iteration) as claude_attrs:
+                        async with self.client.messages.stream(
+                            model=settings.claude_model,
+                            max_tokens=settings.claude_max_tokens,
+                            temperature=0.3,
+                            system=system_prompt,
+                            messages=messages,
+                            tools=tools,
+                            extra_headers=PROMPT_CACHING_HEADERS if settings.claude_prompt_caching else None,
+                        ) as stream:
+                            # Text deltas are forwarded as they arrive; tool_use input JSON is
+                            # accumulated by the SDK and handed over once the block closes.
+                            async for event in stream:
+                                if event.type == "text":
+                                    full_response_text += event.text
+                                    yield self._sse("text_delta", content=event.text)
+                                    continue
+
+                                if event.type != "content_block_stop":
+                                    continue
+
+                                block = event.content_block
+                                if block.type == "text":
+                                    assistant_content.append({"type": "text", "text": block.text})
+
+                                elif block.type == "tool_use":
+                                    if block.name == EXPAND_TOOL_NAME:
+                                        # Subset was too narrow: offer the full agent toolset next iteration
+                                        tool_selection.expand(str((block.input or {}).get("reason", "")))
+                                        assistant_content.append({
+                                            "type": "tool_use",
+                                            "id": block.id,
+                                            "name": block.name,
+                                            "input": block.input,
+                                        })
+                                        expansion_results[block.id] = ToolCall(
+                                            id=block.id, name=block.name, input=block.input,
+                                            result={"tools": list(tool_selection.agent_tools)},
+                                        )
+                                        continue
+
+                                    # Security: verify tool is allowed for this agent
+                                    if block.name not in allowed_tool_names:
+                                        logger.warning(f"Tool {block.name} not allowed for agent {intent.agent}")
+                                        continue
+                                    if not tool_selection.offers(block.name):
+                                        tool_selection.expand(f"called {block.name}")
+
+                                    yield self._sse("tool_call", name=block.name, status="started")
+                                    assistant_content.append({
+                                        "type": "tool_use",
+                                        "id": block.id,
+                                        "name": block.name,
+                                        "input": block.input,
+                                    })
+                                    # Start executing as soon as the input block is complete
+                                    executor.submit(ToolCall(id=block.id, name=block.name, input=block.input))
+
+                            response = await stream.get_final_message()
+                            self._accumulate_usage(usage, response)
+                        claude_attrs["stop_reason"] = response.stop_reason
+
+                    # Collect all tool results of this iteration and send them back in a
+                    # single user message, ordered like the tool_use blocks.
+                    completed: dict[str, ToolCall] = dict(expansion_results)
+                    async for call in executor.as_completed():
+                        completed[call.id] = call
+                        if not call.failed:
+                            tool_results_log.append({"tool": call.name, "input": call.input, "result": call.result})
+                        yield self._sse("tool_result", name=call.name, data=call.result)
+
+                    if completed:
+                        messages.append({"role": "assistant", "content": assistant_content})
+                        messages.append({
+                            "role": "user",
+                            "content": [
+                                completed[block["id"]].to_tool_result_block(
+                                    tool_result_compactor.compact(block["name"], completed[block["id"]].result)
+                                )
+                                for block in assistant_content
+                                if block["type"] == "tool_use"
+                            ],
+                        })
+
+                    # Check stop reason
+                    if response.stop_reason == "end_turn":
+                        # Extract citations from RAG context
+                        citations = self._extract_citations(rag_context)
+                        if citations:
+                            yield self._sse("citations", sources=citations)
+                        break
+                    elif response.stop_reason != "tool_use":
+                        # Unexpected stop, end gracefully
+                        break
+                else:
+                    # Max iterations exceeded
+                    yield self._sse("text_delta", content="\n\n처리가 복잡하여 부분 결과를 제공합니다.")
+            except Exception as e:
+                # LLM call slots exhausted (or 429/529 past the retries) at peak: tell the user instead of failing
+                if not is_overloaded(e):
+                    raise
+                yield self._sse("text_delta", content=f"\n\n{BUSY_MESSAGE}")
+            finally:
+                # Tools submitted before a failed/cancelled stream must not keep pooled sessions
+                await executor.aclose()
+
+            tool_selection_stats.record(tool_selection)
+
+            if timing:
+                yield self._sse("timing", **trace.to_dict())
             yield self._sse("done")
 
-        # 10. Save conversation
-        await self._save_conversation(
-            user_id=user.id,
-            site_id=site_id,
-            conversation_id=conversation_id,
-            user_message=message,
-            assistant_response=full_response_text,
-            context_type=intent.agent,
-        )
-
-        # 11. Audit log
-        await self._log_audit(
-            user=user,
-            site_id=site_id,
-            intent=intent,
-            tool_results=tool_results_log,
-            rag_chunks_used=len(rag_context.chunks),
-        )
+            # 7. Save conversation
+            with span("persist"):
+                await self._save_conversation(
+                    user_id=user.id,
+                    site_id=site_id,
+                    conversation_id=conversation_id,
+                    user_message=message,
+                    assistant_response=full_response_text,
+                    context_type=intent.agent,
+                )
+
+            # 8. Audit log
+            await self._log_audit(
+                user=user,
+                site_id=site_id,
+                message=message,
+                intent=intent,
+                tool_results=tool_results_log,
+                rag_chunks_used=len(rag_context.chunks),
+                usage=usage,
+                timing=trace.to_dict(),
+                llm_usage=meter.to_dict(),
+                budget=budget,
+                tool_selection=tool_selection.to_dict(),
+            )
+        finally:
+            # 9. Token/cost rollup per site, agent and model, also for failed or cancelled runs
+            await self._record_usage(site_id, usage_agent, meter)
 
     async def _execute_tool(
-        self, tool_name: str, tool_input: dict, user: User, site_id: UUID
+        self,
+        tool_name: str,
+        tool_input: dict,
+        user: User,
+        site_id: UUID,
+        db: AsyncSession | None = None,
     ) -> dict:
-        """Route tool execution to the appropriate handler."""
-        from app.agents.tools import menu_tools, recipe_tools, haccp_tools, dashboard_tools, work_order_tools
+        """Validate the input and run the tool's handler from the compiled registry.
+
+        ``db`` is the session the tool runs on; read-only tools get their own
+        pooled session from the parallel executor, write tools the request session.
+        """
+        db = db or self.db
+        spec = get_tool_spec(tool_name)
+        if spec is None:
+            return {"error": f"Unknown tool: {tool_name}"}
 
-        # Inject site_id for multi-site isolation
-        if "site_id" in tool_input:
-            # Verify user has access to this site
-            requested_site = UUID(tool_input["site_id"])
+        # Multi-site isolation: an explicit site_id must be one the user can access
+        if tool_input.get("site_id"):
+            try:
+                requested_site = UUID(str(tool_input["site_id"]))
+            except ValueError:
+                return {"error": f"Invalid site_id: {tool_input['site_id']}"}
             if user.role not in ("ADM", "OPS") and requested_site not in (user.site_ids or []):
                 return {"error": "No access to the requested site"}
-        elif tool_name in ("generate_menu_plan", "generate_work_order", "generate_haccp_checklist",
-                           "check_haccp_completion", "generate_audit_report", "query_dashboard"):
-            tool_input["site_id"] = str(site_id)
-
-        # Dispatch
-        dispatch = {
-            "generate_menu_plan": lambda: menu_tools.generate_menu_plan(self.db, created_by=user.id, **tool_input),
-            "validate_nutrition": lambda: menu_tools.validate_nutrition(self.db, **tool_input),
-            "tag_allergens": lambda: menu_tools.tag_allergens(self.db, **tool_input),
-            "check_diversity": lambda: menu_tools.check_diversity(self.db, **tool_input),
-            "search_recipes": lambda: recipe_tools.search_recipes(self.db, **tool_input),
-            "scale_recipe": lambda: recipe_tools.scale_recipe(self.db, **tool_input),
-            "generate_work_order": lambda: work_order_tools.generate_work_order(self.db, **tool_input),
-            "generate_haccp_checklist": lambda: haccp_tools.generate_haccp_checklist(
-                self.db, date_str=tool_input.pop("date", ""), **tool_input
-            ),
-            "check_haccp_completion": lambda: haccp_tools.check_haccp_completion(
-                self.db, date_str=tool_input.pop("date", ""), **tool_input
-            ),
-            "generate_audit_report": lambda: haccp_tools.generate_audit_report(self.db, **tool_input),
-            "query_dashboard": lambda: dashboard_tools.query_dashboard(
-                self.db, date_str=tool_input.pop("date", None), **tool_input
-            ),
-        }
-
-        handler = dispatch.get(tool_name)
-        if not handler:
-            return {"error": f"Unknown tool: {tool_name}"}
 
-        return await handler()
+        try:
+            kwargs = spec.bind(tool_input, site_id, user.id)
+        except ToolInputError as e:
+            return {"error": f"Invalid input for {tool_name}: {e}"}
+
+        with span("tool", tool=tool_name) as attrs:
+            # Read-only tools are memoized; write tools are never cached. After this run
+            # wrote a table the tool reads, the cache (cleared at commit) is bypassed.
+            use_cache = (
+                settings.tool_cache_enabled
+                and tool_result_cache.is_cacheable(tool_name)
+                and not tool_result_cache.has_uncommitted_writes(tool_name, db)
+            )
+            if use_cache:
+                cache_input = dict(kwargs)
+                cache_input.pop(spec.user_kwarg, None)
+                cached = tool_result_cache.get(tool_name, cache_input, site_id)
+                if cached is not None:
+                    attrs["cached"] = True
+                    return cached
+
+            result = await spec.handler(db, **kwargs)
+            if use_cache:
+                tool_result_cache.put(tool_name, cache_input, site_id, result)
+            return result
+
+    def _guess_policy(self, message: str) -> RetrievalPolicy:
+        """Retrieval policy of the local classifier's best guess, even if unconfident."""
+        guess = self.intent_router.local_classifier.predict(message)
+        if guess is None:
+            return get_retrieval_policy("general", "general")
+        return get_retrieval_policy(guess.intent, guess.agent)
+
+    async def _retrieve(
+        self, query: str, policy: RetrievalPolicy, query_embedding: list[float] | None = None, rag=None
+    ) -> RAGContext:
+        return await (rag or self.rag).retrieve(
+            query,
+            doc_types=list(policy.doc_types),
+            top_k=policy.top_k,
+            query_embedding=query_embedding,
+            max_tokens=policy.token_budget,
+        )
 
-    async def _load_history(self, conversation_id: UUID | None) -> list[dict]:
-        """Load conversation history from DB."""
+    async def _speculative_retrieve(
+        self, message: str, policy: RetrievalPolicy
+    ) -> tuple[list[float], RAGContext]:
+        """Retrieve for the raw message on a separate session (the request session is busy)."""
+        with span("rag_speculative"):
+            async with async_session_factory() as session:
+                rag = RAGPipeline(session)
+                with span("embedding"):
+                    embedding = await rag.embedder.embed_single(message)
+                return embedding, await self._retrieve(message, policy, embedding, rag=rag)
+
+    async def _resolve_speculation(
+        self,
+        speculative_task: asyncio.Task,
+        speculative_policy: RetrievalPolicy,
+        message: str,
+        search_query: str,
+        policy: RetrievalPolicy,
+    ) -> RAGContext:
+        """Reuse the speculative retrieval if it matches the routed query, else retrieve again."""
+        if policy != speculative_policy:
+            speculative_task.cancel()
+            speculation_stats.record(False, "policy")
+            return await self._retrieve(search_query, policy)
+
+        query_embedding = None
+        if not is_same_query(message, search_query):
+            # Needed for the similarity check and, on a miss, for the second retrieval
+            try:
+                with span("embedding"):
+                    query_embedding = await self.rag.embedder.embed_single(search_query)
+            except BaseException:
+                # Nobody will await the speculation now; don't leave it holding a pooled session
+                speculative_task.cancel()
+                await asyncio.gather(speculative_task, return_exceptions=True)
+                raise
+
+        try:
+            speculative_embedding, speculative_context = await speculative_task
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed: {e}")
+            speculation_stats.failures += 1
+            return await self._retrieve(search_query, policy, query_embedding)
+
+        if query_embedding is None:
+            speculation_stats.record(True, "same_query")
+            return speculative_context
+        similarity = cosine_similarity(speculative_embedding, query_embedding)
+        if similarity >= settings.rag_speculative_similarity:
+            speculation_stats.record(True, f"similarity={similarity:.3f}")
+            return speculative_context
+        speculation_stats.record(False, f"similarity={similarity:.3f}")
+        return await self._retrieve(search_query, policy, query_embedding)
+
+    async def _load_history(self, conversation_id: UUID | None) -> tuple[list[dict], str | None]:
+        """Load the token-budgeted history window and the rolling summary from DB.
+
+        Only messages not yet covered by the summary are read; turns still
+        queued in the persistence writer are appended.
+        """
         if not conversation_id:
-            return []
+            return [], None
+        pending = persistence_writer.pending_messages(conversation_id)
         conv = (await self.db.execute(
             select(Conversation).where(Conversation.id == conversation_id)
         )).scalar_one_or_none()
-        if not conv or not conv.messages:
-            return []
-        return conv.messages
+        if not conv:
+            return self.context_builder.build(pending), None
+        messages = []
+        if conv.message_count:
+            messages = await self._load_messages(conv.id, conv.summary_message_count or 0)
+        messages += pending
+        if not messages:
+            return [], conv.summary
+        return self.context_builder.build(messages), conv.summary
+
+    async def _load_messages(
+        self, conversation_id: UUID, from_seq: int = 0, db: AsyncSession | None = None,
+    ) -> list[dict]:
+        db = db or self.db
+        rows = (await db.execute(
+            select(ConversationMessage)
+            .where(
+                ConversationMessage.conversation_id == conversation_id,
+                ConversationMessage.seq >= from_seq,
+            )
+            .order_by(ConversationMessage.seq)
+        )).scalars().all()
+        return [row.to_dict() for row in rows]
 
     async def _save_conversation(
         self,
@@ -256,42 +527,62 @@ class AgentOrchestrator:
         assistant_response: str,
         context_type: str,
     ):
-        """Save or update conversation in DB."""
-        now = datetime.now(timezone.utc).isoformat()
-        new_messages = [
-            {"role": "user", "content": user_message, "timestamp": now},
-            {"role": "assistant", "content": assistant_response, "timestamp": now},
-        ]
-
-        if conversation_id:
-            conv = (await self.db.execute(
-                select(Conversation).where(Conversation.id == conversation_id)
-            )).scalar_one_or_none()
-            if conv:
-                existing = conv.messages or []
-                conv.messages = existing + new_messages
-                conv.updated_at = datetime.now(timezone.utc)
-                await self.db.flush()
-                return
-
-        # Create new conversation
-        conv = Conversation(
+        """Append the turn to the conversation, via the background writer when it runs."""
+        turn = ConversationTurn(
+            conversation_id=conversation_id or uuid4(),
             user_id=user_id,
             site_id=site_id,
             context_type=context_type,
-            title=user_message[:100],
-            messages=new_messages,
+            user_message=user_message,
+            assistant_response=assistant_response,
         )
-        self.db.add(conv)
+        if await persistence_writer.submit_turn(
+            turn, after_commit=lambda: self._refresh_summary_detached(turn.conversation_id),
+        ):
+            return
+
+        for conv in await append_conversation_turns(self.db, [turn]):
+            if conv.message_count > 2:
+                await self._refresh_summary(conv)
         await self.db.flush()
 
+    async def _refresh_summary(self, conv: Conversation, db: AsyncSession | None = None) -> None:
+        """Fold turns that left the history window into the rolling summary (best-effort)."""
+        try:
+            covered = conv.summary_message_count or 0
+            messages = await self._load_messages(conv.id, covered, db=db)
+            if await self.context_builder.refresh_summary(conv, messages, offset=covered):
+                logger.info(f"Conversation {conv.id} summary now covers {conv.summary_message_count} messages")
+        except Exception as e:
+            logger.warning(f"Conversation summary refresh failed: {e}")
+
+    async def _refresh_summary_detached(self, conversation_id: UUID) -> None:
+        """Summary refresh after a background write; runs on its own session."""
+        meter = start_usage_meter()
+        async with async_session_factory() as session:
+            conv = (await session.execute(
+                select(Conversation).where(Conversation.id == conversation_id)
+            )).scalar_one_or_none()
+            if conv is None or conv.message_count <= 2:
+                return
+            await self._refresh_summary(conv, db=session)
+            if conv.site_id:
+                await self._record_usage(conv.site_id, "summary", meter, db=session)
+            await session.commit()
+
     async def _log_audit(
         self,
         user: User,
         site_id: UUID,
+        message: str,
         intent: IntentResult,
         tool_results: list[dict],
         rag_chunks_used: int,
+        usage: dict | None = None,
+        timing: dict | None = None,
+        llm_usage: dict | None = None,
+        budget: str | None = None,
+        tool_selection: dict | None = None,
     ):
         """Record AI interaction in audit log."""
         log = AuditLog(
@@ -301,17 +592,50 @@ class AgentOrchestrator:
             entity_type="conversation",
             entity_id=user.id,  # placeholder
             ai_context={
+                "message": message[:500],
                 "intent": intent.intent,
+                "intent_source": intent.source,
                 "agent": intent.agent,
                 "confidence": intent.confidence,
                 "tools_called": [tr["tool"] for tr in tool_results],
                 "rag_chunks_used": rag_chunks_used,
                 "model": settings.claude_model,
+                "usage": usage or {},
+                "llm_usage": llm_usage or {},
+                "budget": budget,
+                "tool_selection": tool_selection or {},
+                "timing": timing or {},
             },
         )
+        if await persistence_writer.submit_audit(log):
+            return
         self.db.add(log)
         await self.db.flush()
 
+    async def _record_usage(
+        self, site_id: UUID, agent: str, meter: UsageMeter, db: AsyncSession | None = None,
+    ) -> None:
+        """Add a run's token usage and cost to the daily rollup (best-effort)."""
+        records = usage_records(meter, site_id, agent)
+        if not records:
+            return
+        usage_ledger.add(site_id, meter.cost_usd())
+        try:
+            inline = await persistence_writer.submit_usage(records)
+            if inline:
+                await upsert_usage_rollups(db or self.db, inline)
+        except Exception as e:
+            logger.warning(f"Recording LLM usage failed: {e}")
+
+    @staticmethod
+    def _accumulate_usage(usage: dict, response) -> None:
+        """Add one response's token counts (incl. prompt-cache reads/writes) to the run total."""
+        response_usage = getattr(response, "usage", None)
+        if response_usage is None:
+            return
+        for field in USAGE_FIELDS:
+            usage[field] += int(getattr(response_usage, field, 0) or 0)
+
     @staticmethod
     def _extract_citations(rag_context) -> list[dict]:
         """Extract citation sources from RAG context."""
@@ -0,0 +1,295 @@
+"""Persistence writer - batches conversation appends and audit logs off the SSE path.
+
+Chat runs enqueue their conversation turn, AuditLog row and LLM usage
+records once the stream is done. A single background task drains the bounded queue and writes each
+batch in one session/transaction, flushing every ``batch_size`` items or
+``flush_interval_ms``, whichever comes first. When the queue is full,
+producers wait up to ``enqueue_timeout_ms`` (backpressure) and then fall back
+to writing inline on their own request session.
+
+In durable mode, ``stop()`` drains and flushes everything still queued before
+the process exits; otherwise queued items are dropped and counted.
+"""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from uuid import UUID
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.db.database import async_session_factory
+from app.llm.usage import UsageRecord, upsert_usage_rollups
+from app.models.orm.audit_log import AuditLog
+from app.models.orm.conversation import Conversation, ConversationMessage
+
+logger = logging.getLogger(__name__)
+
+AfterCommit = Callable[[], Awaitable[None]]
+
+_STOP = object()
+
+
+@dataclass
+class ConversationTurn:
+    """One user/assistant exchange to append to a conversation."""
+    conversation_id: UUID
+    user_id: UUID
+    site_id: UUID
+    context_type: str
+    user_message: str
+    assistant_response: str
+    created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+
+    def to_messages(self) -> list[dict]:
+        timestamp = self.created_at.isoformat()
+        return [
+            {"role": "user", "content": self.user_message, "timestamp": timestamp},
+            {"role": "assistant", "content": self.assistant_response, "timestamp": timestamp},
+        ]
+
+
+async def append_conversation_turns(
+    db: AsyncSession, turns: list[ConversationTurn],
+) -> list[Conversation]:
+    """Append turns to conversation_messages, creating conversations as needed.
+
+    Parent rows are locked so concurrent writers assign unique seq numbers.
+    Returns the touched conversations.
+    """
+    if not turns:
+        return []
+    ids = {turn.conversation_id for turn in turns}
+    conversations = {
+        conv.id: conv
+        for conv in (await db.execute(
+            select(Conversation).where(Conversation.id.in_(ids)).with_for_update()
+        )).scalars().all()
+    }
+
+    for turn in turns:
+        conv = conversations.get(turn.conversation_id)
+        if conv is None:
+            conv = Conversation(
+                id=turn.conversation_id,
+                user_id=turn.user_id,
+                site_id=turn.site_id,
+                context_type=turn.context_type,
+                title=turn.user_message[:100],
+                message_count=0,
+            )
+            db.add(conv)
+            conversations[conv.id] = conv
+
+        seq = conv.message_count or 0
+        db.add_all([
+            ConversationMessage(
+                conversation_id=conv.id, seq=seq, role="user",
+                content=turn.user_message, created_at=turn.created_at,
+            ),
+            ConversationMessage(
+                conversation_id=conv.id, seq=seq + 1, role="assistant",
+                content=turn.assistant_response, created_at=turn.created_at,
+            ),
+        ])
+        conv.message_count = seq + 2
+        conv.updated_at = turn.created_at
+
+    await db.flush()
+    return list(conversations.values())
+
+
+class PersistenceWriter:
+    """Bounded-queue batch writer for ConversationTurn, AuditLog and UsageRecord items."""
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker | None = None,
+        max_queue: int | None = None,
+        batch_size: int | None = None,
+        flush_interval_ms: int | None = None,
+        enqueue_timeout_ms: int | None = None,
+        durable: bool | None = None,
+    ):
+        self.session_factory = session_factory or async_session_factory
+        self.max_queue = max_queue or settings.persistence_queue_size
+        self.batch_size = batch_size or settings.persistence_batch_size
+        self.flush_interval = (flush_interval_ms or settings.persistence_flush_interval_ms) / 1000
+        self.enqueue_timeout = (enqueue_timeout_ms or settings.persistence_enqueue_timeout_ms) / 1000
+        self.durable = settings.persistence_durable if durable is None else durable
+
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._callbacks: set[asyncio.Task] = set()
+        self._pending: dict[UUID, list[dict]] = {}
+        self._accepting = False
+
+        self.written = 0
+        self.batches = 0
+        self.backpressure_waits = 0
+        self.rejected = 0
+        self.failed = 0
+        self.dropped = 0
+
+    @property
+    def running(self) -> bool:
+        return self._accepting and self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._accepting = True
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the writer; in durable mode, flush everything still queued first."""
+        if self._task is None:
+            return
+        self._accepting = False
+        if self.durable and not self._task.done():
+            # The sentinel is queued behind every accepted item and ends the loop once flushed
+            await self._queue.put(_STOP)
+        else:
+            self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._queue is not None and not self._queue.empty():
+            self.dropped += self._queue.qsize()
+            logger.warning(f"Persistence writer dropped {self._queue.qsize()} queued items on shutdown")
+        if self.durable and self._callbacks:
+            await asyncio.gather(*self._callbacks, return_exceptions=True)
+        self._pending.clear()
+
+    async def submit_turn(self, turn: ConversationTurn, after_commit: AfterCommit | None = None) -> bool:
+        """Queue a conversation turn. Returns False if the caller must write it inline."""
+        if not await self._enqueue(turn, after_commit):
+            return False
+        self._pending.setdefault(turn.conversation_id, []).extend(turn.to_messages())
+        return True
+
+    async def submit_audit(self, log: AuditLog) -> bool:
+        """Queue an AuditLog row. Returns False if the caller must write it inline."""
+        return await self._enqueue(log, None)
+
+    async def submit_usage(self, records: list[UsageRecord]) -> list[UsageRecord]:
+        """Queue usage records for the daily rollup. Returns those the caller must write inline."""
+        for i, record in enumerate(records):
+            if not await self._enqueue(record, None):
+                return records[i:]
+        return []
+
+    def pending_messages(self, conversation_id: UUID) -> list[dict]:
+        """Messages queued for a conversation but not yet committed."""
+        return list(self._pending.get(conversation_id, ()))
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "max_queue": self.max_queue,
+            "written": self.written,
+            "batches": self.batches,
+            "backpressure_waits": self.backpressure_waits,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    async def _enqueue(self, item, after_commit: AfterCommit | None) -> bool:
+        if not self.running:
+            return False
+        entry = (item, after_commit)
+        try:
+            self._queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.backpressure_waits += 1
+            try:
+                await asyncio.wait_for(self._queue.put(entry), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+        return True
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            entry = await self._queue.get()
+            if entry is _STOP:
+                break
+            batch = [entry]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list[tuple]) -> None:
+        try:
+            await self._write([item for item, _ in batch])
+        except Exception as e:
+            # One bad row must not lose the whole batch: retry item by item
+            logger.error(f"Persistence batch of {len(batch)} failed, retrying individually: {e}")
+            for item, after_commit in batch:
+                try:
+                    await self._write([item])
+                except Exception as item_error:
+                    self.failed += 1
+                    logger.error(f"Persistence write failed ({type(item).__name__}): {item_error}")
+                    batch = [entry for entry in batch if entry[0] is not item]
+                    self._discard_pending(item)
+        else:
+            self.batches += 1
+
+        self.written += len(batch)
+        for item, after_commit in batch:
+            self._discard_pending(item)
+            if after_commit is not None:
+                task = asyncio.create_task(self._run_callback(after_commit))
+                self._callbacks.add(task)
+                task.add_done_callback(self._callbacks.discard)
+
+    async def _write(self, items: list) -> None:
+        async with self.session_factory() as session:
+            await append_conversation_turns(
+                session, [item for item in items if isinstance(item, ConversationTurn)],
+            )
+            session.add_all([item for item in items if isinstance(item, AuditLog)])
+            await upsert_usage_rollups(session, [item for item in items if isinstance(item, UsageRecord)])
+            await session.commit()
+
+    def _discard_pending(self, item) -> None:
+        if not isinstance(item, ConversationTurn):
+            return
+        pending = self._pending.get(item.conversation_id)
+        if not pending:
+            return
+        del pending[:2]
+        if not pending:
+            del self._pending[item.conversation_id]
+
+    @staticmethod
+    async def _run_callback(after_commit: AfterCommit) -> None:
+        try:
+            await after_commit()
+        except Exception as e:
+            logger.warning(f"Persistence after-commit hook failed: {e}")
+
+
+persistence_writer = PersistenceWriter()
@@ -321,7 +321,7 @@ AGENT_PROMPTS = {
 }
 
 
-def build_system_prompt(
+def build_system_blocks(
     agent_type: str,
     user_role: str,
     user_name: str,
@@ -330,8 +330,11 @@ def build_system_prompt(
     site_capacity: int,
     policy_summary: str = "",
     rag_context: str = "",
-) -> str:
-    """Build the complete system prompt for an agent."""
+    conversation_summary: str = "",
+    cache: bool = True,
+) -> list[dict]:
+    """Build the system prompt as content blocks: a static, cacheable prefix
+    (rules + agent prompt) followed by the per-request context (site, user, RAG)."""
     base = AGENT_PROMPTS.get(agent_type, GENERAL_AGENT_PROMPT)
 
     context_section = f"""
@@ -348,4 +351,43 @@ def build_system_prompt(
 {rag_context}
 """
 
-    return f"{base}\n{context_section}\n{rag_section}"
+    if conversation_summary:
+        context_section += f"""
+## 이전 대화 요약
+{conversation_summary}
+"""
+
+    static_block = {"type": "text", "text": base}
+    if cache:
+        static_block["cache_control"] = {"type": "ephemeral"}
+    return [
+        static_block,
+        {"type": "text", "text": f"{context_section}\n{rag_section}"},
+    ]
+
+
+def build_system_prompt(
+    agent_type: str,
+    user_role: str,
+    user_name: str,
+    site_name: str,
+    site_type: str,
+    site_capacity: int,
+    policy_summary: str = "",
+    rag_context: str = "",
+    conversation_summary: str = "",
+) -> str:
+    """Build the complete system prompt for an agent."""
+    blocks = build_system_blocks(
+        agent_type=agent_type,
+        user_role=user_role,
+        user_name=user_name,
+        site_name=site_name,
+        site_type=site_type,
+        site_capacity=site_capacity,
+        policy_summary=policy_summary,
+        rag_context=rag_context,
+        conversation_summary=conversation_summary,
+        cache=False,
+    )
+    return "\n".join(block["text"] for block in blocks)
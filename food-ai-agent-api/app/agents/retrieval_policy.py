@@ -0,0 +1,106 @@
+"""Per-intent RAG retrieval policy.
+
+Many intents (dashboard, inventory, purchase orders, actual-count entry, ...)
+are answered entirely from tools, so retrieving documents for them only costs
+an embedding round trip, two searches and enrichment. Each intent gets a
+policy saying whether to retrieve at all, from which doc types, how many
+chunks and how many tokens of context to inject. Intents without an entry use
+their agent's doc types.
+
+``RAG_INTENT_POLICIES`` overrides fields per intent, e.g.
+``{"dashboard": {"skip": false, "top_k": 3}}``.
+"""
+import dataclasses
+import logging
+from dataclasses import dataclass
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetrievalPolicy:
+    skip: bool = False
+    doc_types: tuple[str, ...] = ("recipe", "sop")
+    top_k: int | None = None  # None: RAG_TOP_K
+    token_budget: int | None = None  # max estimated tokens of injected context
+
+
+# Agent-level doc_type filters, used for intents without their own policy
+AGENT_DOC_TYPES = {
+    "menu": ["recipe", "sop"],
+    "recipe": ["recipe", "sop"],
+    "haccp": ["haccp_guide"],
+    "general": ["recipe", "sop", "haccp_guide", "policy"],
+    "purchase": ["policy"],
+    "demand": ["policy"],
+    "claim": ["haccp_guide", "sop", "policy"],
+}
+
+SKIP = RetrievalPolicy(skip=True, doc_types=())
+
+INTENT_RETRIEVAL_POLICIES: dict[str, RetrievalPolicy] = {
+    "recipe_scale": RetrievalPolicy(doc_types=("recipe",), top_k=3),
+    "haccp_record": RetrievalPolicy(doc_types=("haccp_guide",), top_k=3),
+    "manage_claim": RetrievalPolicy(doc_types=("haccp_guide", "policy"), top_k=3),
+    "general": RetrievalPolicy(doc_types=tuple(AGENT_DOC_TYPES["general"]), top_k=3, token_budget=1500),
+    # Answered from tools / live data only
+    "dashboard": SKIP,
+    "settings": SKIP,
+    "purchase_bom": SKIP,
+    "purchase_order": SKIP,
+    "inventory_check": SKIP,
+    "inventory_receive": SKIP,
+    "forecast_demand": SKIP,
+    "record_actual": SKIP,
+    "optimize_cost": SKIP,
+    "generate_quality_report": SKIP,
+}
+
+
+def _apply_override(intent: str, policy: RetrievalPolicy) -> RetrievalPolicy:
+    override = settings.rag_intent_policies.get(intent)
+    if not override:
+        return policy
+    try:
+        override = dict(override)
+        if "doc_types" in override:
+            override["doc_types"] = tuple(override["doc_types"])
+        return dataclasses.replace(policy, **override)
+    except (TypeError, ValueError) as e:
+        logger.warning(f"Ignoring invalid retrieval policy override for {intent}: {e}")
+        return policy
+
+
+def get_retrieval_policy(intent: str, agent: str) -> RetrievalPolicy:
+    """Retrieval policy for a routed intent (falling back to the agent's doc types)."""
+    policy = INTENT_RETRIEVAL_POLICIES.get(intent)
+    if policy is None:
+        policy = RetrievalPolicy(doc_types=tuple(AGENT_DOC_TYPES.get(agent, ["recipe", "sop"])))
+    return _apply_override(intent, policy)
+
+
+class RetrievalPolicyStats:
+    """Process-wide counts of skipped vs performed turn retrievals."""
+
+    def __init__(self):
+        self.skipped = 0
+        self.retrieved = 0
+
+    def record(self, policy: RetrievalPolicy) -> None:
+        if policy.skip:
+            self.skipped += 1
+        else:
+            self.retrieved += 1
+
+    def stats(self) -> dict:
+        total = self.skipped + self.retrieved
+        return {
+            "skipped": self.skipped,
+            "retrieved": self.retrieved,
+            "skip_rate": round(self.skipped / total, 4) if total else 0.0,
+        }
+
+
+retrieval_policy_stats = RetrievalPolicyStats()
@@ -0,0 +1,159 @@
+"""Resumable agent runs - decouple agent execution from the SSE connection.
+
+Each chat turn runs as a background task that appends its SSE events, numbered
+from 1, to an in-memory ring buffer. HTTP responses only tail that buffer, so a
+dropped connection (kitchen tablet losing Wi-Fi) no longer aborts the LLM and
+tool work: the client reattaches with ``Last-Event-ID`` and gets the missed
+events replayed, then the live tail.
+
+Idle streams get an SSE comment heartbeat every ``CHAT_HEARTBEAT_S`` so proxies
+do not close them. Finished runs stay replayable for ``CHAT_RUN_TTL_S``. The
+buffer is per process; a reattach must reach the worker that owns the run.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from uuid import UUID, uuid4
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT = ": ping\n\n"
+
+
+def _sse(event_type: str, **data) -> str:
+    payload = {"type": event_type, **data}
+    return f"data: {json.dumps(payload, ensure_ascii=False, default=str)}\n\n"
+
+
+class AgentRun:
+    """One agent run and the ring buffer of its numbered SSE events."""
+
+    def __init__(self, user_id: UUID, buffer_size: int):
+        self.id = str(uuid4())
+        self.user_id = user_id
+        self.events: deque[tuple[int, str]] = deque(maxlen=buffer_size)
+        self.last_seq = 0
+        self.created_at = time.monotonic()
+        self.finished_at: float | None = None
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def append(self, event: str) -> None:
+        self.last_seq += 1
+        self.events.append((self.last_seq, event))
+        self._notify()
+
+    def finish(self) -> None:
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def stream(self, after_seq: int = 0, heartbeat_s: float | None = None) -> AsyncIterator[str]:
+        """Yield events numbered after ``after_seq`` (replay, then live) until the run ends."""
+        heartbeat_s = heartbeat_s or settings.chat_heartbeat_s
+        sent = after_seq
+        oldest = self.events[0][0] if self.events else self.last_seq + 1
+        if sent + 1 < oldest:
+            # Reattached too late: the ring buffer has already dropped some events
+            yield _sse("events_dropped", missed=oldest - sent - 1)
+            sent = oldest - 1
+
+        while True:
+            changed = self._changed
+            for seq, event in list(self.events):
+                if seq > sent:
+                    yield f"id: {seq}\n{event}"
+                    sent = seq
+            if self.finished and sent >= self.last_seq:
+                return
+            try:
+                await asyncio.wait_for(changed.wait(), timeout=heartbeat_s)
+            except asyncio.TimeoutError:
+                yield HEARTBEAT
+
+
+class RunRegistry:
+    """Process-wide registry of background agent runs."""
+
+    def __init__(self):
+        self._runs: dict[str, AgentRun] = {}
+        self.started = 0
+        self.failed = 0
+        self.reattached = 0
+
+    def start(self, user_id: UUID, events: AsyncIterator[str]) -> AgentRun:
+        """Run ``events`` (an orchestrator event generator) in the background."""
+        self._purge()
+        run = AgentRun(user_id, settings.chat_run_buffer_events)
+        run.append(_sse("run", run_id=run.id))
+        run.task = asyncio.create_task(self._drive(run, events))
+        self._runs[run.id] = run
+        self.started += 1
+        return run
+
+    async def _drive(self, run: AgentRun, events: AsyncIterator[str]) -> None:
+        try:
+            async for event in events:
+                run.append(event)
+        except asyncio.CancelledError:
+            run.append(_sse("error", message="서버가 종료되어 응답이 중단되었습니다."))
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.exception(f"Agent run {run.id} failed: {e}")
+            run.append(_sse("error", message="응답 생성 중 오류가 발생했습니다."))
+            run.append(_sse("done"))
+        finally:
+            run.finish()
+
+    def get(self, run_id: str, user_id: UUID) -> AgentRun | None:
+        """A live or still-replayable run owned by ``user_id``."""
+        self._purge()
+        run = self._runs.get(run_id)
+        if run is None or run.user_id != user_id:
+            return None
+        self.reattached += 1
+        return run
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        expired = [
+            run_id for run_id, run in self._runs.items()
+            if run.finished and now - run.finished_at > settings.chat_run_ttl_s
+        ]
+        for run_id in expired:
+            del self._runs[run_id]
+
+    async def shutdown(self) -> None:
+        """Cancel runs still in progress (application shutdown)."""
+        tasks = [run.task for run in self._runs.values() if run.task and not run.task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        self._runs.clear()
+
+    def stats(self) -> dict:
+        active = sum(1 for run in self._runs.values() if not run.finished)
+        return {
+            "active": active,
+            "buffered": len(self._runs) - active,
+            "started": self.started,
+            "failed": self.failed,
+            "reattached": self.reattached,
+        }
+
+
+run_registry = RunRegistry()
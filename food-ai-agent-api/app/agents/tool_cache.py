@@ -0,0 +1,193 @@
+"""Tool result cache - memoizes read-only agent tools within and across chat turns.
+
+Entries are keyed by (tool name, normalized input, site) and expire after a
+per-tool TTL. ORM writes to any table a tool reads from invalidate that tool's
+entries when their transaction commits (session-level event listeners; a
+rollback discards them). The cache is per process;
+the TTL bounds staleness for writes made by other workers or raw SQL.
+"""
+import copy
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ToolCachePolicy:
+    ttl_seconds: int
+    tables: tuple[str, ...]
+
+
+# Only read-only tools are listed; every other tool bypasses the cache.
+TOOL_CACHE_POLICIES: dict[str, ToolCachePolicy] = {
+    "query_dashboard": ToolCachePolicy(60, (
+        "menu_plans", "haccp_checklists", "haccp_incidents", "work_orders", "demand_forecasts",
+        "actual_headcounts", "waste_records", "cost_analyses", "claims", "sites",
+    )),
+    "check_inventory": ToolCachePolicy(120, ("inventory", "inventory_lots", "items")),
+    "compare_vendors": ToolCachePolicy(300, ("vendor_prices", "vendors", "items")),
+    "detect_price_risk": ToolCachePolicy(300, (
+        "vendor_prices", "vendors", "items", "menu_plans", "menu_plan_items", "recipes",
+    )),
+    "suggest_alternatives": ToolCachePolicy(600, ("items", "vendor_prices", "vendors", "allergen_policies")),
+    "check_haccp_completion": ToolCachePolicy(60, ("haccp_checklists", "haccp_records")),
+    "generate_audit_report": ToolCachePolicy(300, ("haccp_checklists", "haccp_records", "haccp_incidents", "sites")),
+    "check_diversity": ToolCachePolicy(300, ("menu_plans", "menu_plan_items", "recipes")),
+    "search_recipes": ToolCachePolicy(600, ("recipes", "recipe_documents")),
+    "scale_recipe": ToolCachePolicy(1800, ("recipes",)),
+    "generate_work_order": ToolCachePolicy(600, ("recipes",)),
+}
+
+# session.info key: tables written in the session's open transaction, invalidated once it commits
+_PENDING_KEY = "tool_cache_tables"
+
+
+def _normalize(value):
+    """Canonical form of a tool input: no None values, stripped strings, sorted scalar lists."""
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        items = [_normalize(v) for v in value]
+        if all(isinstance(v, (str, int, float)) for v in items):
+            return sorted(items, key=str)
+        return items
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+
+class ToolResultCache:
+    """TTL + LRU cache of tool results with table-based invalidation."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, str, dict]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def is_cacheable(tool_name: str) -> bool:
+        return tool_name in TOOL_CACHE_POLICIES
+
+    @staticmethod
+    def make_key(tool_name: str, tool_input: dict, site_id) -> str:
+        normalized = json.dumps(_normalize(tool_input), sort_keys=True, ensure_ascii=False, default=str)
+        return f"{tool_name}|{site_id}|{normalized}"
+
+    def get(self, tool_name: str, tool_input: dict, site_id) -> dict | None:
+        if not self.is_cacheable(tool_name):
+            return None
+        key = self.make_key(tool_name, tool_input, site_id)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(entry[2])
+
+    def put(self, tool_name: str, tool_input: dict, site_id, result: dict) -> None:
+        policy = TOOL_CACHE_POLICIES.get(tool_name)
+        if policy is None or "error" in result:
+            return
+        key = self.make_key(tool_name, tool_input, site_id)
+        self._entries[key] = (time.monotonic() + policy.ttl_seconds, tool_name, copy.deepcopy(result))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_tables(self, tables: set[str]) -> int:
+        """Drop entries of every tool that reads one of the given tables."""
+        tools = {name for name, policy in TOOL_CACHE_POLICIES.items() if tables.intersection(policy.tables)}
+        if not tools:
+            return 0
+        stale = [key for key, (_, tool_name, _) in self._entries.items() if tool_name in tools]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += len(stale)
+        return len(stale)
+
+    @staticmethod
+    def has_uncommitted_writes(tool_name: str, session) -> bool:
+        """Whether ``session`` wrote, but has not committed, a table the tool reads.
+
+        The cache is only invalidated at commit, so within the writing
+        transaction cached results of those tools are stale.
+        """
+        policy = TOOL_CACHE_POLICIES.get(tool_name)
+        if policy is None or session is None:
+            return False
+        written = set(session.info.get(_PENDING_KEY, ()))
+        written.update(_touched_tables(session))
+        return not written.isdisjoint(policy.tables)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+            "entries": len(self._entries),
+        }
+
+
+tool_result_cache = ToolResultCache(max_entries=settings.tool_cache_max_entries)
+
+
+def _touched_tables(session) -> set[str]:
+    """Tables of the objects added, changed or deleted in the session's unit of work."""
+    return {
+        obj.__table__.name
+        for obj in (*session.new, *session.dirty, *session.deleted)
+        if hasattr(obj, "__table__")
+    }
+
+
+def _mark_written(session: Session, tables: set[str]) -> None:
+    if tables:
+        session.info.setdefault(_PENDING_KEY, set()).update(tables)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    _mark_written(session, _touched_tables(session))
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _do_orm_execute(orm_execute_state: ORMExecuteState) -> None:
+    # Bulk ORM update()/delete()/insert() statements bypass the unit of work
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _mark_written(orm_execute_state.session, {mapper.local_table.name})
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    # Invalidating at flush would let a concurrent reader re-cache the
+    # pre-commit state between the flush and the commit
+    tables = session.info.pop(_PENDING_KEY, None)
+    if tables:
+        tool_result_cache.invalidate_tables(tables)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session: Session) -> None:
+    session.info.pop(_PENDING_KEY, None)
@@ -0,0 +1,121 @@
+"""Tool result compactor - shrinks tool results before they are fed back to Claude.
+
+Every tool result is resent on each remaining ReAct iteration, so its size
+adds input tokens and latency to every later call. The compacted form drops
+null fields, rounds floats, truncates long lists (keeping the total count)
+and is capped at ``TOOL_RESULT_TOKEN_CAP`` tokens. The UI still gets the full
+result through the SSE ``tool_result`` event.
+"""
+import json
+import logging
+from dataclasses import dataclass, field
+
+from app.agents.context_builder import count_tokens
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Smallest list length tried when shrinking a result to fit the token cap
+MIN_LIST_ITEMS = 3
+
+
+@dataclass(frozen=True)
+class CompactionPolicy:
+    max_list_items: int = 20
+    float_digits: int = 2
+    list_limits: dict[str, int] = field(default_factory=dict)  # per-key overrides
+
+
+DEFAULT_POLICY = CompactionPolicy()
+
+TOOL_COMPACTION_POLICIES: dict[str, CompactionPolicy] = {
+    "check_inventory": CompactionPolicy(list_limits={"inventory_items": 30, "lots": 10, "expiry_alerts": 10}),
+    "compare_vendors": CompactionPolicy(list_limits={"comparisons": 15}),
+    "detect_price_risk": CompactionPolicy(list_limits={"risk_items": 15, "affected_menus": 10}),
+    "search_recipes": CompactionPolicy(list_limits={"rag_results": 5}),
+    "query_dashboard": CompactionPolicy(max_list_items=10),
+    # Recipes and work orders are only useful with every ingredient and step
+    "scale_recipe": CompactionPolicy(max_list_items=100),
+    "generate_work_order": CompactionPolicy(max_list_items=100),
+}
+
+
+def _truncated_marker(shown: int, total: int) -> str:
+    return f"... 외 {total - shown}건 생략 (총 {total}건)"
+
+
+def compact_value(value, policy: CompactionPolicy = DEFAULT_POLICY, scale: float = 1.0, key: str | None = None):
+    """Recursively drop None fields, round floats and truncate long lists.
+
+    ``scale`` shrinks every list limit proportionally (used to meet the token cap).
+    """
+    if isinstance(value, dict):
+        return {
+            k: compact_value(v, policy, scale, k)
+            for k, v in value.items()
+            if v is not None
+        }
+    if isinstance(value, (list, tuple)):
+        limit = policy.list_limits.get(key, policy.max_list_items)
+        limit = max(MIN_LIST_ITEMS, int(limit * scale))
+        items = [compact_value(v, policy, scale) for v in value[:limit]]
+        if len(value) > limit:
+            items.append(_truncated_marker(limit, len(value)))
+        return items
+    if isinstance(value, float):
+        return round(value, policy.float_digits)
+    return value
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str, separators=(",", ":"))
+
+
+class ToolResultCompactor:
+    """Serialize tool results for the model within a per-result token cap."""
+
+    def __init__(self, token_cap: int | None = None):
+        self.token_cap = token_cap or settings.tool_result_token_cap
+        self.results = 0
+        self.original_tokens = 0
+        self.compacted_tokens = 0
+
+    def compact(self, tool_name: str, result: dict) -> str:
+        """Compact JSON for a tool_result block."""
+        original = json.dumps(result, ensure_ascii=False, default=str)
+        if not settings.tool_compaction_enabled:
+            return original
+
+        policy = TOOL_COMPACTION_POLICIES.get(tool_name, DEFAULT_POLICY)
+        scale = 1.0
+        text = _dumps(compact_value(result, policy, scale))
+        tokens = count_tokens(text)
+        while tokens > self.token_cap and scale > 0.05:
+            scale /= 2
+            text = _dumps(compact_value(result, policy, scale))
+            tokens = count_tokens(text)
+
+        if tokens > self.token_cap:
+            # Still too large (long strings rather than long lists): hard cut
+            keep = int(len(text) * self.token_cap / tokens)
+            text = f"{text[:keep]}... (결과가 길어 일부만 표시, 원본 약 {tokens} 토큰)"
+            tokens = count_tokens(text)
+            logger.info(f"Tool result of {tool_name} hard-truncated to {self.token_cap} tokens")
+
+        self.results += 1
+        self.original_tokens += count_tokens(original)
+        self.compacted_tokens += tokens
+        return text
+
+    def stats(self) -> dict:
+        saved = self.original_tokens - self.compacted_tokens
+        return {
+            "results": self.results,
+            "original_tokens": self.original_tokens,
+            "compacted_tokens": self.compacted_tokens,
+            "saved_tokens": saved,
+            "saved_ratio": round(saved / self.original_tokens, 4) if self.original_tokens else 0.0,
+        }
+
+
+tool_result_compactor = ToolResultCompactor()
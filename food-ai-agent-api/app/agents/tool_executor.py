@@ -0,0 +1,117 @@
+"""Parallel tool executor - runs the tool_use blocks of one ReAct iteration concurrently."""
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.db.database import async_session_factory
+
+logger = logging.getLogger(__name__)
+
+# Tools that never add/flush/delete rows. They are safe to run concurrently,
+# each on its own pooled session. Everything else is treated as a write tool.
+READ_ONLY_TOOLS = frozenset({
+    "check_diversity",
+    "search_recipes",
+    "scale_recipe",
+    "generate_work_order",
+    "check_haccp_completion",
+    "generate_audit_report",
+    "query_dashboard",
+    "compare_vendors",
+    "detect_price_risk",
+    "suggest_alternatives",
+    "check_inventory",
+})
+
+ToolRunner = Callable[[str, dict, AsyncSession], Awaitable[dict]]
+
+
+@dataclass
+class ToolCall:
+    """A single tool_use block and, once executed, its result."""
+    id: str
+    name: str
+    input: dict
+    result: dict = field(default_factory=dict)
+    failed: bool = False
+
+    def to_tool_result_block(self, content: str) -> dict:
+        return {"type": "tool_result", "tool_use_id": self.id, "content": content}
+
+
+class ParallelToolExecutor:
+    """Schedule tool calls as their blocks close; collect results in one step.
+
+    Read-only tools start immediately on a dedicated session from the pool.
+    Write tools run one at a time, in submission order, on the request session
+    so they share its transaction. Once a write tool has been submitted in this
+    run, read-only tools also run on the request session (after the writes):
+    pooled sessions cannot see rows flushed there until the run commits.
+    """
+
+    def __init__(
+        self,
+        run_tool: ToolRunner,
+        db: AsyncSession,
+        session_factory: async_sessionmaker | None = None,
+    ):
+        self.run_tool = run_tool
+        self.db = db
+        self.session_factory = session_factory or async_session_factory
+        self._tasks: dict[asyncio.Task, ToolCall] = {}
+        self._write_lock = asyncio.Lock()
+        self._wrote = False  # a write tool ran (or is queued) on the request session
+
+    @staticmethod
+    def is_read_only(tool_name: str) -> bool:
+        return tool_name in READ_ONLY_TOOLS
+
+    def submit(self, call: ToolCall) -> None:
+        """Start executing a tool call without waiting for it."""
+        if self.is_read_only(call.name) and not self._wrote:
+            coro = self._run_read_only(call)
+        else:
+            self._wrote = self._wrote or not self.is_read_only(call.name)
+            coro = self._run_write(call)
+        self._tasks[asyncio.create_task(coro)] = call
+
+    async def as_completed(self):
+        """Yield submitted calls in completion order, then reset for the next iteration."""
+        pending = set(self._tasks)
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    yield self._tasks[task]
+        finally:
+            for task in pending:
+                task.cancel()
+            self._tasks.clear()
+
+    async def aclose(self) -> None:
+        """Cancel calls still running (the iteration was aborted) and wait for them."""
+        pending = [task for task in self._tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+    async def _run_read_only(self, call: ToolCall) -> None:
+        async with self.session_factory() as session:
+            await self._run(call, session)
+
+    async def _run_write(self, call: ToolCall) -> None:
+        async with self._write_lock:
+            await self._run(call, self.db)
+
+    async def _run(self, call: ToolCall, session: AsyncSession) -> None:
+        try:
+            # Handlers may pop/inject keys; keep the tool_use block input intact
+            call.result = await self.run_tool(call.name, dict(call.input), session)
+        except Exception as e:
+            logger.error(f"Tool execution error ({call.name}): {e}")
+            call.result = {"error": str(e)}
+            call.failed = True
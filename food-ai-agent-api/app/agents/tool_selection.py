@@ -0,0 +1,209 @@
+"""Per-turn tool subsetting - send Claude only the tools the turn needs.
+
+An agent advertises up to nine tool schemas on every ReAct iteration, while
+most intents need one or two of them (``inventory_check`` only needs
+``check_inventory``). Each intent maps to a core subset of its agent's tools,
+widened by the entities the router extracted (a ``recipe_id`` adds the recipe
+tools, a ``claim_id`` the claim tools, ...). Intents without an entry keep the
+full toolset.
+
+A subset always carries the small ``request_more_tools`` tool. If Claude calls
+it, or calls an agent tool outside the subset, the turn re-expands to the full
+agent toolset from the next iteration on. Schema tokens not sent are recorded
+per turn (audit log) and process-wide (``/chat/stats``).
+"""
+import json
+import logging
+from dataclasses import dataclass
+from functools import lru_cache
+
+from app.agents.context_builder import count_tokens
+from app.agents.intent_router import IntentResult
+from app.agents.tools.registry import ALL_TOOLS, get_tools_for_agent
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+EXPAND_TOOL_NAME = "request_more_tools"
+
+EXPAND_TOOL = {
+    "name": EXPAND_TOOL_NAME,
+    "description": (
+        "Call this if none of the listed tools can complete the request. "
+        "All tools of the current agent become available on the next step."
+    ),
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "reason": {"type": "string", "description": "What is missing"},
+        },
+    },
+}
+
+# Core tools per intent; intersected with the routed agent's tools
+INTENT_TOOLS: dict[str, tuple[str, ...]] = {
+    "menu_validate": ("validate_nutrition", "tag_allergens", "check_diversity"),
+    "recipe_search": ("search_recipes",),
+    "recipe_scale": ("search_recipes", "scale_recipe"),
+    "work_order": ("search_recipes", "generate_work_order"),
+    "haccp_checklist": ("generate_haccp_checklist", "check_haccp_completion"),
+    "haccp_record": ("check_haccp_completion",),
+    "haccp_incident": ("check_haccp_completion", "register_claim"),
+    "dashboard": ("query_dashboard",),
+    "settings": ("query_dashboard",),
+    "purchase_bom": ("calculate_bom", "check_inventory"),
+    "purchase_order": ("generate_purchase_order", "compare_vendors"),
+    "purchase_risk": ("detect_price_risk", "suggest_alternatives", "compare_vendors"),
+    "inventory_check": ("check_inventory",),
+    "inventory_receive": ("check_inventory",),
+    "forecast_demand": ("forecast_headcount",),
+    "record_actual": ("record_waste", "forecast_headcount"),
+    "optimize_cost": ("simulate_cost",),
+    "manage_claim": ("register_claim", "track_claim_action"),
+    "analyze_claim_root_cause": ("analyze_claim",),
+    "generate_quality_report": ("analyze_claim", "track_claim_action"),
+}
+
+# Router entity key fragment -> tools that act on that kind of entity
+ENTITY_TOOLS: dict[str, tuple[str, ...]] = {
+    "recipe": ("search_recipes", "scale_recipe", "generate_work_order"),
+    "menu_plan": ("validate_nutrition", "check_diversity", "calculate_bom", "simulate_cost"),
+    "bom": ("generate_purchase_order",),
+    "item": ("check_inventory", "compare_vendors", "suggest_alternatives"),
+    "vendor": ("compare_vendors",),
+    "claim": ("analyze_claim", "track_claim_action"),
+}
+
+_TOOLS_BY_NAME = {tool["name"]: tool for tool in (*ALL_TOOLS, EXPAND_TOOL)}
+
+
+@lru_cache(maxsize=None)
+def tool_tokens(name: str) -> int:
+    """Estimated prompt tokens of one tool definition."""
+    return count_tokens(json.dumps(_TOOLS_BY_NAME[name], ensure_ascii=False))
+
+
+_CACHEABLE_SUBSETS: dict[tuple[str, ...], list[dict]] = {}
+
+
+def _tool_list(names: tuple[str, ...], cacheable: bool) -> list[dict]:
+    """Tool definitions in ``names`` order, with a cache breakpoint on the last one."""
+    if not cacheable:
+        return [_TOOLS_BY_NAME[name] for name in names]
+    if names not in _CACHEABLE_SUBSETS:
+        tools = [dict(_TOOLS_BY_NAME[name]) for name in names]
+        if tools:
+            tools[-1]["cache_control"] = {"type": "ephemeral"}
+        _CACHEABLE_SUBSETS[names] = tools
+    return _CACHEABLE_SUBSETS[names]
+
+
+@dataclass
+class ToolSelection:
+    """The tools offered in one turn; starts as a subset, may re-expand once."""
+    agent_tools: tuple[str, ...]
+    subset: tuple[str, ...]
+    expanded: bool = False
+    subset_iterations: int = 0
+    full_iterations: int = 0
+    expand_reason: str | None = None
+
+    @property
+    def is_subset(self) -> bool:
+        return self.subset != self.agent_tools
+
+    @property
+    def names(self) -> tuple[str, ...]:
+        if self.expanded or not self.is_subset:
+            return self.agent_tools
+        return (*self.subset, EXPAND_TOOL_NAME)
+
+    def tools(self, cacheable: bool = False) -> list[dict]:
+        """Tool definitions for the next iteration (counted as sent)."""
+        if self.expanded or not self.is_subset:
+            self.full_iterations += 1
+        else:
+            self.subset_iterations += 1
+        return _tool_list(self.names, cacheable)
+
+    def offers(self, name: str) -> bool:
+        return name in self.names
+
+    def expand(self, reason: str) -> None:
+        if self.expanded or not self.is_subset:
+            return
+        self.expanded = True
+        self.expand_reason = reason
+        logger.info(f"Tool subset {self.subset} re-expanded to the full agent toolset: {reason}")
+
+    @property
+    def tokens_saved(self) -> int:
+        full = sum(map(tool_tokens, self.agent_tools))
+        subset = sum(map(tool_tokens, (*self.subset, EXPAND_TOOL_NAME)))
+        return max(full - subset, 0) * self.subset_iterations
+
+    def to_dict(self) -> dict:
+        return {
+            "subset": list(self.subset) if self.is_subset else None,
+            "expanded": self.expanded,
+            "expand_reason": self.expand_reason,
+            "subset_iterations": self.subset_iterations,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+def _entity_tools(entities: dict) -> set[str]:
+    names: set[str] = set()
+    for key, value in (entities or {}).items():
+        if value in (None, "", [], {}):
+            continue
+        key = str(key).lower()
+        for fragment, tools in ENTITY_TOOLS.items():
+            if fragment in key:
+                names.update(tools)
+    return names
+
+
+def select_tools(intent: IntentResult) -> ToolSelection:
+    """Tool selection for a routed turn (the full agent toolset when disabled or unmapped)."""
+    agent_tools = tuple(tool["name"] for tool in get_tools_for_agent(intent.agent))
+    core = INTENT_TOOLS.get(intent.intent)
+    if not settings.tool_subset_enabled or core is None:
+        return ToolSelection(agent_tools=agent_tools, subset=agent_tools)
+
+    wanted = set(core) | _entity_tools(intent.entities)
+    subset = tuple(name for name in agent_tools if name in wanted)
+    if not subset:
+        # Intent and agent disagree (e.g. LLM-chosen agent): offer everything
+        subset = agent_tools
+    return ToolSelection(agent_tools=agent_tools, subset=subset)
+
+
+class ToolSelectionStats:
+    """Process-wide tool subsetting outcomes and schema tokens saved."""
+
+    def __init__(self):
+        self.turns = 0
+        self.subset_turns = 0
+        self.expanded_turns = 0
+        self.tokens_saved = 0
+
+    def record(self, selection: ToolSelection) -> None:
+        self.turns += 1
+        if selection.is_subset:
+            self.subset_turns += 1
+        if selection.expanded:
+            self.expanded_turns += 1
+        self.tokens_saved += selection.tokens_saved
+
+    def stats(self) -> dict:
+        return {
+            "turns": self.turns,
+            "subset_turns": self.subset_turns,
+            "expanded_turns": self.expanded_turns,
+            "expansion_rate": round(self.expanded_turns / self.subset_turns, 4) if self.subset_turns else 0.0,
+            "tokens_saved": self.tokens_saved,
+        }
+
+
+tool_selection_stats = ToolSelectionStats()
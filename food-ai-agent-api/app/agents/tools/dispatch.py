@@ -0,0 +1,207 @@
+"""Compiled tool dispatch table - name -> handler, argument adapter, validator.
+
+Built once at import from the JSON schemas in ``registry.py``: each advertised
+tool gets a ``ToolSpec`` holding its handler, the argument renames between the
+schema and the handler signature, whether the current site is injected, which
+keyword receives the acting user's id, and an input validator compiled from
+its ``input_schema``. Per call the orchestrator only does a dict lookup and
+runs the validator. Import fails if a schema advertises a tool without a
+handler, or an argument the handler does not accept.
+"""
+import inspect
+import logging
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from uuid import UUID
+
+from app.agents.tools import (
+    dashboard_tools,
+    demand_tools,
+    haccp_tools,
+    menu_tools,
+    purchase_tools,
+    recipe_tools,
+    work_order_tools,
+)
+from app.agents.tools.registry import ALL_TOOLS
+
+logger = logging.getLogger(__name__)
+
+# Handler keywords that record who triggered a write
+USER_KWARGS = ("created_by", "generated_by", "recorded_by")
+
+# tool name -> (handler, {schema field: handler keyword})
+TOOL_HANDLERS: dict[str, tuple[Callable[..., Awaitable[dict]], dict[str, str]]] = {
+    "generate_menu_plan": (menu_tools.generate_menu_plan, {}),
+    "validate_nutrition": (menu_tools.validate_nutrition, {}),
+    "tag_allergens": (menu_tools.tag_allergens, {}),
+    "check_diversity": (menu_tools.check_diversity, {}),
+    "search_recipes": (recipe_tools.search_recipes, {}),
+    "scale_recipe": (recipe_tools.scale_recipe, {}),
+    "generate_work_order": (work_order_tools.generate_work_order, {}),
+    "generate_haccp_checklist": (haccp_tools.generate_haccp_checklist, {"date": "date_str"}),
+    "check_haccp_completion": (haccp_tools.check_haccp_completion, {"date": "date_str"}),
+    "generate_audit_report": (haccp_tools.generate_audit_report, {}),
+    "query_dashboard": (dashboard_tools.query_dashboard, {"date": "date_str"}),
+    "calculate_bom": (purchase_tools.calculate_bom, {}),
+    "generate_purchase_order": (purchase_tools.generate_purchase_order, {}),
+    "compare_vendors": (purchase_tools.compare_vendors, {}),
+    "detect_price_risk": (purchase_tools.detect_price_risk, {}),
+    "suggest_alternatives": (purchase_tools.suggest_alternatives, {}),
+    "check_inventory": (purchase_tools.check_inventory, {}),
+    "forecast_headcount": (demand_tools.forecast_headcount, {}),
+    "record_waste": (demand_tools.record_waste, {}),
+    "simulate_cost": (demand_tools.simulate_cost, {"suggest_alternatives": "suggest_alternatives_flag"}),
+    "register_claim": (demand_tools.register_claim, {}),
+    "analyze_claim": (demand_tools.analyze_claim, {}),
+    "track_claim_action": (demand_tools.track_claim_action, {}),
+}
+
+
+class ToolInputError(ValueError):
+    """Tool input does not match the tool's input_schema."""
+
+
+Validator = Callable[[object, str], object]
+
+
+def _check_uuid(value: str) -> None:
+    UUID(value)
+
+
+_FORMAT_CHECKS: dict[str, Callable[[str], object]] = {
+    "uuid": _check_uuid,
+    "date": date.fromisoformat,
+    "date-time": datetime.fromisoformat,
+}
+
+
+def _compile(schema: dict) -> Validator:
+    """Compile a JSON schema fragment into ``validate(value, path) -> value``.
+
+    Supports the subset the registry uses: object (properties, required,
+    defaults; unknown keys are dropped), array (items), string (enum, format),
+    integer, number and boolean.
+    """
+    kind = schema.get("type")
+    enum = frozenset(schema["enum"]) if "enum" in schema else None
+
+    if kind == "object":
+        properties = {name: _compile(prop) for name, prop in schema.get("properties", {}).items()}
+        defaults = {
+            name: prop["default"]
+            for name, prop in schema.get("properties", {}).items()
+            if "default" in prop
+        }
+        required = tuple(schema.get("required", ()))
+
+        def validate_object(value, path):
+            if not isinstance(value, dict):
+                raise ToolInputError(f"{path or 'input'}: expected object")
+            if not properties:  # free-form object, e.g. preferences
+                return value
+            missing = [name for name in required if value.get(name) is None]
+            if missing:
+                raise ToolInputError(f"{path or 'input'}: missing required field(s) {', '.join(missing)}")
+            result = dict(defaults)
+            for name, item in value.items():
+                if name not in properties:
+                    logger.debug(f"Dropping unknown tool argument {path}{name}")
+                    continue
+                if item is None:
+                    continue
+                result[name] = properties[name](item, f"{path}{name}.")
+            return result
+
+        return validate_object
+
+    if kind == "array":
+        items = _compile(schema.get("items", {}))
+
+        def validate_array(value, path):
+            if not isinstance(value, list):
+                raise ToolInputError(f"{path.rstrip('.')}: expected array")
+            return [items(item, f"{path}{i}.") for i, item in enumerate(value)]
+
+        return validate_array
+
+    def check_scalar(value, path):
+        name = path.rstrip(".")
+        if kind == "string" and not isinstance(value, str):
+            raise ToolInputError(f"{name}: expected string")
+        # bool is an int subclass; JSON true/false is never a number here
+        if kind == "integer" and (isinstance(value, bool) or not isinstance(value, int)):
+            raise ToolInputError(f"{name}: expected integer")
+        if kind == "number" and (isinstance(value, bool) or not isinstance(value, int | float)):
+            raise ToolInputError(f"{name}: expected number")
+        if kind == "boolean" and not isinstance(value, bool):
+            raise ToolInputError(f"{name}: expected boolean")
+        if enum is not None and value not in enum:
+            raise ToolInputError(f"{name}: must be one of {', '.join(map(str, sorted(enum)))}")
+        check_format = _FORMAT_CHECKS.get(schema.get("format", ""))
+        if check_format is not None:
+            try:
+                check_format(value)
+            except ValueError:
+                raise ToolInputError(f"{name}: invalid {schema['format']} {value!r}") from None
+        return value
+
+    return check_scalar
+
+
+def compile_validator(schema: dict) -> Callable[[dict], dict]:
+    """Validator for a tool ``input_schema``: returns the cleaned input or raises ToolInputError."""
+    validate = _compile(schema)
+    return lambda tool_input: validate(tool_input, "")
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """Everything needed to execute one tool, precomputed from its schema."""
+    name: str
+    handler: Callable[..., Awaitable[dict]]
+    validate: Callable[[dict], dict]
+    renames: dict[str, str] = field(default_factory=dict)
+    user_kwarg: str | None = None
+    injects_site: bool = False
+
+    def bind(self, tool_input: dict, site_id: UUID, user_id: UUID) -> dict:
+        """Validated handler kwargs (without ``db``) for one call."""
+        if self.injects_site and not tool_input.get("site_id"):
+            tool_input = {**tool_input, "site_id": str(site_id)}
+        args = self.validate(tool_input)
+        kwargs = {self.renames.get(name, name): value for name, value in args.items()}
+        if self.user_kwarg:
+            kwargs[self.user_kwarg] = user_id
+        return kwargs
+
+
+def _build_spec(tool: dict) -> ToolSpec:
+    name = tool["name"]
+    if name not in TOOL_HANDLERS:
+        raise RuntimeError(f"Tool {name} is advertised in the registry but has no handler")
+    handler, renames = TOOL_HANDLERS[name]
+    schema = tool["input_schema"]
+    params = inspect.signature(handler).parameters
+    unknown = [
+        field_name for field_name in schema.get("properties", {})
+        if renames.get(field_name, field_name) not in params
+    ]
+    if unknown:
+        raise RuntimeError(f"Tool {name}: handler does not accept {', '.join(unknown)}")
+    return ToolSpec(
+        name=name,
+        handler=handler,
+        validate=compile_validator(schema),
+        renames=renames,
+        user_kwarg=next((kw for kw in USER_KWARGS if kw in params), None),
+        injects_site="site_id" in schema.get("properties", {}),
+    )
+
+
+TOOL_SPECS: dict[str, ToolSpec] = {tool["name"]: _build_spec(tool) for tool in ALL_TOOLS}
+
+
+def get_tool_spec(name: str) -> ToolSpec | None:
+    return TOOL_SPECS.get(name)
@@ -26,18 +26,109 @@ class Settings(BaseSettings):
     anthropic_api_key: str = ""
     claude_model: str = "claude-sonnet-4-6"
     claude_max_tokens: int = 4096
+    claude_prompt_caching: bool = True
+
+    # Chat history: verbatim window budget + rolling summary of older turns
+    chat_history_token_budget: int = 6000
+    chat_summary_max_tokens: int = 600
+
+    # Background persistence of conversation turns and audit logs
+    persistence_writer_enabled: bool = True
+    persistence_queue_size: int = 1000
+    persistence_batch_size: int = 50
+    persistence_flush_interval_ms: int = 200
+    persistence_enqueue_timeout_ms: int = 1000
+    persistence_durable: bool = True  # flush queued writes on shutdown
+
+    # Agent tool result cache (read-only tools only)
+    tool_cache_enabled: bool = True
+    tool_cache_max_entries: int = 1000
+    # Offer only the intent's tools per turn (re-expanded on demand)
+    tool_subset_enabled: bool = True
+
+    # Tool results fed back to Claude: compacted JSON, capped per result
+    tool_compaction_enabled: bool = True
+    tool_result_token_cap: int = 2000
+
+    # Intent routing - local fast path before the LLM classifier
+    intent_local_enabled: bool = True
+    intent_local_threshold: float = 0.75
 
     # OpenAI (Embeddings)
     openai_api_key: str = ""
     embedding_model: str = "text-embedding-3-small"
     embedding_dimension: int = 1536
 
+    # LLM backend: live | replay (offline cassette) | record (live + save to cassette)
+    llm_backend: str = "live"
+    llm_cassette_path: str = "scripts/fixtures/chat_cassette.json"
+    llm_replay_latency_ms: int = 0  # per call / time to first token
+    llm_replay_chunk_ms: int = 0  # per streamed text chunk
+    embedding_replay_latency_ms: int = 0
+
+    # Shared LLM/embedding HTTP connection pools
+    llm_http_max_connections: int = 100
+    llm_http_max_keepalive: int = 20
+    llm_http_keepalive_expiry: float = 30.0
+    llm_http_timeout: float = 120.0
+    llm_http_connect_timeout: float = 5.0
+
+    # Admission control for outbound LLM/embedding calls (0 rate = unlimited)
+    llm_admission_enabled: bool = True
+    llm_queue_timeout_s: float = 20.0
+    llm_max_retries: int = 3  # on 408/409/429/5xx and connection errors, with jittered backoff
+    llm_retry_base_s: float = 0.5
+    llm_retry_max_s: float = 8.0
+    anthropic_max_concurrency: int = 32
+    anthropic_site_concurrency: int = 4
+    anthropic_rate_per_sec: float = 0.0
+    anthropic_rate_burst: int = 10
+    openai_max_concurrency: int = 32
+    openai_site_concurrency: int = 8
+    openai_rate_per_sec: float = 0.0
+    openai_rate_burst: int = 20
+
+    # LLM usage accounting: USD per million tokens overrides, e.g.
+    # {"claude-sonnet-4-6": {"input": 3, "output": 15, "cache_write": 3.75, "cache_read": 0.3}}
+    llm_pricing: dict[str, dict] = {}
+    # Daily per-site budgets (0 = off): soft downgrades runs, hard refuses them.
+    # Per-site overrides: {"<site_id>": {"soft": 5.0, "hard": 10.0}}
+    llm_site_daily_soft_budget_usd: float = 0.0
+    llm_site_daily_hard_budget_usd: float = 0.0
+    llm_site_budgets: dict[str, dict] = {}
+    llm_budget_timezone: str = "Asia/Seoul"
+    llm_budget_refresh_s: int = 60
+    llm_budget_soft_top_k: int = 2
+
+    # Resumable chat runs (SSE events buffered per run for Last-Event-ID reattach)
+    chat_run_ttl_s: int = 300  # finished runs stay replayable this long
+    chat_run_buffer_events: int = 4096
+    chat_heartbeat_s: float = 15.0
+
     # RAG
     rag_chunk_size: int = 1000
     rag_chunk_overlap: int = 200
     rag_top_k: int = 5
     rag_keyword_weight: float = 0.3
     rag_vector_weight: float = 0.7
+    # "python": concurrent keyword/vector legs fused in Python;
+    # "sql" (opt-in, PostgreSQL only): candidate selection and RRF fusion in
+    # one statement - benchmark it against "python" before enabling
+    rag_fusion_mode: str = "python"
+    # Speculative retrieval on the raw message while routing runs; reused when
+    # the rewritten query is a near-duplicate (cosine >= threshold)
+    rag_speculative_enabled: bool = True
+    rag_speculative_similarity: float = 0.92
+    # Per-intent overrides of the retrieval policy, e.g. {"dashboard": {"skip": false}}
+    rag_intent_policies: dict[str, dict] = {}
+    # pgvector HNSW index on recipe_documents.embedding: build parameters are
+    # read by migration 007, ef_search (candidate list, recall vs latency) is
+    # set per vector query. pgvector >= 0.8 only: "relaxed_order" makes
+    # doc_type-filtered scans keep going until LIMIT rows are found.
+    rag_hnsw_m: int = 16
+    rag_hnsw_ef_construction: int = 64
+    rag_hnsw_ef_search: int = 64
+    rag_hnsw_iterative_scan: str = ""
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
@@ -0,0 +1,314 @@
+"""Admission control for outbound LLM / embedding calls.
+
+Every call through the shared clients takes a slot from its provider's
+limiter before it goes out:
+
+1. a per-site concurrency slot, so one busy site cannot take every slot
+2. a global concurrency slot
+3. a token from a token bucket (requests per second, with burst)
+
+Callers wait in line for at most ``LLM_QUEUE_TIMEOUT_S`` and then get
+``AdmissionTimeout``. The SDK clients do not retry on their own; errors the
+SDKs would retry (408, 409, 429, 5xx incl. 529 overload, connection errors
+and timeouts) are retried here with full-jitter exponential backoff (or the
+server's Retry-After), releasing the slot while backing off. Streams hold
+their slot until closed.
+
+The site is taken from the request context (``bind_site``), so deep call
+sites such as the embedder need no extra parameters.
+"""
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import ContextVar
+
+import anthropic
+import openai
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Statuses the SDKs' own retry loop retries (plus every 5xx)
+RETRYABLE_STATUS = frozenset({408, 409, 429})
+# Rate limit / overload: once past the retries, the caller answers "busy"
+OVERLOAD_STATUS = frozenset({429, 529})
+CONNECTION_ERRORS = (anthropic.APIConnectionError, openai.APIConnectionError)  # incl. timeouts
+
+_current_site: ContextVar[str | None] = ContextVar("llm_site", default=None)
+
+
+class AdmissionTimeout(Exception):
+    """No LLM call slot became available within the queue timeout."""
+
+    def __init__(self, provider: str, waited: float):
+        super().__init__(f"{provider} admission timed out after {waited:.1f}s")
+        self.provider = provider
+        self.waited = waited
+
+
+def bind_site(site_id) -> None:
+    """Attribute LLM calls made in the current context to a site."""
+    _current_site.set(str(site_id) if site_id else None)
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Same rules as the SDKs' ``_should_retry``, which is disabled under admission control."""
+    if isinstance(exc, CONNECTION_ERRORS):
+        return True
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    should_retry = headers.get("x-should-retry")
+    if should_retry in ("true", "false"):
+        return should_retry == "true"
+    status = getattr(exc, "status_code", None)
+    return isinstance(status, int) and (status in RETRYABLE_STATUS or status >= 500)
+
+
+def is_overloaded(exc: BaseException) -> bool:
+    """No slot in time, or a 429/529 that outlasted the retries: the caller should answer "busy"."""
+    return isinstance(exc, AdmissionTimeout) or getattr(exc, "status_code", None) in OVERLOAD_STATUS
+
+
+def _retry_after(exc: Exception) -> float | None:
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Requests-per-second limiter; ``rate <= 0`` disables it."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ProviderLimiter:
+    """Concurrency caps, rate limit, queue timeout and retry for one provider."""
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int,
+        site_concurrency: int,
+        rate_per_sec: float = 0.0,
+        burst: int = 1,
+        queue_timeout: float | None = None,
+        max_retries: int | None = None,
+    ):
+        self.name = name
+        self.site_concurrency = site_concurrency
+        self.queue_timeout = queue_timeout or settings.llm_queue_timeout_s
+        self.max_retries = settings.llm_max_retries if max_retries is None else max_retries
+        self._global = asyncio.Semaphore(max_concurrency)
+        self._sites: dict[str, asyncio.Semaphore] = {}
+        self._bucket = TokenBucket(rate_per_sec, burst)
+
+        self.waiting = 0
+        self.in_flight = 0
+        self.admitted = 0
+        self.timeouts = 0
+        self.retries = 0
+        self._waits: deque[float] = deque(maxlen=1000)
+        self.max_wait_ms = 0.0
+
+    def _site_semaphore(self, site: str | None) -> asyncio.Semaphore | None:
+        if site is None:
+            return None
+        if site not in self._sites:
+            self._sites[site] = asyncio.Semaphore(self.site_concurrency)
+        return self._sites[site]
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one admitted call slot for the duration of the block."""
+        started = time.monotonic()
+        held: list[asyncio.Semaphore] = []
+
+        async def acquire():
+            for semaphore in (self._site_semaphore(_current_site.get()), self._global):
+                if semaphore is not None:
+                    await semaphore.acquire()
+                    held.append(semaphore)
+            await self._bucket.acquire()
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            for semaphore in held:
+                semaphore.release()
+            self.timeouts += 1
+            waited = time.monotonic() - started
+            logger.warning(f"LLM admission timeout ({self.name}, site={_current_site.get()}, waited={waited:.1f}s)")
+            raise AdmissionTimeout(self.name, waited) from None
+        except BaseException:
+            for semaphore in held:
+                semaphore.release()
+            raise
+        finally:
+            self.waiting -= 1
+
+        wait_ms = (time.monotonic() - started) * 1000
+        self._waits.append(wait_ms)
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.admitted += 1
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            for semaphore in reversed(held):
+                semaphore.release()
+
+    def backoff(self, attempt: int, exc: Exception) -> float:
+        """Delay before retry ``attempt`` (0-based): Retry-After, else full jitter."""
+        self.retries += 1
+        delay = _retry_after(exc)
+        if delay is None:
+            delay = random.uniform(0, min(settings.llm_retry_max_s, settings.llm_retry_base_s * 2 ** attempt))
+        error = getattr(exc, "status_code", None) or type(exc).__name__
+        logger.info(f"{self.name} returned {error}, retry {attempt + 1} in {delay:.2f}s")
+        return delay
+
+    async def call(self, fn):
+        """Run ``await fn()`` inside a slot, retrying transient provider errors."""
+        for attempt in range(self.max_retries + 1):
+            try:
+                async with self.slot():
+                    return await fn()
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self.backoff(attempt, e)
+            await asyncio.sleep(delay)
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "admitted": self.admitted,
+            "timeouts": self.timeouts,
+            "retries": self.retries,
+            "wait_ms_avg": round(sum(waits) / len(waits), 1) if waits else 0.0,
+            "wait_ms_p95": round(waits[int(0.95 * (len(waits) - 1))], 1) if waits else 0.0,
+            "wait_ms_max": round(self.max_wait_ms, 1),
+        }
+
+
+class _AdmittedStream:
+    """``messages.stream`` manager that holds a slot until the stream is closed."""
+
+    def __init__(self, client, limiter: ProviderLimiter, kwargs: dict):
+        self._client = client
+        self._limiter = limiter
+        self._kwargs = kwargs
+        self._stack: AsyncExitStack | None = None
+
+    async def __aenter__(self):
+        for attempt in range(self._limiter.max_retries + 1):
+            stack = AsyncExitStack()
+            await stack.enter_async_context(self._limiter.slot())
+            try:
+                stream = await stack.enter_async_context(self._client.messages.stream(**self._kwargs))
+            except Exception as e:
+                await stack.aclose()
+                if not is_retryable(e) or attempt == self._limiter.max_retries:
+                    raise
+                await asyncio.sleep(self._limiter.backoff(attempt, e))
+                continue
+            self._stack = stack
+            return stream
+
+    async def __aexit__(self, *exc):
+        stack, self._stack = self._stack, None
+        return await stack.__aexit__(*exc)
+
+
+class _AdmittedMessages:
+    def __init__(self, client, limiter: ProviderLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    async def create(self, **kwargs):
+        return await self._limiter.call(lambda: self._client.messages.create(**kwargs))
+
+    def stream(self, **kwargs) -> _AdmittedStream:
+        return _AdmittedStream(self._client, self._limiter, kwargs)
+
+
+class AdmittedAnthropic:
+    """Anthropic client wrapper routing every call through a limiter."""
+
+    def __init__(self, client, limiter: ProviderLimiter):
+        self._client = client
+        self.limiter = limiter
+        self.messages = _AdmittedMessages(client, limiter)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class _AdmittedEmbeddings:
+    def __init__(self, client, limiter: ProviderLimiter):
+        self._client = client
+        self._limiter = limiter
+
+    async def create(self, **kwargs):
+        return await self._limiter.call(lambda: self._client.embeddings.create(**kwargs))
+
+
+class AdmittedOpenAI:
+    """OpenAI client wrapper routing embedding calls through a limiter."""
+
+    def __init__(self, client, limiter: ProviderLimiter):
+        self._client = client
+        self.limiter = limiter
+        self.embeddings = _AdmittedEmbeddings(client, limiter)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+llm_limiters: dict[str, ProviderLimiter] = {
+    "anthropic": ProviderLimiter(
+        "anthropic",
+        max_concurrency=settings.anthropic_max_concurrency,
+        site_concurrency=settings.anthropic_site_concurrency,
+        rate_per_sec=settings.anthropic_rate_per_sec,
+        burst=settings.anthropic_rate_burst,
+    ),
+    "openai": ProviderLimiter(
+        "openai",
+        max_concurrency=settings.openai_max_concurrency,
+        site_concurrency=settings.openai_site_concurrency,
+        rate_per_sec=settings.openai_rate_per_sec,
+        burst=settings.openai_rate_burst,
+    ),
+}
+
+
+def admission_stats() -> dict:
+    return {name: limiter.stats() for name, limiter in llm_limiters.items()}
@@ -0,0 +1,134 @@
+"""Process-wide LLM and embedding clients.
+
+One Anthropic and one OpenAI client are shared by every request, so their
+httpx connection pools (and TLS sessions) are reused across chat turns.
+``init_llm_clients()`` / ``close_llm_clients()`` are called from the FastAPI
+lifespan handler; outside the app (scripts, tests) the getters create the
+clients lazily on first use.
+
+``LLM_BACKEND`` selects what callers get:
+
+- ``live``   - the real ``AsyncAnthropic`` / ``AsyncOpenAI`` SDK clients
+- ``replay`` - offline stand-ins answering from ``LLM_CASSETTE_PATH`` with
+  ``LLM_REPLAY_LATENCY_MS`` / ``LLM_REPLAY_CHUNK_MS`` artificial latency
+- ``record`` - live clients whose Anthropic responses are appended to the cassette
+
+Every client reports token usage to the current run's meter (see
+``app.llm.usage``). With ``LLM_ADMISSION_ENABLED`` it is also wrapped by the
+admission limiter of its provider (see ``app.llm.admission``).
+"""
+import logging
+from functools import lru_cache
+
+import anthropic
+import httpx
+import openai
+from anthropic import AsyncAnthropic
+from openai import AsyncOpenAI
+
+from app.config import settings
+from app.llm.admission import AdmittedAnthropic, AdmittedOpenAI, llm_limiters
+from app.llm.replay import Cassette, RecordingAnthropic, ReplayAnthropic, ReplayOpenAI
+from app.llm.usage import MeteredAnthropic, MeteredOpenAI
+
+logger = logging.getLogger(__name__)
+
+_anthropic_client = None
+_openai_client = None
+
+
+@lru_cache(maxsize=1)
+def get_cassette() -> Cassette:
+    return Cassette(settings.llm_cassette_path)
+
+
+def _http_options() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=settings.llm_http_max_connections,
+            max_keepalive_connections=settings.llm_http_max_keepalive,
+            keepalive_expiry=settings.llm_http_keepalive_expiry,
+        ),
+        "timeout": httpx.Timeout(settings.llm_http_timeout, connect=settings.llm_http_connect_timeout),
+    }
+
+
+def _sdk_max_retries() -> int:
+    # With admission control the limiter owns retries (and frees the slot while backing off)
+    return 0 if settings.llm_admission_enabled else 2
+
+
+def _create_anthropic_client():
+    if settings.llm_backend == "replay":
+        client = ReplayAnthropic(
+            get_cassette(),
+            latency_ms=settings.llm_replay_latency_ms,
+            chunk_ms=settings.llm_replay_chunk_ms,
+        )
+    else:
+        client = AsyncAnthropic(
+            api_key=settings.anthropic_api_key,
+            max_retries=_sdk_max_retries(),
+            http_client=anthropic.DefaultAsyncHttpxClient(**_http_options()),
+        )
+        if settings.llm_backend == "record":
+            client = RecordingAnthropic(client, get_cassette())
+    client = MeteredAnthropic(client)
+    if settings.llm_admission_enabled:
+        client = AdmittedAnthropic(client, llm_limiters["anthropic"])
+    return client
+
+
+def _create_openai_client():
+    if settings.llm_backend == "replay":
+        client = ReplayOpenAI(latency_ms=settings.embedding_replay_latency_ms)
+    else:
+        client = AsyncOpenAI(
+            api_key=settings.openai_api_key,
+            max_retries=_sdk_max_retries(),
+            http_client=openai.DefaultAsyncHttpxClient(**_http_options()),
+        )
+    client = MeteredOpenAI(client)
+    if settings.llm_admission_enabled:
+        client = AdmittedOpenAI(client, llm_limiters["openai"])
+    return client
+
+
+def get_anthropic_client():
+    """Shared client exposing the ``AsyncAnthropic`` messages API for the configured backend."""
+    global _anthropic_client
+    if _anthropic_client is None:
+        _anthropic_client = _create_anthropic_client()
+    return _anthropic_client
+
+
+def get_openai_client():
+    """Shared client exposing the ``AsyncOpenAI`` embeddings API for the configured backend."""
+    global _openai_client
+    if _openai_client is None:
+        _openai_client = _create_openai_client()
+    return _openai_client
+
+
+def init_llm_clients() -> None:
+    """Create the shared clients up front (application startup)."""
+    get_anthropic_client()
+    get_openai_client()
+    logger.info(
+        f"LLM clients ready (backend={settings.llm_backend}, "
+        f"max_connections={settings.llm_http_max_connections})"
+    )
+
+
+async def close_llm_clients() -> None:
+    """Close the shared clients and their connection pools (application shutdown)."""
+    global _anthropic_client, _openai_client
+    for client in (_anthropic_client, _openai_client):
+        if client is None:
+            continue
+        try:
+            await client.close()
+        except Exception as e:
+            logger.warning(f"Closing LLM client failed: {e}")
+    _anthropic_client = None
+    _openai_client = None
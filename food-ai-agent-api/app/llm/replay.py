@@ -0,0 +1,310 @@
+"""Offline record/replay stand-ins for the Anthropic and OpenAI clients.
+
+``ReplayAnthropic`` and ``ReplayOpenAI`` expose the subset of the SDK surface
+this app uses (``messages.create``, ``messages.stream``,
+``embeddings.create``) and answer from a JSON cassette with configurable
+artificial latency, so the agent loop can be exercised and benchmarked
+without API keys or network access.
+
+``RecordingAnthropic`` wraps a live client and appends every response to the
+cassette, which can then be replayed.
+
+Cassette format::
+
+    {
+      "messages": [
+        {"kind": "create" | "stream", "key": "<exact request hash>",
+         "turn": "<last user text>", "iteration": 0, "response": {<Message>}}
+      ],
+      "defaults": {"create": {<Message>}, "stream": {<Message>}}
+    }
+
+A request is answered by, in order: the recording with the same exact key,
+one with the same (kind, last user text, iteration), the next recording of
+the same (kind, iteration) in round-robin, and finally the cassette default.
+Embeddings are deterministic pseudo-random unit vectors derived from the text.
+"""
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import math
+import random
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+from anthropic.types import Message
+from openai.types import CreateEmbeddingResponse
+
+logger = logging.getLogger(__name__)
+
+# Text deltas are replayed in chunks of this many characters
+STREAM_CHUNK_CHARS = 16
+
+DEFAULT_CREATE_TEXT = json.dumps({
+    "intent": "general",
+    "confidence": 0.5,
+    "entities": {},
+    "agent": "general",
+    "search_query": "",
+}, ensure_ascii=False)
+DEFAULT_STREAM_TEXT = "(replay) 녹화된 응답이 없어 기본 응답을 반환합니다."
+
+
+def _message(data: dict) -> Message:
+    """Build an SDK Message from a (possibly partial) recorded response."""
+    return Message.model_validate({
+        "id": "msg_replay",
+        "type": "message",
+        "role": "assistant",
+        "model": "replay",
+        "stop_sequence": None,
+        "stop_reason": "end_turn",
+        "usage": {"input_tokens": 0, "output_tokens": 0},
+        **data,
+    })
+
+
+def _text_message(text: str) -> dict:
+    return {"content": [{"type": "text", "text": text}], "stop_reason": "end_turn"}
+
+
+def _last_user_text(messages: list[dict]) -> str:
+    for message in reversed(messages):
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            return message["content"]
+    return ""
+
+
+def _iteration(messages: list[dict]) -> int:
+    """ReAct iteration: assistant tool rounds since the last plain user message."""
+    count = 0
+    for message in reversed(messages):
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            break
+        if message.get("role") == "assistant":
+            count += 1
+    return count
+
+
+def request_key(kind: str, kwargs: dict) -> str:
+    """Exact match key. The system prompt is left out: it embeds DB/RAG state."""
+    payload = {
+        "kind": kind,
+        "messages": kwargs.get("messages", []),
+        "tools": [t.get("name") for t in kwargs.get("tools") or []],
+        "max_tokens": kwargs.get("max_tokens"),
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+class Cassette:
+    """Recorded LLM responses loaded from / saved to a JSON file."""
+
+    def __init__(self, path: str | None = None):
+        self.path = Path(path) if path else None
+        self.entries: list[dict] = []
+        self.defaults: dict[str, dict] = {}
+        if self.path and self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.entries = data.get("messages", [])
+            self.defaults = data.get("defaults", {})
+        self._by_key = {e["key"]: e for e in self.entries if e.get("key")}
+        self._by_turn = {(e["kind"], e.get("turn"), e.get("iteration", 0)): e for e in self.entries}
+        by_iteration: dict[tuple, list[dict]] = defaultdict(list)
+        for entry in self.entries:
+            by_iteration[(entry["kind"], entry.get("iteration", 0))].append(entry)
+        self._round_robin = {k: itertools.cycle(v) for k, v in by_iteration.items()}
+        self.hits: dict[str, int] = defaultdict(int)
+
+    def lookup(self, kind: str, kwargs: dict) -> dict:
+        messages = kwargs.get("messages", [])
+        iteration = _iteration(messages)
+        entry = self._by_key.get(request_key(kind, kwargs))
+        match = "exact"
+        if entry is None:
+            entry = self._by_turn.get((kind, _last_user_text(messages), iteration))
+            match = "turn"
+        if entry is None and (kind, iteration) in self._round_robin:
+            entry = next(self._round_robin[(kind, iteration)])
+            match = "round_robin"
+        self.hits[match if entry else "default"] += 1
+        if entry is not None:
+            return entry["response"]
+        default = self.defaults.get(kind)
+        if default:
+            return default
+        return _text_message(DEFAULT_CREATE_TEXT if kind == "create" else DEFAULT_STREAM_TEXT)
+
+    def record(self, kind: str, kwargs: dict, response: dict) -> None:
+        messages = kwargs.get("messages", [])
+        entry = {
+            "kind": kind,
+            "key": request_key(kind, kwargs),
+            "turn": _last_user_text(messages),
+            "iteration": _iteration(messages),
+            "response": response,
+        }
+        self.entries.append(entry)
+        self._by_key[entry["key"]] = entry
+        self._by_turn[(kind, entry["turn"], entry["iteration"])] = entry
+        if self.path:
+            self.save()
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(
+            {"messages": self.entries, "defaults": self.defaults},
+            ensure_ascii=False, indent=2, default=str,
+        ), encoding="utf-8")
+        tmp.replace(self.path)
+
+
+class _ReplayStream:
+    """Async context manager mimicking ``AsyncMessageStreamManager``."""
+
+    def __init__(self, message: Message, latency: float, chunk_latency: float):
+        self._message = message
+        self._latency = latency
+        self._chunk_latency = chunk_latency
+
+    async def __aenter__(self):
+        await asyncio.sleep(self._latency)  # time to first token
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for block in self._message.content:
+            if block.type == "text":
+                for i in range(0, len(block.text), STREAM_CHUNK_CHARS):
+                    if self._chunk_latency:
+                        await asyncio.sleep(self._chunk_latency)
+                    yield SimpleNamespace(type="text", text=block.text[i:i + STREAM_CHUNK_CHARS])
+            yield SimpleNamespace(type="content_block_stop", content_block=block)
+
+    async def get_final_message(self) -> Message:
+        return self._message
+
+
+class _ReplayMessages:
+    def __init__(self, cassette: Cassette, latency_ms: int, chunk_ms: int):
+        self.cassette = cassette
+        self.latency = latency_ms / 1000
+        self.chunk_latency = chunk_ms / 1000
+
+    async def create(self, **kwargs) -> Message:
+        message = _message(self.cassette.lookup("create", kwargs))
+        await asyncio.sleep(self.latency)
+        return message
+
+    def stream(self, **kwargs) -> _ReplayStream:
+        message = _message(self.cassette.lookup("stream", kwargs))
+        return _ReplayStream(message, self.latency, self.chunk_latency)
+
+
+class ReplayAnthropic:
+    """Drop-in for ``AsyncAnthropic`` answering from a cassette."""
+
+    def __init__(self, cassette: Cassette, latency_ms: int = 0, chunk_ms: int = 0):
+        self.cassette = cassette
+        self.messages = _ReplayMessages(cassette, latency_ms, chunk_ms)
+
+    async def close(self) -> None:
+        pass
+
+
+class _RecordingStream:
+    def __init__(self, manager, cassette: Cassette, kwargs: dict):
+        self._manager = manager
+        self._cassette = cassette
+        self._kwargs = kwargs
+        self._stream = None
+
+    async def __aenter__(self):
+        self._stream = await self._manager.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._manager.__aexit__(*exc)
+
+    def __aiter__(self):
+        return self._stream.__aiter__()
+
+    async def get_final_message(self):
+        message = await self._stream.get_final_message()
+        self._cassette.record("stream", self._kwargs, message.model_dump(exclude_none=True))
+        return message
+
+
+class _RecordingMessages:
+    def __init__(self, client, cassette: Cassette):
+        self._client = client
+        self._cassette = cassette
+
+    async def create(self, **kwargs):
+        message = await self._client.messages.create(**kwargs)
+        self._cassette.record("create", kwargs, message.model_dump(exclude_none=True))
+        return message
+
+    def stream(self, **kwargs) -> _RecordingStream:
+        return _RecordingStream(self._client.messages.stream(**kwargs), self._cassette, kwargs)
+
+
+class RecordingAnthropic:
+    """Live ``AsyncAnthropic`` wrapper that records every response to the cassette."""
+
+    def __init__(self, client, cassette: Cassette):
+        self._client = client
+        self.cassette = cassette
+        self.messages = _RecordingMessages(client, cassette)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def fake_embedding(text: str, dimension: int) -> list[float]:
+    """Deterministic unit vector for a text (identical texts embed identically)."""
+    seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:8], "big")
+    rng = random.Random(seed)
+    vector = [rng.gauss(0.0, 1.0) for _ in range(dimension)]
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class _ReplayEmbeddings:
+    def __init__(self, latency_ms: int):
+        self.latency = latency_ms / 1000
+
+    async def create(self, model: str, input, dimensions: int | None = None, **kwargs) -> CreateEmbeddingResponse:
+        texts = [input] if isinstance(input, str) else list(input)
+        dimension = dimensions or 1536
+        await asyncio.sleep(self.latency)
+        tokens = sum(len(t) // 3 + 1 for t in texts)
+        return CreateEmbeddingResponse.model_validate({
+            "object": "list",
+            "model": model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(t, dimension)}
+                for i, t in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+
+class ReplayOpenAI:
+    """Drop-in for ``AsyncOpenAI`` (embeddings only)."""
+
+    def __init__(self, latency_ms: int = 0):
+        self.embeddings = _ReplayEmbeddings(latency_ms)
+
+    async def close(self) -> None:
+        pass
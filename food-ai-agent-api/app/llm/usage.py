@@ -0,0 +1,349 @@
+"""Token and cost accounting for LLM / embedding calls, with per-site budgets.
+
+The shared clients are wrapped by ``MeteredAnthropic`` / ``MeteredOpenAI``,
+which report the usage of every response (streams included) to the
+``UsageMeter`` bound to the current context with ``start_usage_meter()``.
+Like tracing, tasks spawned by a run (routing, speculative retrieval, tools)
+inherit the meter, so intent/rewrite and embedding calls are counted too.
+
+At the end of a run the meter is stored in ``AuditLog.ai_context`` and folded
+into ``llm_usage_daily`` (per day, site, agent and model). ``usage_ledger``
+keeps today's spend per site to enforce optional soft and hard daily budgets:
+over the soft budget runs are downgraded (no LLM routing, smaller top_k), over
+the hard budget they are refused.
+"""
+import logging
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from types import SimpleNamespace
+from datetime import date, datetime
+from uuid import UUID
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db.database import async_session_factory
+from app.models.orm.llm_usage import LlmUsageDaily
+
+logger = logging.getLogger(__name__)
+
+TOKEN_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+# USD per million tokens: input, output, cache write, cache read
+MODEL_PRICING: dict[str, dict[str, float]] = {
+    "claude-sonnet-4-6": {"input": 3.0, "output": 15.0, "cache_write": 3.75, "cache_read": 0.30},
+    "claude-haiku-4-5": {"input": 1.0, "output": 5.0, "cache_write": 1.25, "cache_read": 0.10},
+    "text-embedding-3-small": {"input": 0.02},
+    "text-embedding-3-large": {"input": 0.13},
+}
+DEFAULT_PRICING = MODEL_PRICING["claude-sonnet-4-6"]
+
+BUDGET_OK, BUDGET_SOFT, BUDGET_HARD = "ok", "soft", "hard"
+
+_current_meter: ContextVar["UsageMeter | None"] = ContextVar("usage_meter", default=None)
+
+
+def model_pricing(model: str) -> dict[str, float]:
+    return settings.llm_pricing.get(model) or MODEL_PRICING.get(model) or DEFAULT_PRICING
+
+
+def cost_usd(model: str, counts: dict) -> float:
+    price = model_pricing(model)
+    return (
+        counts.get("input_tokens", 0) * price.get("input", 0.0)
+        + counts.get("output_tokens", 0) * price.get("output", 0.0)
+        + counts.get("cache_creation_input_tokens", 0) * price.get("cache_write", price.get("input", 0.0))
+        + counts.get("cache_read_input_tokens", 0) * price.get("cache_read", price.get("input", 0.0))
+    ) / 1_000_000
+
+
+class UsageMeter:
+    """Token counts of one run, per model."""
+
+    def __init__(self):
+        self.models: dict[str, dict[str, int]] = defaultdict(lambda: dict.fromkeys(("requests", *TOKEN_FIELDS), 0))
+
+    def record(self, model: str, usage) -> None:
+        counts = self.models[model]
+        counts["requests"] += 1
+        if usage is None:
+            return
+        if hasattr(usage, "prompt_tokens"):  # OpenAI embeddings
+            counts["input_tokens"] += int(usage.prompt_tokens or 0)
+            return
+        for field in TOKEN_FIELDS:
+            counts[field] += int(getattr(usage, field, 0) or 0)
+
+    def cost_usd(self) -> float:
+        return sum(cost_usd(model, counts) for model, counts in self.models.items())
+
+    def to_dict(self) -> dict:
+        return {
+            "models": {
+                model: {**counts, "cost_usd": round(cost_usd(model, counts), 6)}
+                for model, counts in self.models.items()
+            },
+            "cost_usd": round(self.cost_usd(), 6),
+        }
+
+
+def start_usage_meter() -> UsageMeter:
+    """Create a meter and bind it to the current context."""
+    meter = UsageMeter()
+    _current_meter.set(meter)
+    return meter
+
+
+def record_usage(model: str, usage) -> None:
+    meter = _current_meter.get()
+    if meter is not None:
+        meter.record(model, usage)
+
+
+class _ObservedStream:
+    """Stream proxy noting the usage reported by ``message_start`` / ``message_delta`` events."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.usage: dict[str, int] | None = None  # set once the message has started
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        async for event in self._stream:
+            if event.type == "message_start":
+                usage = event.message.usage
+                self.usage = {field: int(getattr(usage, field, 0) or 0) for field in TOKEN_FIELDS}
+            elif event.type == "message_delta" and self.usage is not None:
+                # Output tokens in message_delta are cumulative
+                self.usage["output_tokens"] = int(getattr(event.usage, "output_tokens", 0) or 0)
+            yield event
+
+
+class _MeteredStream:
+    """``messages.stream`` manager recording the stream's usage on exit.
+
+    A completed stream records the final message's usage. A stream that fails
+    or is cancelled part-way still records what it was billed for so far
+    (input tokens from ``message_start`` plus output tokens streamed).
+    """
+
+    def __init__(self, manager, model: str):
+        self._manager = manager
+        self._model = model
+        self._stream: _ObservedStream | None = None
+
+    async def __aenter__(self):
+        self._stream = _ObservedStream(await self._manager.__aenter__())
+        return self._stream
+
+    async def __aexit__(self, exc_type, exc, tb):
+        usage = None
+        if exc_type is None:
+            try:
+                usage = getattr(await self._stream.get_final_message(), "usage", None)
+            except Exception as e:
+                logger.warning(f"Reading final stream usage failed: {e}")
+        if usage is None and self._stream.usage is not None:
+            usage = SimpleNamespace(**self._stream.usage)
+        if usage is not None or exc_type is None:
+            record_usage(self._model, usage)
+        return await self._manager.__aexit__(exc_type, exc, tb)
+
+
+class _MeteredMessages:
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, **kwargs):
+        response = await self._client.messages.create(**kwargs)
+        record_usage(kwargs.get("model", ""), getattr(response, "usage", None))
+        return response
+
+    def stream(self, **kwargs) -> _MeteredStream:
+        return _MeteredStream(self._client.messages.stream(**kwargs), kwargs.get("model", ""))
+
+
+class MeteredAnthropic:
+    """Anthropic client wrapper reporting every response's usage to the current meter."""
+
+    def __init__(self, client):
+        self._client = client
+        self.messages = _MeteredMessages(client)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+class _MeteredEmbeddings:
+    def __init__(self, client):
+        self._client = client
+
+    async def create(self, **kwargs):
+        response = await self._client.embeddings.create(**kwargs)
+        record_usage(kwargs.get("model", ""), getattr(response, "usage", None))
+        return response
+
+
+class MeteredOpenAI:
+    """OpenAI client wrapper reporting embedding usage to the current meter."""
+
+    def __init__(self, client):
+        self._client = client
+        self.embeddings = _MeteredEmbeddings(client)
+
+    async def close(self) -> None:
+        await self._client.close()
+
+
+def budget_today() -> date:
+    """Calendar day in the budget timezone (daily budgets reset at its midnight)."""
+    return datetime.now(ZoneInfo(settings.llm_budget_timezone)).date()
+
+
+@dataclass
+class UsageRecord:
+    """One run's usage of one model, to be added to the daily rollup."""
+    usage_date: date
+    site_id: UUID
+    agent: str
+    model: str
+    requests: int
+    input_tokens: int
+    output_tokens: int
+    cache_creation_input_tokens: int
+    cache_read_input_tokens: int
+    cost_usd: float
+
+    @property
+    def key(self) -> tuple:
+        return self.usage_date, self.site_id, self.agent, self.model
+
+
+def usage_records(meter: UsageMeter, site_id: UUID, agent: str, day: date | None = None) -> list[UsageRecord]:
+    day = day or budget_today()
+    return [
+        UsageRecord(
+            usage_date=day, site_id=site_id, agent=agent, model=model,
+            cost_usd=cost_usd(model, counts), **counts,
+        )
+        for model, counts in meter.models.items()
+    ]
+
+
+async def upsert_usage_rollups(db: AsyncSession, records: list[UsageRecord]) -> None:
+    """Add records to llm_usage_daily (one upsert; records with the same key are merged first)."""
+    merged: dict[tuple, dict] = {}
+    for record in records:
+        row = merged.setdefault(record.key, {
+            "usage_date": record.usage_date, "site_id": record.site_id,
+            "agent": record.agent, "model": record.model,
+            "requests": 0, "cost_usd": 0.0, **dict.fromkeys(TOKEN_FIELDS, 0),
+        })
+        for field in ("requests", "cost_usd", *TOKEN_FIELDS):
+            row[field] += getattr(record, field)
+    if not merged:
+        return
+
+    stmt = insert(LlmUsageDaily).values(list(merged.values()))
+    table = LlmUsageDaily.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["usage_date", "site_id", "agent", "model"],
+        set_={
+            **{
+                field: table.c[field] + stmt.excluded[field]
+                for field in ("requests", "cost_usd", *TOKEN_FIELDS)
+            },
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt)
+
+
+class UsageLedger:
+    """Today's spend per site for budget checks.
+
+    Loaded from llm_usage_daily at most every ``LLM_BUDGET_REFRESH_S`` (so
+    spend by other workers is picked up) and advanced locally after each run.
+    """
+
+    def __init__(self, session_factory=None):
+        self.session_factory = session_factory or async_session_factory
+        self._spend: dict[UUID, tuple[date, float, float]] = {}  # site -> (day, usd, loaded_at)
+        self.downgraded = 0
+        self.refused = 0
+
+    @staticmethod
+    def limits(site_id: UUID) -> tuple[float, float]:
+        """(soft, hard) daily USD budget of a site; 0 disables a limit."""
+        override = settings.llm_site_budgets.get(str(site_id), {})
+        return (
+            float(override.get("soft", settings.llm_site_daily_soft_budget_usd)),
+            float(override.get("hard", settings.llm_site_daily_hard_budget_usd)),
+        )
+
+    async def spend_today(self, site_id: UUID) -> float:
+        today = budget_today()
+        cached = self._spend.get(site_id)
+        if cached and cached[0] == today and time.monotonic() - cached[2] < settings.llm_budget_refresh_s:
+            return cached[1]
+        try:
+            async with self.session_factory() as session:
+                spend = float((await session.execute(
+                    select(func.coalesce(func.sum(LlmUsageDaily.cost_usd), 0)).where(
+                        LlmUsageDaily.site_id == site_id,
+                        LlmUsageDaily.usage_date == today,
+                    )
+                )).scalar_one())
+        except Exception as e:
+            logger.warning(f"Loading today's LLM spend for site {site_id} failed: {e}")
+            return cached[1] if cached and cached[0] == today else 0.0
+        self._spend[site_id] = (today, spend, time.monotonic())
+        return spend
+
+    def add(self, site_id: UUID, cost: float) -> None:
+        cached = self._spend.get(site_id)
+        if cached and cached[0] == budget_today():
+            self._spend[site_id] = (cached[0], cached[1] + cost, cached[2])
+
+    async def budget_status(self, site_id: UUID) -> str:
+        soft, hard = self.limits(site_id)
+        if not soft and not hard:
+            return BUDGET_OK
+        spend = await self.spend_today(site_id)
+        if hard and spend >= hard:
+            self.refused += 1
+            return BUDGET_HARD
+        if soft and spend >= soft:
+            self.downgraded += 1
+            return BUDGET_SOFT
+        return BUDGET_OK
+
+    def stats(self) -> dict:
+        today = budget_today()
+        return {
+            "downgraded_runs": self.downgraded,
+            "refused_runs": self.refused,
+            "spend_today_usd": {
+                str(site_id): round(spend, 4)
+                for site_id, (day, spend, _) in self._spend.items()
+                if day == today
+            },
+        }
+
+
+usage_ledger = UsageLedger()
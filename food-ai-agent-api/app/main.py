@@ -1,13 +1,48 @@
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.agents.context_builder import load_encoding
+from app.agents.intent_router import local_intent_classifier
+from app.agents.persistence_writer import persistence_writer
+from app.agents.run_registry import run_registry
 from app.config import settings
+from app.db.session import AsyncSessionLocal
+from app.llm.clients import close_llm_clients, init_llm_clients
 from app.routers import auth, chat, menu_plans, recipes, work_orders, haccp, dashboard, documents, sites, items, policies, users, audit_logs, vendors, boms, purchase_orders, inventory, forecast, waste, cost, claims
 
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Shared, pooled LLM/embedding clients for every request
+    init_llm_clients()
+    # Token counting runs on the request path; load the tokenizer before serving
+    await load_encoding()
+    # Teach the local intent classifier the phrasing seen in past chat turns
+    if settings.intent_local_enabled:
+        try:
+            async with AsyncSessionLocal() as session:
+                await local_intent_classifier.load_audit_examples(session)
+        except Exception as e:
+            logger.warning(f"Local intent classifier warm-up skipped: {e}")
+    if settings.persistence_writer_enabled:
+        await persistence_writer.start()
+    yield
+    # Stop in-flight agent runs first so their writes still reach the writer
+    await run_registry.shutdown()
+    # Durable mode drains queued conversation/audit writes before exit
+    await persistence_writer.stop()
+    await close_llm_clients()
+
 
 def create_app() -> FastAPI:
     app = FastAPI(
         title=settings.app_name,
+        lifespan=lifespan,
         version="1.0.0",
         docs_url=f"{settings.api_v1_prefix}/docs",
         openapi_url=f"{settings.api_v1_prefix}/openapi.json",
@@ -7,7 +7,8 @@ from app.models.orm.recipe import Recipe, RecipeDocument
 from app.models.orm.work_order import WorkOrder
 from app.models.orm.haccp import HaccpChecklist, HaccpRecord, HaccpIncident
 from app.models.orm.audit_log import AuditLog
-from app.models.orm.conversation import Conversation
+from app.models.orm.conversation import Conversation, ConversationMessage
+from app.models.orm.llm_usage import LlmUsageDaily
 from app.models.orm.purchase import Vendor, VendorPrice, Bom, BomItem, PurchaseOrder, PurchaseOrderItem
 from app.models.orm.inventory import Inventory, InventoryLot
 from app.models.orm.forecast import DemandForecast, ActualHeadcount, SiteEvent
@@ -22,7 +23,7 @@ __all__ = [
     "Recipe", "RecipeDocument",
     "WorkOrder",
     "HaccpChecklist", "HaccpRecord", "HaccpIncident",
-    "AuditLog", "Conversation",
+    "AuditLog", "Conversation", "ConversationMessage", "LlmUsageDaily",
     "Vendor", "VendorPrice", "Bom", "BomItem", "PurchaseOrder", "PurchaseOrderItem",
     "Inventory", "InventoryLot",
     "DemandForecast", "ActualHeadcount", "SiteEvent",
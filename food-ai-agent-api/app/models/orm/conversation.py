@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, TIMESTAMP, text
+from sqlalchemy import Column, String, Boolean, Integer, Text, TIMESTAMP, ForeignKey, Index, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 from app.db.base import Base
@@ -13,7 +13,37 @@ class Conversation(Base):
     context_type = Column(String(50))  # menu, recipe, haccp, general
     context_ref = Column(UUID(as_uuid=True))  # related entity ID
     title = Column(String(300))
-    messages = Column(JSONB, nullable=False, server_default="'[]'")
+    messages = Column(JSONB, nullable=False, server_default="'[]'")  # legacy; turns live in conversation_messages
+    message_count = Column(Integer, nullable=False, server_default="0")  # denormalized count of conversation_messages
+    summary = Column(Text)  # rolling summary of turns older than the history window
+    summary_message_count = Column(Integer, nullable=False, server_default="0")  # messages covered by summary
     is_active = Column(Boolean, server_default="true")
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
     updated_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
+
+    __table_args__ = (
+        Index("ix_conversations_user_updated", "user_id", "updated_at"),
+    )
+
+
+class ConversationMessage(Base):
+    """대화 메시지 (append-only)"""
+    __tablename__ = "conversation_messages"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey("conversations.id"), nullable=False)
+    seq = Column(Integer, nullable=False)  # 0-based position within the conversation
+    role = Column(String(20), nullable=False)  # user, assistant
+    content = Column(Text, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
+
+    __table_args__ = (
+        Index("ix_conversation_messages_conv_seq", "conversation_id", "seq", unique=True),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "role": self.role,
+            "content": self.content,
+            "timestamp": self.created_at.isoformat() if self.created_at else None,
+        }
@@ -0,0 +1,27 @@
+from sqlalchemy import Column, String, Integer, BigInteger, Date, Numeric, TIMESTAMP, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.base import Base
+
+
+class LlmUsageDaily(Base):
+    """LLM/임베딩 토큰 사용량 및 비용 일별 집계 (현장/에이전트/모델별)"""
+    __tablename__ = "llm_usage_daily"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
+    usage_date = Column(Date, nullable=False)  # budget-timezone calendar day
+    site_id = Column(UUID(as_uuid=True), nullable=False)
+    agent = Column(String(30), nullable=False)  # menu, recipe, ..., summary
+    model = Column(String(100), nullable=False)
+    requests = Column(Integer, nullable=False, server_default="0")
+    input_tokens = Column(BigInteger, nullable=False, server_default="0")
+    output_tokens = Column(BigInteger, nullable=False, server_default="0")
+    cache_creation_input_tokens = Column(BigInteger, nullable=False, server_default="0")
+    cache_read_input_tokens = Column(BigInteger, nullable=False, server_default="0")
+    cost_usd = Column(Numeric(12, 6), nullable=False, server_default="0")
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
+
+    __table_args__ = (
+        Index("ix_llm_usage_daily_key", "usage_date", "site_id", "agent", "model", unique=True),
+        Index("ix_llm_usage_daily_site_date", "site_id", "usage_date"),
+    )
@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Boolean, Integer, Text, ARRAY, TIMESTAMP, text
-from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy import Column, String, Boolean, Integer, Text, ARRAY, TIMESTAMP, Computed, Index, text
+from sqlalchemy.dialects.postgresql import UUID, JSONB, TSVECTOR
+from sqlalchemy.orm import deferred
 from pgvector.sqlalchemy import Vector
 
 from app.db.base import Base
@@ -39,6 +40,22 @@ class RecipeDocument(Base):
     title = Column(String(300), nullable=False)
     content = Column(Text, nullable=False)
     chunk_index = Column(Integer, server_default="0")
+    document_id = Column(UUID(as_uuid=True))  # groups the chunks of one ingested document
     metadata_ = Column("metadata", JSONB, server_default="{}")
     embedding = Column(Vector(1536))  # pgvector
+    # Keyword search tokens, maintained by PostgreSQL (migration 008); only used in SQL
+    content_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', content)", persisted=True)))
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("NOW()"))
+
+    __table_args__ = (
+        # ANN index for cosine distance (<=>); build parameters in migration 007
+        Index(
+            "ix_recipe_documents_embedding_hnsw", "embedding",
+            postgresql_using="hnsw",
+            postgresql_ops={"embedding": "vector_cosine_ops"},
+        ),
+        Index("ix_recipe_documents_content_tsv", "content_tsv", postgresql_using="gin"),
+        # Adjacent-chunk lookups (recipe documents / standalone documents)
+        Index("ix_recipe_documents_recipe_chunk", "recipe_id", "doc_type", "chunk_index"),
+        Index("ix_recipe_documents_document_chunk", "document_id", "chunk_index"),
+    )
@@ -2,9 +2,8 @@
 import asyncio
 import logging
 
-from openai import AsyncOpenAI
-
 from app.config import settings
+from app.llm.clients import get_openai_client
 
 logger = logging.getLogger(__name__)
 
@@ -12,8 +11,8 @@ logger = logging.getLogger(__name__)
 class Embedder:
     """Generate embeddings via OpenAI API with batch processing."""
 
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.openai_api_key)
+    def __init__(self, client=None):
+        self.client = client or get_openai_client()
         self.model = settings.embedding_model
         self.dimension = settings.embedding_dimension
         self.batch_size = 100
@@ -1,7 +1,7 @@
 """RAG pipeline orchestration - ingest documents and retrieve context."""
 import logging
 from dataclasses import dataclass, field
-from uuid import UUID
+from uuid import UUID, uuid4
 
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,6 +12,7 @@ from app.rag.chunker import TextChunker
 from app.rag.embedder import Embedder
 from app.rag.loader import DocumentLoader
 from app.rag.retriever import HybridRetriever, RetrievedChunk
+from app.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -77,6 +78,7 @@ class RAGPipeline:
                 await self.db.delete(row)
 
         doc_title = title or docs[0].metadata.get("title", "Untitled")
+        document_id = uuid4()
 
         for chunk, embedding in zip(chunks, embeddings):
             record = RecipeDocument(
@@ -85,6 +87,7 @@ class RAGPipeline:
                 title=doc_title,
                 content=chunk.content,
                 chunk_index=chunk.chunk_index,
+                document_id=document_id,
                 metadata_={
                     "source_file": chunk.metadata.get("source_file"),
                     "doc_type": doc_type,
@@ -104,12 +107,30 @@ class RAGPipeline:
         query: str,
         doc_types: list[str] | None = None,
         top_k: int | None = None,
+        query_embedding: list[float] | None = None,
+        max_tokens: int | None = None,
     ) -> RAGContext:
-        """Retrieve relevant context for a query."""
-        chunks = await self.retriever.search(query, doc_types=doc_types, top_k=top_k)
+        """Retrieve relevant context for a query.
+
+        With ``max_tokens``, the lowest-ranked chunks are dropped until the
+        formatted context fits (a single remaining chunk is truncated).
+        """
+        with span("rag") as attrs:
+            chunks = await self.retriever.search(
+                query, doc_types=doc_types, top_k=top_k, query_embedding=query_embedding
+            )
+            attrs["chunks"] = len(chunks)
 
         formatted = self._format_context(chunks)
         token_estimate = len(formatted) // 3  # rough estimate: ~3 chars per token for Korean
+        if max_tokens:
+            while len(chunks) > 1 and token_estimate > max_tokens:
+                chunks = chunks[:-1]
+                formatted = self._format_context(chunks)
+                token_estimate = len(formatted) // 3
+            if token_estimate > max_tokens:
+                formatted = formatted[:max_tokens * 3]
+                token_estimate = max_tokens
 
         return RAGContext(
             chunks=chunks,
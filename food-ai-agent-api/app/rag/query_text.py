@@ -0,0 +1,18 @@
+"""Query text helpers shared by intent routing and retrieval."""
+import re
+
+# Conversational fillers dropped when a search query is built locally
+_FILLER_TOKENS = {"그거", "이거", "저거", "좀", "해줘", "알려줘", "보여줘", "해주세요", "알려주세요", "부탁해"}
+_FILLER_SUFFIX = re.compile(r"(해줘|해주세요|알려줘|보여줘|만들어줘)$")
+
+
+def strip_fillers(message: str) -> str:
+    """Cheap local stand-in for the LLM query rewrite."""
+    tokens = []
+    for token in message.split():
+        if token in _FILLER_TOKENS:
+            continue
+        token = _FILLER_SUFFIX.sub("", token)
+        if token:
+            tokens.append(token)
+    return " ".join(tokens) or message
@@ -1,13 +1,16 @@
 """Hybrid retriever - BM25 keyword + pgvector semantic search with RRF fusion."""
+import asyncio
 import logging
 from dataclasses import dataclass, field
 from uuid import UUID
 
 from sqlalchemy import text as sql_text
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from app.config import settings
+from app.db.database import async_session_factory
 from app.rag.embedder import Embedder
+from app.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -22,12 +25,28 @@ class RetrievedChunk:
 
 
 class HybridRetriever:
-    """Hybrid search combining BM25 keyword search and pgvector cosine similarity."""
+    """Hybrid search combining BM25 keyword search and pgvector cosine similarity.
 
-    def __init__(self, db: AsyncSession, embedder: Embedder | None = None):
+    By default (``RAG_FUSION_MODE=python``) the keyword leg starts right away,
+    concurrently with the query embedding call, and the vector leg once the
+    embedding is there; each leg runs on its own pooled session and
+    ``_rrf_fusion`` ranks the candidates. The opt-in ``sql`` mode (PostgreSQL
+    only) runs candidate selection for both legs and the weighted RRF fusion
+    in one statement that returns only the top_k rows. Adjacent chunks of all
+    hits are then fetched in one query.
+    """
+
+    def __init__(
+        self,
+        db: AsyncSession,
+        embedder: Embedder | None = None,
+        session_factory: async_sessionmaker | None = None,
+    ):
         self.db = db
         self.embedder = embedder or Embedder()
+        self.session_factory = session_factory or async_session_factory
         self.rrf_k = 60  # RRF smoothing constant
+        self.candidates = 20  # rows per leg considered for fusion
         self.keyword_weight = settings.rag_keyword_weight  # 0.3
         self.vector_weight = settings.rag_vector_weight    # 0.7
 
@@ -36,28 +55,79 @@ class HybridRetriever:
         query: str,
         doc_types: list[str] | None = None,
         top_k: int | None = None,
+        query_embedding: list[float] | None = None,
     ) -> list[RetrievedChunk]:
         top_k = top_k or settings.rag_top_k
 
-        # Generate query embedding
-        query_embedding = await self.embedder.embed_single(query)
+        if self._sql_fusion():
+            if query_embedding is None:
+                with span("embedding"):
+                    query_embedding = await self.embedder.embed_single(query)
+            top_chunks = await self._run_leg(self._fused_search, query, query_embedding, doc_types, top_k)
+        else:
+            top_chunks = (await self._search_legs(query, doc_types, query_embedding))[:top_k]
+
+        # Return top-k with adjacent chunks
+        with span("enrichment", chunks=len(top_chunks)):
+            enriched = await self._enrich_with_adjacent(top_chunks)
+        return enriched
 
-        # Parallel search
-        keyword_results = await self._keyword_search(query, doc_types)
-        vector_results = await self._vector_search(query_embedding, doc_types)
+    def _sql_fusion(self) -> bool:
+        """Fuse in PostgreSQL when opted in (other backends always fuse in Python)."""
+        if settings.rag_fusion_mode != "sql":
+            return False
+        try:
+            return self.db.get_bind().dialect.name == "postgresql"
+        except Exception:
+            return False
+
+    async def _search_legs(
+        self, query: str, doc_types: list[str] | None, query_embedding: list[float] | None,
+    ) -> list[RetrievedChunk]:
+        """Both legs on their own sessions, fused in Python."""
+        # Keyword leg does not need the embedding: start it first
+        keyword_task = asyncio.create_task(
+            self._run_leg(self._keyword_search, query, doc_types, self.candidates)
+        )
+        vector_task = None
+        try:
+            # Generate query embedding (unless the caller already has it)
+            if query_embedding is None:
+                with span("embedding"):
+                    query_embedding = await self.embedder.embed_single(query)
+            vector_task = asyncio.create_task(
+                self._run_leg(self._vector_search, query_embedding, doc_types, self.candidates)
+            )
+            keyword_results, vector_results = await asyncio.gather(keyword_task, vector_task)
+        except BaseException:
+            # A failed leg (or a cancelled search) must not leave the other running
+            await self._cancel(keyword_task, vector_task)
+            raise
 
         # RRF Fusion
-        fused = self._rrf_fusion(keyword_results, vector_results)
+        return self._rrf_fusion(keyword_results, vector_results)
 
-        # Return top-k with adjacent chunks
-        top_chunks = fused[:top_k]
-        enriched = await self._enrich_with_adjacent(top_chunks)
-        return enriched
+    async def _run_leg(self, search, *args):
+        """Run one search leg on a dedicated pooled session."""
+        async with self.session_factory() as session:
+            return await search(*args, db=session)
+
+    @staticmethod
+    async def _cancel(*tasks: asyncio.Task | None) -> None:
+        pending = [task for task in tasks if task is not None and not task.done()]
+        for task in pending:
+            task.cancel()
+        # Wait so the legs' sessions are returned to the pool before we unwind
+        await asyncio.gather(*pending, return_exceptions=True)
 
     async def _keyword_search(
-        self, query: str, doc_types: list[str] | None = None, limit: int = 20
+        self, query: str, doc_types: list[str] | None = None, limit: int = 20, db: AsyncSession | None = None,
     ) -> list[tuple[UUID, str, dict, float]]:
-        """BM25 keyword search using PostgreSQL Full-Text Search."""
+        """BM25 keyword search using PostgreSQL Full-Text Search.
+
+        Matches the stored ``content_tsv`` column (GIN index) and parses the
+        query once, instead of re-tokenizing every row's content per search.
+        """
         type_filter = ""
         params: dict = {"query": query, "limit": limit}
         if doc_types:
@@ -65,41 +135,129 @@ class HybridRetriever:
             params["doc_types"] = doc_types
 
         sql = sql_text(f"""
-            SELECT id, content, metadata,
-                   ts_rank(to_tsvector('simple', content), plainto_tsquery('simple', :query)) AS rank
-            FROM recipe_documents
-            WHERE to_tsvector('simple', content) @@ plainto_tsquery('simple', :query)
+            SELECT id, content, metadata, ts_rank(content_tsv, q) AS rank
+            FROM recipe_documents, plainto_tsquery('simple', :query) AS q
+            WHERE content_tsv @@ q
             {type_filter}
             ORDER BY rank DESC
             LIMIT :limit
         """)
-        result = await self.db.execute(sql, params)
-        rows = result.fetchall()
+        with span("keyword_sql") as attrs:
+            result = await (db or self.db).execute(sql, params)
+            rows = result.fetchall()
+            attrs["rows"] = len(rows)
         return [(row[0], row[1], row[2] or {}, float(row[3])) for row in rows]
 
     async def _vector_search(
-        self, embedding: list[float], doc_types: list[str] | None = None, limit: int = 20
+        self, embedding: list[float], doc_types: list[str] | None = None, limit: int = 20,
+        db: AsyncSession | None = None,
     ) -> list[tuple[UUID, str, dict, float]]:
-        """Vector cosine similarity search using pgvector."""
+        """Vector cosine similarity search using pgvector (HNSW index scan)."""
         type_filter = ""
         params: dict = {"embedding": str(embedding), "limit": limit}
         if doc_types:
             type_filter = "AND doc_type = ANY(:doc_types)"
             params["doc_types"] = doc_types
 
+        db = db or self.db
         sql = sql_text(f"""
             SELECT id, content, metadata,
-                   1 - (embedding <=> :embedding::vector) AS similarity
+                   1 - (embedding <=> CAST(:embedding AS vector)) AS similarity
             FROM recipe_documents
             WHERE embedding IS NOT NULL
             {type_filter}
-            ORDER BY embedding <=> :embedding::vector
+            ORDER BY embedding <=> CAST(:embedding AS vector)
             LIMIT :limit
         """)
-        result = await self.db.execute(sql, params)
-        rows = result.fetchall()
+        with span("vector_sql") as attrs:
+            await self._set_ann_params(db, limit)
+            result = await db.execute(sql, params)
+            rows = result.fetchall()
+            attrs["rows"] = len(rows)
         return [(row[0], row[1], row[2] or {}, float(row[3])) for row in rows]
 
+    async def _fused_search(
+        self, query: str, embedding: list[float], doc_types: list[str] | None, top_k: int,
+        db: AsyncSession | None = None,
+    ) -> list[RetrievedChunk]:
+        """Keyword + vector candidates and weighted RRF in one statement.
+
+        Same ranking as ``_rrf_fusion`` over the same candidates, but only the
+        final top_k rows' content and metadata leave the database.
+        """
+        db = db or self.db
+        type_filter = ""
+        params: dict = {
+            "query": query,
+            "embedding": str(embedding),
+            "candidates": self.candidates,
+            "rrf_k": self.rrf_k,
+            "keyword_weight": self.keyword_weight,
+            "vector_weight": self.vector_weight,
+            "top_k": top_k,
+        }
+        if doc_types:
+            type_filter = "AND doc_type = ANY(:doc_types)"
+            params["doc_types"] = doc_types
+
+        sql = sql_text(f"""
+            WITH kw AS (
+                SELECT id, row_number() OVER (ORDER BY rank DESC) AS pos
+                FROM (
+                    SELECT id, ts_rank(content_tsv, q) AS rank
+                    FROM recipe_documents, plainto_tsquery('simple', :query) AS q
+                    WHERE content_tsv @@ q
+                    {type_filter}
+                    ORDER BY rank DESC
+                    LIMIT :candidates
+                ) k
+            ),
+            vec AS (
+                SELECT id, row_number() OVER (ORDER BY distance) AS pos
+                FROM (
+                    SELECT id, embedding <=> CAST(:embedding AS vector) AS distance
+                    FROM recipe_documents
+                    WHERE embedding IS NOT NULL
+                    {type_filter}
+                    ORDER BY distance
+                    LIMIT :candidates
+                ) v
+            ),
+            fused AS (
+                SELECT COALESCE(kw.id, vec.id) AS id,
+                       COALESCE(CAST(:keyword_weight AS float8) / (CAST(:rrf_k AS int) + kw.pos), 0)
+                       + COALESCE(CAST(:vector_weight AS float8) / (CAST(:rrf_k AS int) + vec.pos), 0) AS score
+                FROM kw FULL OUTER JOIN vec ON kw.id = vec.id
+                ORDER BY score DESC
+                LIMIT :top_k
+            )
+            SELECT d.id, d.content, d.metadata, fused.score
+            FROM fused JOIN recipe_documents d ON d.id = fused.id
+            ORDER BY fused.score DESC
+        """)
+        with span("hybrid_sql") as attrs:
+            await self._set_ann_params(db, self.candidates)
+            result = await db.execute(sql, params)
+            rows = result.fetchall()
+            attrs["rows"] = len(rows)
+        return [
+            RetrievedChunk(id=row[0], content=row[1], metadata=row[2] or {}, score=float(row[3]), source="fused")
+            for row in rows
+        ]
+
+    @staticmethod
+    async def _set_ann_params(db: AsyncSession, limit: int) -> None:
+        """Transaction-local HNSW search parameters for the next vector query.
+
+        ``ef_search`` below LIMIT would cap the rows an index scan can return.
+        """
+        params = {"ef_search": str(max(settings.rag_hnsw_ef_search, limit))}
+        sql = "SELECT set_config('hnsw.ef_search', :ef_search, true)"
+        if settings.rag_hnsw_iterative_scan:
+            sql += ", set_config('hnsw.iterative_scan', :iterative_scan, true)"
+            params["iterative_scan"] = settings.rag_hnsw_iterative_scan
+        await db.execute(sql_text(sql), params)
+
     def _rrf_fusion(
         self,
         keyword_results: list[tuple[UUID, str, dict, float]],
@@ -136,38 +294,46 @@ class HybridRetriever:
         ]
 
     async def _enrich_with_adjacent(self, chunks: list[RetrievedChunk]) -> list[RetrievedChunk]:
-        """Include adjacent chunks from the same document for better context."""
+        """Append the previous/next chunk of each hit's document, in one query.
+
+        Neighbours come from the same recipe (recipe_id, doc_type) or, for
+        standalone SOP/HACCP/policy documents, the same ``document_id``, by the
+        integer ``chunk_index`` column. Runs on a pooled session so a failure
+        cannot abort the caller's transaction; enrichment is best-effort.
+        """
         if not chunks:
             return chunks
 
-        enriched = []
+        sql = sql_text("""
+            SELECT hit.id, nb.chunk_index, nb.content
+            FROM recipe_documents hit
+            JOIN recipe_documents nb
+              ON nb.recipe_id = hit.recipe_id
+             AND nb.doc_type = hit.doc_type
+             AND nb.chunk_index IN (hit.chunk_index - 1, hit.chunk_index + 1)
+            WHERE hit.id = ANY(:ids) AND hit.recipe_id IS NOT NULL
+            UNION ALL
+            SELECT hit.id, nb.chunk_index, nb.content
+            FROM recipe_documents hit
+            JOIN recipe_documents nb
+              ON nb.document_id = hit.document_id
+             AND nb.chunk_index IN (hit.chunk_index - 1, hit.chunk_index + 1)
+            WHERE hit.id = ANY(:ids) AND hit.recipe_id IS NULL
+            ORDER BY 1, 2
+        """)
+        try:
+            async with self.session_factory() as session:
+                result = await session.execute(sql, {"ids": [chunk.id for chunk in chunks]})
+                rows = result.fetchall()
+        except Exception as e:
+            logger.warning(f"Adjacent chunk enrichment failed: {e}")
+            return chunks
+
+        adjacent: dict[UUID, list[str]] = {}
+        for hit_id, _, content in rows:
+            adjacent.setdefault(hit_id, []).append(content)
         for chunk in chunks:
-            chunk_index = chunk.metadata.get("chunk_index")
-            recipe_id = chunk.metadata.get("recipe_id")
-            doc_type = chunk.metadata.get("doc_type")
-
-            if chunk_index is not None and recipe_id:
-                # Fetch prev/next chunk from same document
-                sql = sql_text("""
-                    SELECT content FROM recipe_documents
-                    WHERE recipe_id = :recipe_id
-                      AND doc_type = :doc_type
-                      AND metadata->>'chunk_index' IN (:prev_idx, :next_idx)
-                    ORDER BY metadata->>'chunk_index'
-                """)
-                try:
-                    result = await self.db.execute(sql, {
-                        "recipe_id": str(recipe_id),
-                        "doc_type": doc_type,
-                        "prev_idx": str(chunk_index - 1),
-                        "next_idx": str(chunk_index + 1),
-                    })
-                    adjacent_rows = result.fetchall()
-                    if adjacent_rows:
-                        adjacent_text = "\n...\n".join(r[0] for r in adjacent_rows)
-                        chunk.content = f"{chunk.content}\n\n[Adjacent context]\n{adjacent_text}"
-                except Exception:
-                    pass  # Adjacent enrichment is best-effort
-
-            enriched.append(chunk)
-        return enriched
+            if chunk.id in adjacent:
+                adjacent_text = "\n...\n".join(adjacent[chunk.id])
+                chunk.content = f"{chunk.content}\n\n[Adjacent context]\n{adjacent_text}"
+        return chunks
@@ -0,0 +1,69 @@
+"""Speculative RAG retrieval - search the raw message while routing runs.
+
+The orchestrator starts a retrieval on the user's raw message (on its own DB
+session) as soon as the turn begins, and only later learns the routed intent
+and rewritten search query. The speculative result is reused when it was made
+for the same doc types and the rewritten query is a near-duplicate of the raw
+message: equal after normalization, or with a cosine similarity of the query
+embeddings of at least ``RAG_SPECULATIVE_SIMILARITY``. Otherwise a second retrieval runs with
+the rewritten query (reusing its already computed embedding).
+"""
+import logging
+import math
+import re
+
+from app.rag.query_text import strip_fillers
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD = re.compile(r"[^가-힣a-zA-Z0-9]+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercased, filler- and punctuation-free form used for equality checks."""
+    return strip_fillers(_NON_WORD.sub(" ", query.lower()).strip())
+
+
+def is_same_query(a: str, b: str) -> bool:
+    return normalize_query(a) == normalize_query(b)
+
+
+def cosine_similarity(a: list[float], b: list[float]) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class SpeculationStats:
+    """Process-wide counters for speculative retrieval outcomes."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+
+    def record(self, hit: bool, reason: str) -> None:
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+        logger.info(
+            f"RAG speculation {'hit' if hit else 'miss'} ({reason}), "
+            f"hit_rate={self.hit_rate:.2%} over {self.hits + self.misses} turns"
+        )
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "hit_rate": round(self.hit_rate, 4),
+        }
+
+
+speculation_stats = SpeculationStats()
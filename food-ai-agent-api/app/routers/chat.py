@@ -1,34 +1,66 @@
 """Chat router - AI agent SSE streaming endpoint."""
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy import select, delete
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
 
+from app.agents.intent_router import local_intent_classifier
 from app.agents.orchestrator import AgentOrchestrator
-from app.auth.dependencies import get_current_user
+from app.agents.persistence_writer import persistence_writer
+from app.agents.retrieval_policy import retrieval_policy_stats
+from app.agents.run_registry import run_registry
+from app.agents.tool_cache import tool_result_cache
+from app.agents.tool_compactor import tool_result_compactor
+from app.agents.tool_selection import tool_selection_stats
+from app.auth.dependencies import get_current_user, require_role
 from app.db.session import get_db
-from app.models.orm.conversation import Conversation
+from app.llm.admission import admission_stats
+from app.llm.usage import budget_today, usage_ledger
+from app.models.orm.audit_log import AuditLog
+from app.models.orm.conversation import Conversation, ConversationMessage
+from app.models.orm.llm_usage import LlmUsageDaily
 from app.models.orm.user import User
+from app.rag.speculation import speculation_stats
+from app.tracing import aggregate_timings
 
 router = APIRouter()
 
+# Most recent runs considered by the timing aggregation
+TIMING_MAX_RUNS = 5000
+
 
 class ChatRequest(BaseModel):
     message: str
     site_id: UUID
     conversation_id: UUID | None = None
+    timing: bool = False  # emit a per-phase `timing` SSE event before `done`
+
+
+# Session of a background agent run, committed like a request's get_db session
+run_session = asynccontextmanager(get_db)
+
+# Keep proxies (nginx) from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
 
 
 @router.post("")
 async def send_message(
     body: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db),
 ):
-    """Send message to AI agent with SSE streaming response."""
+    """Send message to AI agent with SSE streaming response.
+
+    The agent runs in the background independently of this connection; every
+    event carries an SSE ``id`` and the run id is sent in the ``X-Run-Id``
+    header and the first (``run``) event. After a disconnect, reattach with
+    ``GET /chat/runs/{run_id}/events`` and ``Last-Event-ID``.
+    """
     # Verify site access
     if (
         current_user.role not in ("ADM", "OPS")
@@ -36,18 +68,128 @@ async def send_message(
     ):
         raise HTTPException(status_code=403, detail="No access to this site")
 
-    orchestrator = AgentOrchestrator(db)
+    async def run_events():
+        # The run outlives the request, so it gets its own session
+        async with run_session() as db:
+            async for event in AgentOrchestrator(db).run(
+                message=body.message,
+                user=current_user,
+                site_id=body.site_id,
+                conversation_id=body.conversation_id,
+                timing=body.timing,
+            ):
+                yield event
+
+    run = run_registry.start(current_user.id, run_events())
+    return StreamingResponse(
+        run.stream(),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Run-Id": run.id},
+    )
+
+
+@router.get("/runs/{run_id}/events")
+async def resume_run(
+    run_id: str,
+    last_event_id: int = Query(0, ge=0),
+    last_event_id_header: int | None = Header(None, alias="Last-Event-ID", ge=0),
+    current_user: User = Depends(get_current_user),
+):
+    """Reattach to a run: replay events after ``Last-Event-ID``, then follow it live."""
+    run = run_registry.get(run_id, current_user.id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Run not found or expired")
+    after = last_event_id_header if last_event_id_header is not None else last_event_id
+    return StreamingResponse(
+        run.stream(after_seq=after),
+        media_type="text/event-stream",
+        headers={**SSE_HEADERS, "X-Run-Id": run.id},
+    )
 
-    async def event_stream():
-        async for event in orchestrator.run(
-            message=body.message,
-            user=current_user,
-            site_id=body.site_id,
-            conversation_id=body.conversation_id,
-        ):
-            yield event
 
-    return StreamingResponse(event_stream(), media_type="text/event-stream")
+@router.get("/stats")
+async def get_agent_stats(current_user: User = require_role("OPS", "ADM")):
+    """Agent runtime statistics (intent classifier hit rate, tool cache hit/miss)."""
+    return {
+        "success": True,
+        "data": {
+            "intent_classifier": local_intent_classifier.stats(),
+            "tool_cache": tool_result_cache.stats(),
+            "tool_selection": tool_selection_stats.stats(),
+            "tool_compaction": tool_result_compactor.stats(),
+            "llm_admission": admission_stats(),
+            "llm_budget": usage_ledger.stats(),
+            "rag_policy": retrieval_policy_stats.stats(),
+            "rag_speculation": speculation_stats.stats(),
+            "persistence_writer": persistence_writer.stats(),
+            "chat_runs": run_registry.stats(),
+        },
+    }
+
+
+@router.get("/timing")
+async def get_timing_stats(
+    hours: int = Query(24, ge=1, le=24 * 30),
+    current_user: User = require_role("OPS", "ADM"),
+    db: AsyncSession = Depends(get_db),
+):
+    """p50/p95 latency per phase, agent and tool over recent chat runs."""
+    since = datetime.now(timezone.utc) - timedelta(hours=hours)
+    rows = (await db.execute(
+        select(AuditLog.ai_context)
+        .where(AuditLog.action == "ai_chat", AuditLog.created_at >= since)
+        .order_by(AuditLog.created_at.desc())
+        .limit(TIMING_MAX_RUNS)
+    )).scalars().all()
+
+    return {
+        "success": True,
+        "data": {
+            "window_hours": hours,
+            "since": since.isoformat(),
+            **aggregate_timings(rows),
+        },
+    }
+
+
+@router.get("/usage")
+async def get_usage_rollups(
+    days: int = Query(7, ge=1, le=92),
+    site_id: UUID | None = None,
+    current_user: User = require_role("OPS", "ADM"),
+    db: AsyncSession = Depends(get_db),
+):
+    """Daily LLM/embedding token usage and cost per site, agent and model."""
+    since = budget_today() - timedelta(days=days - 1)
+    query = select(LlmUsageDaily).where(LlmUsageDaily.usage_date >= since)
+    if site_id:
+        query = query.where(LlmUsageDaily.site_id == site_id)
+    rows = (await db.execute(
+        query.order_by(LlmUsageDaily.usage_date.desc(), LlmUsageDaily.cost_usd.desc())
+    )).scalars().all()
+
+    return {
+        "success": True,
+        "data": {
+            "since": since.isoformat(),
+            "total_cost_usd": round(sum(float(r.cost_usd) for r in rows), 6),
+            "rows": [
+                {
+                    "date": r.usage_date.isoformat(),
+                    "site_id": str(r.site_id),
+                    "agent": r.agent,
+                    "model": r.model,
+                    "requests": r.requests,
+                    "input_tokens": r.input_tokens,
+                    "output_tokens": r.output_tokens,
+                    "cache_creation_input_tokens": r.cache_creation_input_tokens,
+                    "cache_read_input_tokens": r.cache_read_input_tokens,
+                    "cost_usd": float(r.cost_usd),
+                }
+                for r in rows
+            ],
+        },
+    }
 
 
 @router.get("/conversations")
@@ -58,6 +200,7 @@ async def list_conversations(
     """List user conversations."""
     result = await db.execute(
         select(Conversation)
+        .options(defer(Conversation.messages), defer(Conversation.summary))
         .where(Conversation.user_id == current_user.id, Conversation.is_active == True)
         .order_by(Conversation.updated_at.desc())
         .limit(50)
@@ -71,7 +214,7 @@ async def list_conversations(
                 "id": str(c.id),
                 "title": c.title,
                 "context_type": c.context_type,
-                "message_count": len(c.messages) if c.messages else 0,
+                "message_count": c.message_count or 0,
                 "updated_at": c.updated_at.isoformat() if c.updated_at else None,
             }
             for c in conversations
@@ -96,13 +239,19 @@ async def get_conversation(
     if not conv:
         raise HTTPException(status_code=404, detail="Conversation not found")
 
+    messages = (await db.execute(
+        select(ConversationMessage)
+        .where(ConversationMessage.conversation_id == conv.id)
+        .order_by(ConversationMessage.seq)
+    )).scalars().all()
+
     return {
         "success": True,
         "data": {
             "id": str(conv.id),
             "title": conv.title,
             "context_type": conv.context_type,
-            "messages": conv.messages or [],
+            "messages": [m.to_dict() for m in messages],
             "created_at": conv.created_at.isoformat() if conv.created_at else None,
             "updated_at": conv.updated_at.isoformat() if conv.updated_at else None,
         },
@@ -0,0 +1,128 @@
+"""Lightweight per-run timing spans for agent requests.
+
+A ``RunTrace`` is bound to the current context with ``start_trace()``; any
+code running in that request (including tasks it spawns, which copy the
+context) records phases with ``span("name", **attrs)``. Outside a trace,
+``span`` is a no-op, so instrumented code paths stay usable from scripts
+and tests.
+"""
+import math
+import time
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+_current_trace: ContextVar["RunTrace | None"] = ContextVar("current_trace", default=None)
+
+
+@dataclass
+class Span:
+    name: str
+    start_ms: float  # offset from the start of the run
+    duration_ms: float
+    attrs: dict = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "start_ms": round(self.start_ms, 1),
+            "duration_ms": round(self.duration_ms, 1),
+            **self.attrs,
+        }
+
+
+class RunTrace:
+    """Collected spans of one agent run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans: list[Span] = []
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def record(self, name: str, started: float, **attrs) -> None:
+        now = time.perf_counter()
+        self.spans.append(Span(
+            name=name,
+            start_ms=(started - self.started) * 1000,
+            duration_ms=(now - started) * 1000,
+            attrs={k: v for k, v in attrs.items() if v is not None},
+        ))
+
+    def to_dict(self) -> dict:
+        return {
+            "total_ms": round(self.elapsed_ms(), 1),
+            "spans": [s.to_dict() for s in sorted(self.spans, key=lambda s: s.start_ms)],
+        }
+
+
+def start_trace() -> RunTrace:
+    """Create a trace and bind it to the current context."""
+    trace = RunTrace()
+    _current_trace.set(trace)
+    return trace
+
+
+def current_trace() -> RunTrace | None:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[dict]:
+    """Time a block. The yielded dict can be updated with attributes known only at the end."""
+    trace = _current_trace.get()
+    started = time.perf_counter()
+    try:
+        yield attrs
+    finally:
+        if trace is not None:
+            trace.record(name, started, **attrs)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile (0.0 for no values)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def _summarize(groups: dict[str, list[float]]) -> dict:
+    return {
+        key: {
+            "count": len(values),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+        }
+        for key, values in sorted(groups.items())
+    }
+
+
+def aggregate_timings(ai_contexts: Iterable[dict]) -> dict:
+    """p50/p95 per phase, per agent (whole run) and per tool from audit ``ai_context`` rows."""
+    phases: dict[str, list[float]] = defaultdict(list)
+    agents: dict[str, list[float]] = defaultdict(list)
+    tools: dict[str, list[float]] = defaultdict(list)
+    runs = 0
+
+    for ctx in ai_contexts:
+        timing = (ctx or {}).get("timing")
+        if not timing:
+            continue
+        runs += 1
+        agents[ctx.get("agent") or "unknown"].append(timing.get("total_ms", 0.0))
+        for s in timing.get("spans", []):
+            phases[s["name"]].append(s["duration_ms"])
+            if s["name"] == "tool" and s.get("tool"):
+                tools[s["tool"]].append(s["duration_ms"])
+
+    return {
+        "runs": runs,
+        "phases": _summarize(phases),
+        "agents": _summarize(agents),
+        "tools": _summarize(tools),
+    }
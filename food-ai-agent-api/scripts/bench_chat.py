@@ -0,0 +1,139 @@
+"""Chat endpoint load benchmark with simulated concurrent users.
+
+Drives POST /api/v1/chat with N concurrent users, each sending M messages,
+and reports throughput, end-to-end / first-token latency and the per-phase
+p50/p95 from the ``timing`` SSE event.
+
+Run against the offline replay backends to measure our own overhead without
+API keys (a seeded database is still required):
+
+    LLM_BACKEND=replay LLM_REPLAY_LATENCY_MS=400 LLM_REPLAY_CHUNK_MS=20 \\
+        EMBEDDING_REPLAY_LATENCY_MS=80 uvicorn app.main:app
+    python scripts/bench_chat.py --users 20 --requests 5
+
+or in-process (no server, lifespan hooks are not run):
+
+    LLM_BACKEND=replay python scripts/bench_chat.py --in-process --users 10
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.tracing import aggregate_timings, percentile  # noqa: E402
+
+DEFAULT_MESSAGES = [
+    "닭볶음탕 300인분 레시피 찾아줘",
+    "이번 주 식단 알레르기 확인해줘",
+    "오늘 HACCP 점검 완료됐어?",
+    "돼지고기 단가 위험 품목 알려줘",
+    "내일 중식 예상 식수는?",
+]
+
+
+async def _login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    resp = await client.post("/api/v1/auth/login", json={"email": email, "password": password})
+    resp.raise_for_status()
+    return resp.json()["access_token"]
+
+
+async def _chat_once(client: httpx.AsyncClient, token: str, site_id: str, message: str) -> dict:
+    started = time.perf_counter()
+    first_token = None
+    timing = None
+    error = None
+    async with client.stream(
+        "POST", "/api/v1/chat",
+        json={"message": message, "site_id": site_id, "timing": True},
+        headers={"Authorization": f"Bearer {token}"},
+    ) as resp:
+        if resp.status_code != 200:
+            error = f"HTTP {resp.status_code}"
+        async for line in resp.aiter_lines():
+            if not line.startswith("data: "):
+                continue
+            event = json.loads(line.removeprefix("data: "))
+            if event["type"] == "text_delta" and first_token is None:
+                first_token = time.perf_counter() - started
+            elif event["type"] == "timing":
+                timing = event
+            elif event["type"] == "error":
+                error = event.get("message", "error")
+    return {
+        "total": time.perf_counter() - started,
+        "first_token": first_token,
+        "timing": timing,
+        "error": error,
+    }
+
+
+async def _user(client, token, site_id, messages, requests, results):
+    for i in range(requests):
+        try:
+            results.append(await _chat_once(client, token, site_id, messages[i % len(messages)]))
+        except Exception as e:
+            results.append({"total": 0.0, "first_token": None, "timing": None, "error": str(e)})
+
+
+async def main(args) -> None:
+    if args.in_process:
+        from app.main import create_app
+        transport = httpx.ASGITransport(app=create_app())
+        base_url = "http://bench"
+    else:
+        transport = None
+        base_url = args.base_url
+
+    messages = DEFAULT_MESSAGES
+    if args.messages:
+        messages = [m.strip() for m in Path(args.messages).read_text(encoding="utf-8").splitlines() if m.strip()]
+
+    async with httpx.AsyncClient(base_url=base_url, transport=transport, timeout=args.timeout) as client:
+        token = await _login(client, args.email, args.password)
+        results: list[dict] = []
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            _user(client, token, args.site_id, messages[u % len(messages):] + messages[:u % len(messages)],
+                  args.requests, results)
+            for u in range(args.users)
+        ))
+        elapsed = time.perf_counter() - started
+
+    ok = [r for r in results if not r["error"]]
+    totals = [r["total"] * 1000 for r in ok]
+    firsts = [r["first_token"] * 1000 for r in ok if r["first_token"] is not None]
+    phases = aggregate_timings({"agent": "all", "timing": r["timing"]} for r in ok if r["timing"])
+
+    print(f"users={args.users} requests/user={args.requests} elapsed={elapsed:.2f}s")
+    print(f"completed={len(ok)} errors={len(results) - len(ok)} throughput={len(ok) / elapsed:.2f} req/s")
+    print(f"latency   p50={percentile(totals, 50):.0f}ms p95={percentile(totals, 95):.0f}ms")
+    print(f"first tok p50={percentile(firsts, 50):.0f}ms p95={percentile(firsts, 95):.0f}ms")
+    print("\nphase                 count    p50_ms    p95_ms")
+    for section in ("phases", "tools"):
+        for name, row in phases[section].items():
+            label = name if section == "phases" else f"tool:{name}"
+            print(f"{label:<20} {row['count']:>6} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f}")
+    for r in results:
+        if r["error"]:
+            print(f"error: {r['error']}")
+            break
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="drive the ASGI app directly")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=5, help="messages per user")
+    parser.add_argument("--email", default="admin@smallsf.com")
+    parser.add_argument("--password", default="admin1234")
+    parser.add_argument("--site-id", default="00000000-0000-0000-0000-000000000001")
+    parser.add_argument("--messages", help="file with one message per line")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    asyncio.run(main(parser.parse_args()))
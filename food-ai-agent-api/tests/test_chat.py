@@ -4,7 +4,8 @@ import pytest
 from unittest.mock import AsyncMock, MagicMock, patch
 from httpx import AsyncClient
 
-from tests.conftest import ADMIN_ID, SITE_ID
+from app.agents.intent_router import IntentResult, RouteResult
+from tests.conftest import ADMIN_ID, SITE_ID, test_session_factory
 
 pytestmark = pytest.mark.asyncio
 
@@ -18,14 +19,41 @@ def _mock_content_block(text: str):
 
 
 def _mock_anthropic_response(text: str, stop_reason: str = "end_turn"):
-    """Create a mock Anthropic messages.create response."""
+    """Create a mock Anthropic final message."""
     response = MagicMock()
     response.content = [_mock_content_block(text)]
     response.stop_reason = stop_reason
     return response
 
 
-@patch("app.agents.orchestrator.AsyncAnthropic")
+class _MockMessageStream:
+    """Async context manager mimicking client.messages.stream(...)."""
+
+    def __init__(self, response):
+        self.response = response
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        for block in self.response.content:
+            if block.type == "text":
+                yield MagicMock(type="text", text=block.text)
+            yield MagicMock(type="content_block_stop", content_block=block)
+
+    async def get_final_message(self):
+        return self.response
+
+
+# The agent run opens its own session through get_db's factory, not the dependency
+@patch("app.db.session.async_session_factory", test_session_factory)
+@patch("app.agents.orchestrator.get_anthropic_client")
 @patch("app.agents.orchestrator.RAGPipeline")
 @patch("app.agents.orchestrator.IntentRouter")
 async def test_chat_sse_stream(
@@ -35,12 +63,10 @@ async def test_chat_sse_stream(
     """POST /chat returns SSE stream with text_delta and done events."""
     # Mock IntentRouter
     mock_router = MagicMock()
-    mock_intent = MagicMock()
-    mock_intent.intent = "menu_query"
-    mock_intent.agent = "menu"
-    mock_intent.confidence = 0.9
-    mock_router.classify = AsyncMock(return_value=mock_intent)
-    mock_router.rewrite_query = AsyncMock(return_value="이번 주 식단 알려줘")
+    mock_intent = IntentResult(intent="menu_query", confidence=0.9, entities={}, agent="menu")
+    mock_router.route = AsyncMock(
+        return_value=RouteResult(intent=mock_intent, search_query="이번 주 식단 알려줘")
+    )
     mock_intent_cls.return_value = mock_router
 
     # Mock RAGPipeline
@@ -54,8 +80,8 @@ async def test_chat_sse_stream(
     # Mock Anthropic client
     mock_client = MagicMock()
     mock_client.messages = MagicMock()
-    mock_client.messages.create = AsyncMock(
-        return_value=_mock_anthropic_response("이번 주 식단은 다음과 같습니다.")
+    mock_client.messages.stream = MagicMock(
+        return_value=_MockMessageStream(_mock_anthropic_response("이번 주 식단은 다음과 같습니다."))
     )
     mock_anthropic_cls.return_value = mock_client
 
@@ -68,7 +94,7 @@ async def test_chat_sse_stream(
 
     # Parse SSE events
     events = []
-    for line in resp.text.strip().split("\n\n"):
+    for line in resp.text.splitlines():
         if line.startswith("data: "):
             event_data = json.loads(line.removeprefix("data: "))
             events.append(event_data)
@@ -0,0 +1,69 @@
+"""Unit tests for the token-budgeted conversation context builder."""
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents import context_builder
+from app.agents.context_builder import ConversationContextBuilder, count_tokens, load_encoding, message_tokens
+
+pytestmark = pytest.mark.asyncio
+
+
+def _turns(n: int) -> list[dict]:
+    messages = []
+    for i in range(n):
+        messages.append({"role": "user", "content": f"질문 {i} " * 20, "timestamp": "t"})
+        messages.append({"role": "assistant", "content": f"답변 {i} " * 20, "timestamp": "t"})
+    return messages
+
+
+def _builder(messages: list[dict], turns_in_budget: int, client=None) -> ConversationContextBuilder:
+    per_turn = message_tokens(messages[0]) + message_tokens(messages[1])
+    return ConversationContextBuilder(client or MagicMock(), budget_tokens=per_turn * turns_in_budget + 1)
+
+
+async def test_build_keeps_whole_recent_turns_within_budget():
+    """Only the newest turns that fit are replayed, starting on a user message."""
+    messages = _turns(10)
+    builder = _builder(messages, turns_in_budget=3)
+
+    history = builder.build(messages)
+
+    assert len(history) == 6
+    assert history[0]["role"] == "user"
+    assert history == [{"role": m["role"], "content": m["content"]} for m in messages[-6:]]
+
+
+async def test_refresh_summary_folds_only_messages_leaving_the_window():
+    """Messages already covered are not re-summarized."""
+    messages = _turns(10)
+    client = MagicMock()
+    client.messages.create = AsyncMock(return_value=SimpleNamespace(
+        content=[SimpleNamespace(text="- 요약")],
+    ))
+    builder = _builder(messages, turns_in_budget=3, client=client)
+    conv = SimpleNamespace(summary=None, summary_message_count=4)
+
+    assert await builder.refresh_summary(conv, messages) is True
+    assert conv.summary == "- 요약"
+    assert conv.summary_message_count == 14
+    prompt = client.messages.create.call_args.kwargs["messages"][0]["content"]
+    assert "질문 2" in prompt and "질문 1 " not in prompt
+
+    assert await builder.refresh_summary(conv, messages) is False
+    assert client.messages.create.await_count == 1
+
+
+async def test_tokenizer_is_never_loaded_on_the_event_loop():
+    """Before load_encoding (lifespan) ran, counting estimates instead of loading tiktoken inline."""
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2]
+    with patch.object(context_builder, "_load_encoding", MagicMock(return_value=encoding)) as load:
+        load.cache_info.return_value = SimpleNamespace(currsize=0)
+        assert count_tokens("재고 현황") == len("재고 현황") // 3 + 1
+        load.assert_not_called()
+
+        await load_encoding()
+        load.cache_info.return_value = SimpleNamespace(currsize=1)
+        assert count_tokens("재고 현황") == 2
@@ -0,0 +1,135 @@
+"""Unit tests for the concurrent keyword/vector legs of HybridRetriever."""
+import asyncio
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.config import settings
+from app.rag.retriever import HybridRetriever, RetrievedChunk
+
+pytestmark = pytest.mark.asyncio
+
+
+def _retriever(events: list, sessions: list) -> HybridRetriever:
+    @asynccontextmanager
+    async def session_factory():
+        session = object()
+        sessions.append(session)
+        try:
+            yield session
+        finally:
+            events.append("session_closed")
+
+    async def embed_single(query):
+        events.append("embed_start")
+        await asyncio.sleep(0.05)
+        events.append("embed_end")
+        return [1.0, 0.0]
+
+    embedder = MagicMock()
+    embedder.embed_single = embed_single
+    retriever = HybridRetriever(MagicMock(), embedder, session_factory=session_factory)
+    retriever._enrich_with_adjacent = AsyncMock(side_effect=lambda chunks: chunks)
+    return retriever
+
+
+async def test_keyword_leg_overlaps_embedding_and_legs_use_own_sessions():
+    events, sessions, leg_sessions = [], [], []
+    retriever = _retriever(events, sessions)
+    doc_id = uuid4()
+
+    async def keyword_search(query, doc_types, limit, db):
+        events.append("keyword_start")
+        leg_sessions.append(db)
+        return [(doc_id, "닭볶음탕", {}, 0.5)]
+
+    async def vector_search(embedding, doc_types, limit, db):
+        leg_sessions.append(db)
+        return [(doc_id, "닭볶음탕", {}, 0.9)]
+
+    retriever._keyword_search = keyword_search
+    retriever._vector_search = vector_search
+
+    chunks = await retriever.search("닭볶음탕")
+
+    assert [c.id for c in chunks] == [doc_id]
+    assert events.index("keyword_start") < events.index("embed_end")
+    assert len(set(map(id, leg_sessions))) == 2 and retriever.db not in leg_sessions
+
+
+async def test_failed_leg_cancels_the_other_and_releases_its_session():
+    events, sessions = [], []
+    retriever = _retriever(events, sessions)
+    keyword_cancelled = asyncio.Event()
+
+    async def keyword_search(query, doc_types, limit, db):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            keyword_cancelled.set()
+            raise
+
+    async def vector_search(embedding, doc_types, limit, db):
+        raise RuntimeError("vector leg failed")
+
+    retriever._keyword_search = keyword_search
+    retriever._vector_search = vector_search
+
+    with pytest.raises(RuntimeError):
+        await retriever.search("닭볶음탕")
+
+    assert keyword_cancelled.is_set()
+    assert events.count("session_closed") == len(sessions) == 2
+
+
+@patch.object(settings, "rag_fusion_mode", "sql")
+async def test_sql_fusion_on_postgres_returns_only_top_k_rows_in_one_statement():
+    events, sessions = [], []
+    retriever = _retriever(events, sessions)
+    retriever.db.get_bind.return_value.dialect.name = "postgresql"
+    doc_id = uuid4()
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(fetchall=lambda: [(doc_id, "닭볶음탕", None, 0.011)]))
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    retriever.session_factory = session_factory
+    retriever._keyword_search = AsyncMock()
+
+    chunks = await retriever.search("닭볶음탕", doc_types=["recipe"], top_k=3)
+
+    assert [(c.id, c.source) for c in chunks] == [(doc_id, "fused")]
+    statement, params = session.execute.await_args.args
+    assert "FULL OUTER JOIN" in str(statement) and params["top_k"] == 3
+    retriever._keyword_search.assert_not_awaited()
+
+
+async def test_adjacent_chunks_of_all_hits_fetched_in_one_query():
+    hit_a, hit_b = uuid4(), uuid4()
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(fetchall=lambda: [
+        (hit_a, 1, "앞 문단"), (hit_a, 3, "뒤 문단"), (hit_b, 10, "SOP 다음 단계"),
+    ]))
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    retriever = HybridRetriever(MagicMock(), MagicMock(), session_factory=session_factory)
+    chunks = [
+        RetrievedChunk(id=hit_a, content="본문"),
+        RetrievedChunk(id=hit_b, content="SOP 9단계"),
+        RetrievedChunk(id=uuid4(), content="단독"),
+    ]
+
+    enriched = await retriever._enrich_with_adjacent(chunks)
+
+    session.execute.assert_awaited_once()
+    assert session.execute.await_args.args[1]["ids"] == [c.id for c in chunks]
+    assert enriched[0].content == "본문\n\n[Adjacent context]\n앞 문단\n...\n뒤 문단"
+    assert enriched[1].content.endswith("SOP 다음 단계")
+    assert enriched[2].content == "단독"
@@ -0,0 +1,147 @@
+"""Unit tests for IntentRouter with a mocked Anthropic client."""
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents.intent_router import (
+    IntentRouter,
+    LocalIntentClassifier,
+    UserContext,
+    local_intent_classifier,
+)
+from app.config import settings
+from app.llm.admission import AdmissionTimeout
+from app.rag.query_text import strip_fillers
+
+pytestmark = pytest.mark.asyncio
+
+
+def _mock_text_response(text: str):
+    block = MagicMock()
+    block.type = "text"
+    block.text = text
+    response = MagicMock()
+    response.content = [block]
+    return response
+
+
+@patch("app.agents.intent_router.get_anthropic_client")
+async def test_route_returns_intent_and_search_query(mock_anthropic_cls):
+    """route() parses intent, entities and search_query from one JSON answer."""
+    payload = {
+        "intent": "inventory_check",
+        "confidence": 0.92,
+        "entities": {"date": "today"},
+        "agent": "purchase",
+        "search_query": "재고 현황",
+    }
+    mock_anthropic_cls.return_value.messages.create = AsyncMock(
+        return_value=_mock_text_response(json.dumps(payload, ensure_ascii=False))
+    )
+
+    router = IntentRouter(local_classifier=LocalIntentClassifier())
+    result = await router.route("오늘 재고 현황 좀 알려줘", UserContext(user_role="PUR"))
+
+    assert result.intent.intent == "inventory_check"
+    assert result.intent.agent == "purchase"
+    assert result.intent.entities == {"date": "today"}
+    assert result.search_query == "재고 현황"
+    assert mock_anthropic_cls.return_value.messages.create.await_count == 1
+
+
+@patch("app.agents.intent_router.get_anthropic_client")
+async def test_route_falls_back_on_invalid_json(mock_anthropic_cls):
+    """route() falls back to the general intent and the raw message."""
+    mock_anthropic_cls.return_value.messages.create = AsyncMock(
+        return_value=_mock_text_response("not json")
+    )
+
+    router = IntentRouter(local_classifier=LocalIntentClassifier())
+    result = await router.route("안녕하세요", UserContext())
+
+    assert result.intent.intent == "general"
+    assert result.intent.agent == "general"
+    assert result.search_query == "안녕하세요"
+
+
+@patch("app.agents.intent_router.get_anthropic_client")
+async def test_route_raises_when_llm_is_overloaded(mock_anthropic_cls):
+    """Queue timeouts and exhausted 529s are not silently turned into a guess."""
+    overloaded = Exception("overloaded")
+    overloaded.status_code = 529
+    router = IntentRouter(local_classifier=LocalIntentClassifier())
+
+    for error in (AdmissionTimeout("anthropic", 5.0), overloaded):
+        mock_anthropic_cls.return_value.messages.create = AsyncMock(side_effect=error)
+        with pytest.raises(type(error)):
+            await router.route("안녕하세요", UserContext())
+
+
+@patch("app.agents.intent_router.get_anthropic_client")
+async def test_route_failure_falls_back_to_local_guess(mock_anthropic_cls):
+    """Other LLM failures use the local best guess, marked as a fallback."""
+    mock_anthropic_cls.return_value.messages.create = AsyncMock(side_effect=RuntimeError("boom"))
+    classifier = LocalIntentClassifier.from_descriptions("- forecast_demand: 식수 예측 (내일 몇명)")
+
+    with patch.object(settings, "intent_local_enabled", False):
+        result = await IntentRouter(local_classifier=classifier).route("내일 식수 예측", UserContext())
+
+    assert (result.intent.intent, result.intent.source) == ("forecast_demand", "fallback")
+    assert result.search_query == "내일 식수 예측"
+
+
+@pytest.mark.parametrize("message,intent", [
+    # The phrasings cited when the fast path was requested
+    ("오늘 재고 현황", "inventory_check"),
+    ("내일 식수 예측", "forecast_demand"),
+    ("발주서 만들어줘", "purchase_order"),
+    # Stock words, but an order request
+    ("재고 부족한 품목 발주서 만들어줘", "purchase_order"),
+    ("김치찌개 레시피 알려줘", "recipe_search"),
+    ("원가 시뮬레이션 해줘", "optimize_cost"),
+    ("작업지시서 출력", "work_order"),
+])
+async def test_local_classifier_seeded_from_prompt(message, intent):
+    """Prompt keywords and seed examples classify common phrasing above the threshold."""
+    result = local_intent_classifier.predict(message)
+    assert result.intent == intent
+    assert result.source == "local"
+    assert result.confidence >= 0.75
+
+
+async def test_local_classifier_is_unsure_on_unrelated_text():
+    """Off-domain or vague messages stay below the threshold or do not match."""
+    for message in ("안녕하세요", "오늘 날씨 어때", "이거 왜 이래"):
+        result = local_intent_classifier.predict(message)
+        assert result is None or result.confidence < 0.75
+
+
+async def test_local_classifier_learns_from_examples():
+    """Audit-style (message, intent) examples extend the profiles."""
+    classifier = LocalIntentClassifier()
+    assert classifier.predict("냉동 창고 정리") is None
+    classifier.add_examples([("냉동 창고 정리 현황", "inventory_check")])
+    assert classifier.predict("냉동 창고 정리").intent == "inventory_check"
+
+
+@patch("app.agents.intent_router.get_anthropic_client")
+async def test_route_local_hit_skips_llm(mock_anthropic_cls):
+    """A confident local classification answers without any LLM call."""
+    mock_anthropic_cls.return_value.messages.create = AsyncMock()
+    classifier = LocalIntentClassifier.from_descriptions("- forecast_demand: 식수 예측 (내일 몇명)")
+    classifier.add_examples([("클레임 접수", "manage_claim")])
+
+    result = await IntentRouter(local_classifier=classifier).route("내일 식수 예측해줘", UserContext())
+
+    assert result.intent.intent == "forecast_demand"
+    assert result.intent.agent == "demand"
+    assert result.search_query == "내일 식수 예측"
+    mock_anthropic_cls.return_value.messages.create.assert_not_awaited()
+    assert classifier.stats()["local_hits"] == 1
+    assert classifier.stats()["hit_rate"] == 1.0
+
+
+async def test_strip_fillers():
+    assert strip_fillers("그거 좀 재고 보여줘") == "재고"
+    assert strip_fillers("원인 분석해줘") == "원인 분석"
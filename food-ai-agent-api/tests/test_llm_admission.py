@@ -0,0 +1,112 @@
+"""Unit tests for LLM admission control."""
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+from app.llm.admission import AdmissionTimeout, AdmittedAnthropic, ProviderLimiter, bind_site
+from app.llm.replay import Cassette, ReplayAnthropic
+
+pytestmark = pytest.mark.asyncio
+
+
+class _StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = MagicMock(headers={})
+
+
+async def test_per_site_cap_limits_concurrency_within_a_site():
+    limiter = ProviderLimiter("test", max_concurrency=10, site_concurrency=2, queue_timeout=5)
+    running, peak = 0, 0
+
+    async def call():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.02)
+        running -= 1
+
+    async def site_call():
+        bind_site("site-a")
+        await limiter.call(call)
+
+    await asyncio.gather(*(site_call() for _ in range(6)))
+
+    assert peak == 2
+    assert limiter.stats()["admitted"] == 6
+    assert limiter.stats()["in_flight"] == 0
+
+
+async def test_queue_timeout_raises_admission_timeout():
+    limiter = ProviderLimiter("test", max_concurrency=1, site_concurrency=1, queue_timeout=0.05)
+    bind_site(None)
+
+    async with limiter.slot():
+        with pytest.raises(AdmissionTimeout):
+            async with limiter.slot():
+                pass
+
+    assert limiter.stats()["timeouts"] == 1
+    async with limiter.slot():  # the failed waiter released nothing it did not hold
+        pass
+
+
+async def test_rate_limit_errors_are_retried_with_backoff():
+    limiter = ProviderLimiter("test", max_concurrency=1, site_concurrency=1, max_retries=3)
+    attempts = []
+
+    async def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _StatusError(529 if len(attempts) == 1 else 429)
+        return "ok"
+
+    with patch("app.llm.admission.asyncio.sleep") as sleep:
+        sleep.return_value = None
+        assert await limiter.call(flaky) == "ok"
+
+    assert len(attempts) == 3
+    assert limiter.stats()["retries"] == 2
+
+
+async def test_server_and_connection_errors_are_retried_like_the_sdk():
+    limiter = ProviderLimiter("test", max_concurrency=1, site_concurrency=1, max_retries=3)
+    errors = [
+        _StatusError(503),
+        openai.APIConnectionError(request=httpx.Request("POST", "https://api.openai.com/v1/embeddings")),
+    ]
+
+    async def flaky():
+        if errors:
+            raise errors.pop(0)
+        return "ok"
+
+    with patch("app.llm.admission.asyncio.sleep"):
+        assert await limiter.call(flaky) == "ok"
+
+    assert limiter.stats()["retries"] == 2
+
+
+async def test_non_retryable_errors_propagate_immediately():
+    limiter = ProviderLimiter("test", max_concurrency=1, site_concurrency=1)
+
+    async def bad_request():
+        raise _StatusError(400)
+
+    with pytest.raises(_StatusError):
+        await limiter.call(bad_request)
+    assert limiter.stats()["retries"] == 0
+
+
+async def test_stream_holds_slot_until_closed():
+    limiter = ProviderLimiter("test", max_concurrency=1, site_concurrency=1)
+    client = AdmittedAnthropic(ReplayAnthropic(Cassette(None)), limiter)
+
+    async with client.messages.stream(model="m", max_tokens=10, messages=[]) as stream:
+        assert limiter.stats()["in_flight"] == 1
+        await stream.get_final_message()
+    assert limiter.stats()["in_flight"] == 0
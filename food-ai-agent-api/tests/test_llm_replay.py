@@ -0,0 +1,73 @@
+"""Unit tests for the shared LLM clients and the offline replay backends."""
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.llm import clients
+from app.llm.replay import Cassette, RecordingAnthropic, ReplayAnthropic, ReplayOpenAI, _message
+
+pytestmark = pytest.mark.asyncio
+
+CASSETTE = "scripts/fixtures/chat_cassette.json"
+TURN = "닭볶음탕 300인분 레시피 찾아줘"
+
+
+async def test_stream_replays_text_and_tool_use_per_iteration():
+    client = ReplayAnthropic(Cassette(CASSETTE))
+    messages = [{"role": "user", "content": TURN}]
+
+    async with client.messages.stream(model="m", max_tokens=10, messages=messages) as stream:
+        events = [event async for event in stream]
+        final = await stream.get_final_message()
+
+    text = "".join(e.text for e in events if e.type == "text")
+    assert text == "닭볶음탕 레시피를 검색하겠습니다."
+    tool_block = [e.content_block for e in events if e.type == "content_block_stop"][-1]
+    assert (tool_block.type, tool_block.name) == ("tool_use", "search_recipes")
+    assert final.stop_reason == "tool_use"
+
+    messages += [
+        {"role": "assistant", "content": [{"type": "tool_use", "id": tool_block.id}]},
+        {"role": "user", "content": [{"type": "tool_result", "tool_use_id": tool_block.id, "content": "{}"}]},
+    ]
+    async with client.messages.stream(model="m", max_tokens=10, messages=messages) as stream:
+        final = await stream.get_final_message()
+    assert final.stop_reason == "end_turn"
+
+
+async def test_unknown_create_falls_back_to_default():
+    client = ReplayAnthropic(Cassette(None))
+    response = await client.messages.create(model="m", max_tokens=10, messages=[{"role": "user", "content": "?"}])
+    assert '"intent": "general"' in response.content[0].text
+
+
+async def test_recorded_responses_replay_by_exact_key(tmp_path):
+    live = MagicMock()
+    live.messages.create = AsyncMock(return_value=_message({"content": [{"type": "text", "text": "녹화됨"}]}))
+    path = tmp_path / "cassette.json"
+    kwargs = {"model": "m", "max_tokens": 50, "messages": [{"role": "user", "content": "요약해줘"}]}
+
+    await RecordingAnthropic(live, Cassette(str(path))).messages.create(**kwargs)
+    response = await ReplayAnthropic(Cassette(str(path))).messages.create(**kwargs)
+
+    assert response.content[0].text == "녹화됨"
+
+
+async def test_fake_embeddings_are_deterministic_unit_vectors():
+    client = ReplayOpenAI()
+    a = await client.embeddings.create(model="m", input=["김치찌개", "된장찌개"], dimensions=8)
+    b = await client.embeddings.create(model="m", input="김치찌개", dimensions=8)
+
+    assert a.data[0].embedding == b.data[0].embedding
+    assert a.data[0].embedding != a.data[1].embedding
+    assert abs(sum(v * v for v in b.data[0].embedding) - 1.0) < 1e-9
+
+
+async def test_shared_clients_are_reused_and_closed():
+    first = clients.get_anthropic_client()
+    assert clients.get_anthropic_client() is first
+    assert clients.get_openai_client() is clients.get_openai_client()
+
+    await clients.close_llm_clients()
+    assert clients.get_anthropic_client() is not first
+    await clients.close_llm_clients()
@@ -0,0 +1,138 @@
+"""Unit tests for LLM token/cost accounting and site budgets."""
+import uuid
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.config import settings
+from app.llm.replay import Cassette, ReplayAnthropic, ReplayOpenAI
+from app.llm.usage import (
+    BUDGET_HARD,
+    BUDGET_OK,
+    BUDGET_SOFT,
+    MeteredAnthropic,
+    MeteredOpenAI,
+    UsageLedger,
+    cost_usd,
+    start_usage_meter,
+)
+
+CASSETTE = "scripts/fixtures/chat_cassette.json"
+
+
+@pytest.mark.asyncio
+async def test_meter_counts_create_stream_and_embedding_calls():
+    meter = start_usage_meter()
+    anthropic = MeteredAnthropic(ReplayAnthropic(Cassette(CASSETTE)))
+    messages = [{"role": "user", "content": "닭볶음탕 300인분 레시피 찾아줘"}]
+
+    await anthropic.messages.create(model="claude-sonnet-4-6", max_tokens=10, messages=messages)
+    async with anthropic.messages.stream(model="claude-sonnet-4-6", max_tokens=10, messages=messages) as stream:
+        async for _ in stream:
+            pass
+    await MeteredOpenAI(ReplayOpenAI()).embeddings.create(
+        model="text-embedding-3-small", input="닭볶음탕", dimensions=8,
+    )
+
+    claude = meter.models["claude-sonnet-4-6"]
+    assert claude["requests"] == 2
+    assert meter.models["text-embedding-3-small"]["input_tokens"] > 0
+    assert meter.to_dict()["cost_usd"] == round(
+        cost_usd("claude-sonnet-4-6", claude) + cost_usd("text-embedding-3-small", meter.models["text-embedding-3-small"]), 6
+    )
+
+
+class _FailingStreamManager:
+    """Bills input tokens, streams some output, then drops the connection."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __aiter__(self):
+        return self._events()
+
+    async def _events(self):
+        usage = SimpleNamespace(input_tokens=1200, output_tokens=1, cache_read_input_tokens=800)
+        yield SimpleNamespace(type="message_start", message=SimpleNamespace(usage=usage))
+        yield SimpleNamespace(type="text", text="닭볶음탕")
+        yield SimpleNamespace(type="message_delta", usage=SimpleNamespace(output_tokens=40))
+        raise ConnectionError("stream dropped")
+
+
+@pytest.mark.asyncio
+async def test_stream_failing_midway_records_the_usage_seen_so_far():
+    meter = start_usage_meter()
+    client = MagicMock()
+    client.messages.stream.return_value = _FailingStreamManager()
+
+    with pytest.raises(ConnectionError):
+        async with MeteredAnthropic(client).messages.stream(model="claude-sonnet-4-6", messages=[]) as stream:
+            async for _ in stream:
+                pass
+
+    counts = meter.models["claude-sonnet-4-6"]
+    assert (counts["requests"], counts["input_tokens"], counts["output_tokens"]) == (1, 1200, 40)
+    assert counts["cache_read_input_tokens"] == 800
+    assert meter.cost_usd() > 0
+
+
+def test_cache_reads_are_priced_below_fresh_input():
+    fresh = cost_usd("claude-sonnet-4-6", {"input_tokens": 1_000_000})
+    cached = cost_usd("claude-sonnet-4-6", {"cache_read_input_tokens": 1_000_000})
+    assert (fresh, cached) == (3.0, 0.3)
+
+
+def _ledger(spend: float) -> UsageLedger:
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=MagicMock(scalar_one=MagicMock(return_value=spend)))
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return UsageLedger(session_factory=factory)
+
+
+@pytest.mark.asyncio
+async def test_budget_status_follows_soft_and_hard_limits():
+    site = uuid.uuid4()
+    with patch.object(settings, "llm_site_daily_soft_budget_usd", 5.0), \
+         patch.object(settings, "llm_site_daily_hard_budget_usd", 10.0):
+        assert await _ledger(1.0).budget_status(site) == BUDGET_OK
+
+        ledger = _ledger(6.0)
+        assert await ledger.budget_status(site) == BUDGET_SOFT
+        ledger.add(site, 4.5)  # spend of later runs counts without reloading
+        assert await ledger.budget_status(site) == BUDGET_HARD
+
+        with patch.object(settings, "llm_site_budgets", {str(site): {"hard": 0}}):
+            assert await _ledger(50.0).budget_status(site) == BUDGET_SOFT
+
+
+@pytest.mark.asyncio
+async def test_failed_run_still_records_its_usage():
+    from app.agents.intent_router import IntentResult, RouteResult
+    from app.agents.orchestrator import AgentOrchestrator
+
+    db = MagicMock()
+    db.execute = AsyncMock(return_value=MagicMock(scalar_one_or_none=MagicMock(return_value=MagicMock())))
+    client = MagicMock()
+    client.messages.stream.side_effect = RuntimeError("stream failed")
+    with patch("app.agents.orchestrator.RAGPipeline"):
+        orch = AgentOrchestrator(db, client=client)
+    orch.intent_router.route = AsyncMock(return_value=RouteResult(
+        intent=IntentResult(intent="dashboard", confidence=0.9, entities={}, agent="general"),
+        search_query="오늘 현황",
+    ))
+    orch._load_history = AsyncMock(return_value=([], None))
+    orch._record_usage = AsyncMock()
+    site_id = uuid.uuid4()
+
+    with patch("app.agents.orchestrator.usage_ledger.budget_status", AsyncMock(return_value=BUDGET_OK)), \
+            patch.object(settings, "rag_speculative_enabled", False), pytest.raises(RuntimeError):
+        async for _ in orch.run("오늘 현황", MagicMock(role="ADM"), site_id):
+            pass
+
+    assert orch._record_usage.await_args.args[:2] == (site_id, "general")
@@ -0,0 +1,97 @@
+"""Unit tests for the background persistence writer."""
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.agents import persistence_writer as pw
+from app.agents.persistence_writer import ConversationTurn, PersistenceWriter
+from app.models.orm.audit_log import AuditLog
+
+pytestmark = pytest.mark.asyncio
+
+
+def _session_factory():
+    sessions = []
+
+    def factory():
+        session = MagicMock()
+        session.commit = AsyncMock()
+        sessions.append(session)
+        ctx = MagicMock()
+        ctx.__aenter__ = AsyncMock(return_value=session)
+        ctx.__aexit__ = AsyncMock(return_value=False)
+        return ctx
+
+    return factory, sessions
+
+
+def _turn(conversation_id=None) -> ConversationTurn:
+    return ConversationTurn(
+        conversation_id=conversation_id or uuid.uuid4(),
+        user_id=uuid.uuid4(),
+        site_id=uuid.uuid4(),
+        context_type="menu",
+        user_message="질문",
+        assistant_response="답변",
+    )
+
+
+async def test_batches_turns_and_audits_in_one_transaction():
+    """Items queued together are written with a single session commit."""
+    factory, sessions = _session_factory()
+    writer = PersistenceWriter(session_factory=factory, batch_size=3, flush_interval_ms=1000, durable=True)
+    append = AsyncMock(return_value=[])
+    after_commit = AsyncMock()
+
+    with patch.object(pw, "append_conversation_turns", append):
+        await writer.start()
+        turn = _turn()
+        assert await writer.submit_turn(turn, after_commit=after_commit)
+        assert writer.pending_messages(turn.conversation_id)[0]["content"] == "질문"
+        assert await writer.submit_turn(_turn())
+        assert await writer.submit_audit(AuditLog(action="ai_chat"))
+        await writer.stop()
+
+    assert len(sessions) == 1
+    assert len(append.await_args.args[1]) == 2
+    assert len(sessions[0].add_all.call_args.args[0]) == 1
+    sessions[0].commit.assert_awaited_once()
+    after_commit.assert_awaited_once()
+    assert writer.pending_messages(turn.conversation_id) == []
+    assert writer.stats()["written"] == 3
+
+
+async def test_durable_stop_flushes_partial_batch():
+    """Shutdown drains items still waiting for the flush interval."""
+    factory, sessions = _session_factory()
+    writer = PersistenceWriter(session_factory=factory, batch_size=50, flush_interval_ms=60_000, durable=True)
+
+    with patch.object(pw, "append_conversation_turns", AsyncMock(return_value=[])):
+        await writer.start()
+        await writer.submit_turn(_turn())
+        await asyncio.wait_for(writer.stop(), timeout=1)
+
+    assert sessions and sessions[0].commit.await_count == 1
+    assert writer.stats()["dropped"] == 0
+
+
+async def test_full_queue_applies_backpressure_then_rejects():
+    """Producers wait for space, then fall back to inline writes."""
+    writer = PersistenceWriter(max_queue=1, enqueue_timeout_ms=20, durable=False)
+    writer._accepting = True
+    writer._queue = asyncio.Queue(maxsize=1)
+    writer._task = asyncio.create_task(asyncio.sleep(10))  # consumer stalled
+
+    assert await writer.submit_audit(AuditLog(action="ai_chat")) is True
+    assert await writer.submit_audit(AuditLog(action="ai_chat")) is False
+    assert writer.stats()["backpressure_waits"] == 1
+    assert writer.stats()["rejected"] == 1
+
+    await writer.stop()
+    assert writer.stats()["dropped"] == 1
+
+
+async def test_not_running_writer_rejects_so_caller_writes_inline():
+    assert await PersistenceWriter().submit_turn(_turn()) is False
@@ -0,0 +1,70 @@
+"""Unit tests for speculative RAG retrieval."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.agents.orchestrator import AgentOrchestrator
+from app.agents.retrieval_policy import RetrievalPolicy
+from app.rag.speculation import is_same_query, speculation_stats
+
+POLICY = RetrievalPolicy(doc_types=("recipe", "sop"))
+
+
+def test_normalized_queries_ignore_fillers_and_punctuation():
+    assert is_same_query("닭볶음탕 레시피 알려줘!", "닭볶음탕 레시피")
+    assert not is_same_query("닭볶음탕 레시피", "김치찌개 레시피")
+
+
+def _orchestrator(query_embedding):
+    orch = AgentOrchestrator(MagicMock(), client=MagicMock())
+    orch.rag = MagicMock()
+    orch.rag.embedder.embed_single = AsyncMock(return_value=query_embedding)
+    orch.rag.retrieve = AsyncMock(return_value="fresh")
+    return orch
+
+
+async def _speculation(embedding):
+    return embedding, "speculative"
+
+
+@pytest.mark.asyncio
+async def test_near_duplicate_rewrite_reuses_speculative_result():
+    orch = _orchestrator([0.99, 0.1])
+    hits = speculation_stats.hits
+
+    context = await orch._resolve_speculation(
+        asyncio.create_task(_speculation([1.0, 0.0])), POLICY,
+        "닭볶음탕 300인분 레시피 찾아줘", "닭볶음탕 대량조리 레시피", POLICY,
+    )
+
+    assert context == "speculative"
+    assert speculation_stats.hits == hits + 1
+    orch.rag.retrieve.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_divergent_rewrite_retrieves_again_with_its_embedding():
+    orch = _orchestrator([0.0, 1.0])
+
+    context = await orch._resolve_speculation(
+        asyncio.create_task(_speculation([1.0, 0.0])), POLICY,
+        "그거 어떻게 돼?", "HACCP 중요관리점 점검 기록", POLICY,
+    )
+
+    assert context == "fresh"
+    assert orch.rag.retrieve.await_args.kwargs["query_embedding"] == [0.0, 1.0]
+
+
+@pytest.mark.asyncio
+async def test_failed_query_embedding_cancels_the_speculation():
+    orch = _orchestrator(None)
+    orch.rag.embedder.embed_single = AsyncMock(side_effect=RuntimeError("embedding failed"))
+    speculative_task = asyncio.create_task(asyncio.sleep(10))
+
+    with pytest.raises(RuntimeError):
+        await orch._resolve_speculation(
+            speculative_task, POLICY, "그거 어떻게 돼?", "HACCP 중요관리점 점검 기록", POLICY,
+        )
+
+    assert speculative_task.cancelled()
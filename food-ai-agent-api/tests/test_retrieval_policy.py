@@ -0,0 +1,38 @@
+"""Unit tests for per-intent retrieval policies."""
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import uuid4
+
+import pytest
+
+from app.agents.retrieval_policy import get_retrieval_policy
+from app.config import settings
+from app.rag.pipeline import RAGPipeline
+from app.rag.retriever import RetrievedChunk
+
+
+def test_tool_only_intents_skip_and_agents_fall_back_to_their_doc_types():
+    assert get_retrieval_policy("inventory_check", "purchase").skip
+    assert get_retrieval_policy("dashboard", "general").skip
+
+    policy = get_retrieval_policy("purchase_risk", "purchase")
+    assert not policy.skip
+    assert policy.doc_types == ("policy",)
+
+
+def test_settings_override_policy_fields():
+    overrides = {"dashboard": {"skip": False, "doc_types": ["policy"], "top_k": 2}}
+    with patch.object(settings, "rag_intent_policies", overrides):
+        policy = get_retrieval_policy("dashboard", "general")
+    assert (policy.skip, policy.doc_types, policy.top_k) == (False, ("policy",), 2)
+
+
+@pytest.mark.asyncio
+async def test_token_budget_drops_lowest_ranked_chunks():
+    pipeline = RAGPipeline(MagicMock())
+    chunks = [RetrievedChunk(id=uuid4(), content="가" * 300, metadata={"title": f"문서{i}"}) for i in range(5)]
+    pipeline.retriever.search = AsyncMock(return_value=chunks)
+
+    context = await pipeline.retrieve("레시피", max_tokens=250)
+
+    assert len(context.chunks) == 2
+    assert context.total_tokens_estimate <= 250
@@ -0,0 +1,76 @@
+"""Unit tests for resumable background agent runs."""
+import asyncio
+import json
+import uuid
+
+import pytest
+
+from app.agents.run_registry import HEARTBEAT, RunRegistry
+
+pytestmark = pytest.mark.asyncio
+
+USER = uuid.uuid4()
+
+
+def _event(text: str) -> str:
+    return f"data: {json.dumps({'type': 'text_delta', 'content': text}, ensure_ascii=False)}\n\n"
+
+
+async def _collect(stream) -> list[str]:
+    return [chunk async for chunk in stream]
+
+
+async def test_run_survives_disconnect_and_replays_after_last_event_id():
+    release = asyncio.Event()
+
+    async def events():
+        yield _event("안녕")
+        await release.wait()
+        yield _event("하세요")
+        yield 'data: {"type": "done"}\n\n'
+
+    registry = RunRegistry()
+    run = registry.start(USER, events())
+
+    # First connection reads the run + first delta, then drops
+    stream = run.stream()
+    first = [await stream.__anext__(), await stream.__anext__()]
+    await stream.aclose()
+    assert first[1].startswith("id: 2\n") and "안녕" in first[1]
+
+    release.set()
+    await run.task
+    resumed = await _collect(registry.get(run.id, USER).stream(after_seq=2))
+
+    assert [chunk.split("\n")[0] for chunk in resumed] == ["id: 3", "id: 4"]
+    assert registry.get(run.id, uuid.uuid4()) is None
+
+
+async def test_idle_stream_sends_heartbeats():
+    release = asyncio.Event()
+
+    async def events():
+        await release.wait()
+        yield 'data: {"type": "done"}\n\n'
+
+    run = RunRegistry().start(USER, events())
+    stream = run.stream(after_seq=1, heartbeat_s=0.01)
+
+    assert await stream.__anext__() == HEARTBEAT
+    release.set()
+    assert (await stream.__anext__()).startswith("id: 2\n")
+
+
+async def test_failed_run_ends_with_error_and_done():
+    async def events():
+        yield _event("부분")
+        raise RuntimeError("boom")
+
+    registry = RunRegistry()
+    run = registry.start(USER, events())
+    await run.task
+
+    chunks = await _collect(run.stream())
+    types = [json.loads(c.split("data: ", 1)[1])["type"] for c in chunks]
+    assert types == ["run", "text_delta", "error", "done"]
+    assert registry.stats()["failed"] == 1
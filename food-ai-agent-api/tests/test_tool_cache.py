@@ -0,0 +1,141 @@
+"""Unit tests for the read-only tool result cache."""
+import dataclasses
+from unittest.mock import AsyncMock, MagicMock, patch
+from uuid import UUID, uuid4
+
+import pytest
+from sqlalchemy import Column, Integer, create_engine, update
+from sqlalchemy.orm import DeclarativeBase, Session
+
+from app.agents.orchestrator import AgentOrchestrator
+from app.agents.tool_cache import ToolResultCache, tool_result_cache
+from app.agents.tools.dispatch import get_tool_spec
+
+SITE = "10000000-0000-0000-0000-000000000001"
+
+
+def test_hit_after_put_with_normalized_input():
+    """Key ignores dict order, None values and scalar list order."""
+    cache = ToolResultCache()
+    cache.put("compare_vendors", {"item_ids": ["b", "a"], "site_id": SITE, "compare_period": None}, SITE, {"n": 1})
+
+    assert cache.get("compare_vendors", {"site_id": SITE, "item_ids": ["a", "b"]}, SITE) == {"n": 1}
+    assert cache.get("compare_vendors", {"item_ids": ["a"]}, SITE) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_site_is_part_of_the_key():
+    cache = ToolResultCache()
+    cache.put("check_inventory", {}, SITE, {"total_items": 3})
+    assert cache.get("check_inventory", {}, "other-site") is None
+
+
+def test_write_tools_and_errors_are_never_cached():
+    cache = ToolResultCache()
+    cache.put("calculate_bom", {"menu_plan_id": "m", "headcount": 10}, SITE, {"bom_id": "x"})
+    cache.put("check_inventory", {}, SITE, {"error": "boom"})
+
+    assert cache.get("calculate_bom", {"menu_plan_id": "m", "headcount": 10}, SITE) is None
+    assert cache.get("check_inventory", {}, SITE) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_entries_expire_after_ttl():
+    cache = ToolResultCache()
+    with patch("app.agents.tool_cache.time.monotonic", return_value=1000.0):
+        cache.put("query_dashboard", {"site_id": SITE}, SITE, {"ok": True})
+    with patch("app.agents.tool_cache.time.monotonic", return_value=1000.0 + 61):
+        assert cache.get("query_dashboard", {"site_id": SITE}, SITE) is None
+
+
+def test_cached_result_is_a_copy():
+    cache = ToolResultCache()
+    cache.put("check_inventory", {}, SITE, {"items": [1]})
+    cache.get("check_inventory", {}, SITE)["items"].append(2)
+    assert cache.get("check_inventory", {}, SITE) == {"items": [1]}
+
+
+def test_invalidate_tables_only_drops_dependent_tools():
+    cache = ToolResultCache()
+    cache.put("check_inventory", {}, SITE, {"a": 1})
+    cache.put("scale_recipe", {"recipe_id": "r", "target_servings": 100}, SITE, {"b": 2})
+
+    assert cache.invalidate_tables({"inventory_lots"}) == 1
+    assert cache.get("check_inventory", {}, SITE) is None
+    assert cache.get("scale_recipe", {"recipe_id": "r", "target_servings": 100}, SITE) == {"b": 2}
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class _Inventory(_Base):
+    __tablename__ = "inventory"
+    id = Column(Integer, primary_key=True)
+    quantity = Column(Integer)
+
+
+@pytest.fixture
+def sqlite_session():
+    engine = create_engine("sqlite://")
+    _Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+    engine.dispose()
+
+
+def test_orm_writes_invalidate_global_cache_on_commit(sqlite_session):
+    """Flushed and bulk ORM writes on any session evict dependent entries once committed."""
+    tool_result_cache.clear()
+    tool_result_cache.put("check_inventory", {}, SITE, {"total_items": 0})
+    sqlite_session.add(_Inventory(id=1, quantity=5))
+    sqlite_session.commit()
+    assert tool_result_cache.get("check_inventory", {}, SITE) is None
+
+    tool_result_cache.put("check_inventory", {}, SITE, {"total_items": 1})
+    sqlite_session.execute(update(_Inventory).values(quantity=3))
+    sqlite_session.commit()
+    assert tool_result_cache.get("check_inventory", {}, SITE) is None
+
+
+def test_reader_caching_between_flush_and_commit_is_invalidated(sqlite_session):
+    """A result cached by another reader after the flush is dropped at commit, not before."""
+    tool_result_cache.clear()
+    sqlite_session.add(_Inventory(id=1, quantity=5))
+    sqlite_session.flush()
+    tool_result_cache.put("check_inventory", {}, SITE, {"total_items": 0})
+    assert tool_result_cache.get("check_inventory", {}, SITE) == {"total_items": 0}
+
+    sqlite_session.commit()
+    assert tool_result_cache.get("check_inventory", {}, SITE) is None
+
+
+def test_rolled_back_writes_do_not_invalidate(sqlite_session):
+    tool_result_cache.clear()
+    sqlite_session.add(_Inventory(id=1, quantity=5))
+    sqlite_session.flush()
+    sqlite_session.rollback()
+    tool_result_cache.put("check_inventory", {}, SITE, {"total_items": 0})
+    sqlite_session.commit()
+
+    assert tool_result_cache.get("check_inventory", {}, SITE) == {"total_items": 0}
+
+
+@pytest.mark.asyncio
+async def test_read_after_a_write_in_the_same_run_bypasses_the_cache(sqlite_session):
+    """Until the run commits, a tool reading a table it wrote must not get the cached result."""
+    tool_result_cache.clear()
+    handler = AsyncMock(side_effect=[{"total_items": 0}, {"total_items": 1}])
+    spec = dataclasses.replace(get_tool_spec("check_inventory"), handler=handler)
+    orch = AgentOrchestrator(MagicMock(), client=MagicMock())
+    user = MagicMock(role="ADM", id=uuid4())
+
+    with patch("app.agents.orchestrator.get_tool_spec", return_value=spec):
+        before = await orch._execute_tool("check_inventory", {}, user, UUID(SITE), db=sqlite_session)
+        sqlite_session.add(_Inventory(id=1, quantity=5))
+        sqlite_session.flush()
+        after = await orch._execute_tool("check_inventory", {}, user, UUID(SITE), db=sqlite_session)
+
+    assert (before, after) == ({"total_items": 0}, {"total_items": 1})
+    assert handler.await_count == 2
@@ -0,0 +1,44 @@
+"""Unit tests for tool result compaction."""
+import json
+
+from app.agents.context_builder import count_tokens
+from app.agents.tool_compactor import CompactionPolicy, ToolResultCompactor, compact_value
+
+
+def test_compact_value_drops_nulls_rounds_floats_and_truncates_lists():
+    result = {
+        "total_cost": 12345.678901,
+        "warning": None,
+        "items": [{"name": f"품목{i}", "price": 1000.0 / 3, "note": None} for i in range(30)],
+    }
+
+    compacted = compact_value(result, CompactionPolicy(max_list_items=5))
+
+    assert "warning" not in compacted
+    assert compacted["total_cost"] == 12345.68
+    assert len(compacted["items"]) == 6
+    assert compacted["items"][0] == {"name": "품목0", "price": 333.33}
+    assert compacted["items"][-1] == "... 외 25건 생략 (총 30건)"
+
+
+def test_per_key_list_limit_overrides_default():
+    policy = CompactionPolicy(max_list_items=20, list_limits={"lots": 4})
+    compacted = compact_value({"lots": list(range(10)), "items": list(range(10))}, policy)
+
+    assert len(compacted["lots"]) == 5
+    assert compacted["items"] == list(range(10))
+
+
+def test_compact_respects_token_cap():
+    """Oversized results shrink list limits, then hard-truncate, to fit the cap."""
+    compactor = ToolResultCompactor(token_cap=300)
+    result = {"inventory_items": [{"item_name": f"식재료 {i}", "quantity": i * 1.5} for i in range(500)]}
+
+    text = compactor.compact("check_inventory", result)
+
+    assert count_tokens(text) <= 300 + 40
+    assert "총 500건" in text
+    json.loads(text)
+    stats = compactor.stats()
+    assert stats["results"] == 1
+    assert stats["saved_tokens"] > 0
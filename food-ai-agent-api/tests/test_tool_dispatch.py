@@ -0,0 +1,39 @@
+"""Unit tests for the compiled tool dispatch table."""
+from uuid import uuid4
+
+import pytest
+
+from app.agents.tools.dispatch import TOOL_SPECS, ToolInputError, get_tool_spec
+from app.agents.tools.registry import ALL_TOOLS
+
+
+def test_every_advertised_tool_has_a_handler():
+    assert {t["name"] for t in ALL_TOOLS} == set(TOOL_SPECS)
+
+
+def test_bind_injects_site_fills_defaults_renames_and_passes_user():
+    site_id, user_id = uuid4(), uuid4()
+
+    kwargs = get_tool_spec("simulate_cost").bind(
+        {"menu_plan_id": "mp-1", "target_cost_per_meal": 4500, "headcount": 300, "note": "x"},
+        site_id, user_id,
+    )
+
+    assert kwargs == {
+        "site_id": str(site_id),
+        "menu_plan_id": "mp-1",
+        "target_cost_per_meal": 4500,
+        "headcount": 300,
+        "suggest_alternatives_flag": True,
+        "created_by": user_id,
+    }
+
+
+@pytest.mark.parametrize("tool_input, message", [
+    ({"date": "2026-10-17"}, "missing required field(s) checklist_type"),
+    ({"date": "17/10/2026", "checklist_type": "daily"}, "date: invalid date"),
+    ({"date": "2026-10-17", "checklist_type": "monthly"}, "checklist_type: must be one of"),
+])
+def test_invalid_input_is_rejected(tool_input, message):
+    with pytest.raises(ToolInputError, match=message.replace("(", r"\(").replace(")", r"\)")):
+        get_tool_spec("generate_haccp_checklist").bind(tool_input, uuid4(), uuid4())
@@ -0,0 +1,119 @@
+"""Unit tests for the parallel tool executor."""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from app.agents.tool_executor import ParallelToolExecutor, ToolCall
+
+pytestmark = pytest.mark.asyncio
+
+
+def _session_factory(session):
+    factory = MagicMock()
+    factory.return_value.__aenter__ = AsyncMock(return_value=session)
+    factory.return_value.__aexit__ = AsyncMock(return_value=False)
+    return factory
+
+
+async def _collect(executor: ParallelToolExecutor) -> list[ToolCall]:
+    return [call async for call in executor.as_completed()]
+
+
+async def test_read_only_tools_run_concurrently_on_own_sessions():
+    """Read-only tools overlap and never touch the request session."""
+    request_db, pooled_db = MagicMock(name="request"), MagicMock(name="pooled")
+    running, peak = 0, 0
+    sessions = []
+
+    async def run_tool(name, tool_input, db):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        sessions.append(db)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return {"tool": name}
+
+    executor = ParallelToolExecutor(run_tool, request_db, session_factory=_session_factory(pooled_db))
+    executor.submit(ToolCall(id="1", name="check_inventory", input={"site_id": "s"}))
+    executor.submit(ToolCall(id="2", name="compare_vendors", input={"item_ids": []}))
+    executor.submit(ToolCall(id="3", name="detect_price_risk", input={"site_id": "s"}))
+
+    calls = await _collect(executor)
+    assert {c.id for c in calls} == {"1", "2", "3"}
+    assert peak == 3
+    assert all(s is pooled_db for s in sessions)
+
+
+async def test_write_tools_are_serialized_on_request_session():
+    """Write tools run one at a time, in order, on the request session."""
+    request_db = MagicMock(name="request")
+    order = []
+
+    async def run_tool(name, tool_input, db):
+        assert db is request_db
+        order.append(f"start:{tool_input['n']}")
+        await asyncio.sleep(0.01)
+        order.append(f"end:{tool_input['n']}")
+        return {}
+
+    executor = ParallelToolExecutor(run_tool, request_db, session_factory=_session_factory(None))
+    executor.submit(ToolCall(id="1", name="calculate_bom", input={"n": 1}))
+    executor.submit(ToolCall(id="2", name="register_claim", input={"n": 2}))
+
+    await _collect(executor)
+    assert order == ["start:1", "end:1", "start:2", "end:2"]
+
+
+async def test_tool_error_is_captured_and_input_left_intact():
+    """A failing tool yields an error result; handlers cannot mutate the block input."""
+    async def run_tool(name, tool_input, db):
+        tool_input.pop("date")
+        raise ValueError("boom")
+
+    executor = ParallelToolExecutor(run_tool, MagicMock(), session_factory=_session_factory(MagicMock()))
+    call = ToolCall(id="1", name="query_dashboard", input={"date": "2026-03-01"})
+    executor.submit(call)
+
+    [done] = await _collect(executor)
+    assert done.failed is True
+    assert done.result == {"error": "boom"}
+    assert call.input == {"date": "2026-03-01"}
+
+
+async def test_reads_after_a_write_use_the_request_session():
+    """Rows flushed by a write tool are only visible on the request session."""
+    request_db, pooled_db = MagicMock(name="request"), MagicMock(name="pooled")
+    order = []
+
+    async def run_tool(name, tool_input, db):
+        order.append((name, db))
+        await asyncio.sleep(0.01)
+        return {}
+
+    executor = ParallelToolExecutor(run_tool, request_db, session_factory=_session_factory(pooled_db))
+    executor.submit(ToolCall(id="1", name="generate_menu_plan", input={}))
+    await _collect(executor)
+    executor.submit(ToolCall(id="2", name="check_diversity", input={}))
+    await _collect(executor)
+
+    assert order == [("generate_menu_plan", request_db), ("check_diversity", request_db)]
+
+
+async def test_aclose_cancels_calls_never_collected():
+    cancelled = asyncio.Event()
+
+    async def run_tool(name, tool_input, db):
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    executor = ParallelToolExecutor(run_tool, MagicMock(), session_factory=_session_factory(MagicMock()))
+    executor.submit(ToolCall(id="1", name="check_inventory", input={}))
+    await asyncio.sleep(0)
+
+    await executor.aclose()
+    assert cancelled.is_set()
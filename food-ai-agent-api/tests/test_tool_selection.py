@@ -0,0 +1,40 @@
+"""Unit tests for per-turn tool subsetting."""
+from unittest.mock import patch
+
+from app.agents.intent_router import IntentResult
+from app.agents.tool_selection import EXPAND_TOOL_NAME, select_tools
+from app.config import settings
+
+
+def _intent(intent: str, agent: str, entities: dict | None = None) -> IntentResult:
+    return IntentResult(intent=intent, confidence=0.9, entities=entities or {}, agent=agent)
+
+
+def test_intent_subset_widened_by_entities():
+    assert select_tools(_intent("inventory_check", "purchase")).names == ("check_inventory", EXPAND_TOOL_NAME)
+
+    selection = select_tools(_intent("inventory_check", "purchase", {"menu_plan_id": "mp-1"}))
+    assert selection.names == ("calculate_bom", "check_inventory", "simulate_cost", EXPAND_TOOL_NAME)
+
+
+def test_unmapped_intent_or_disabled_offers_full_toolset():
+    assert not select_tools(_intent("general", "general")).is_subset
+    with patch.object(settings, "tool_subset_enabled", False):
+        assert not select_tools(_intent("inventory_check", "purchase")).is_subset
+
+
+def test_expand_switches_to_full_toolset_and_counts_savings():
+    selection = select_tools(_intent("dashboard", "general"))
+    first = [tool["name"] for tool in selection.tools()]
+    selection.expand("need forecast")
+    second = [tool["name"] for tool in selection.tools()]
+
+    assert first == ["query_dashboard", EXPAND_TOOL_NAME]
+    assert second == list(selection.agent_tools) and EXPAND_TOOL_NAME not in second
+    assert selection.to_dict()["subset_iterations"] == 1
+    assert selection.tokens_saved > 0
+
+
+def test_cacheable_tools_mark_only_the_last_definition():
+    tools = select_tools(_intent("purchase_risk", "purchase")).tools(cacheable=True)
+    assert [("cache_control" in tool) for tool in tools] == [False] * (len(tools) - 1) + [True]
@@ -0,0 +1,45 @@
+"""Unit tests for run timing spans and their aggregation."""
+import asyncio
+
+import pytest
+
+from app.tracing import aggregate_timings, span, start_trace
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_spans_recorded_across_spawned_tasks():
+    """Tasks created inside a run inherit its trace."""
+    trace = start_trace()
+
+    async def tool(name):
+        with span("tool", tool=name) as attrs:
+            await asyncio.sleep(0.01)
+            attrs["cached"] = False
+
+    with span("route"):
+        await asyncio.gather(asyncio.create_task(tool("a")), asyncio.create_task(tool("b")))
+
+    data = trace.to_dict()
+    names = [s["name"] for s in data["spans"]]
+    assert names.count("tool") == 2 and "route" in names
+    assert {s.get("tool") for s in data["spans"] if s["name"] == "tool"} == {"a", "b"}
+    assert all(s["duration_ms"] >= 0 for s in data["spans"])
+
+
+async def test_aggregate_timings_percentiles():
+    contexts = [
+        {"agent": "menu", "timing": {"total_ms": float(i), "spans": [
+            {"name": "claude", "duration_ms": float(i)},
+            {"name": "tool", "tool": "check_diversity", "duration_ms": 10.0},
+        ]}}
+        for i in range(1, 101)
+    ]
+    contexts.append({"agent": "menu"})  # runs logged before timing existed
+
+    result = aggregate_timings(contexts)
+
+    assert result["runs"] == 100
+    assert result["phases"]["claude"] == {"count": 100, "p50_ms": 50.0, "p95_ms": 95.0}
+    assert result["agents"]["menu"]["p95_ms"] == 95.0
+    assert result["tools"]["check_diversity"]["p50_ms"] == 10.0
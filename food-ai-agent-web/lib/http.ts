@@ -63,19 +63,22 @@ async function http<T>(path: string, options: FetchOptions = {}): Promise<T> {
 
 export { http, HttpError, API_BASE };
 
+/** Reattach attempts after the chat stream drops (e.g. Wi-Fi loss). */
+const CHAT_RESUME_ATTEMPTS = 3;
+
 /**
  * SSE streaming helper for AI chat.
+ *
+ * The agent run continues on the server when the connection drops; the
+ * stream reattaches to it with `Last-Event-ID` and resumes where it stopped.
  */
 export async function* streamChat(
   body: Record<string, unknown>
 ): AsyncGenerator<{ type: string; [key: string]: unknown }> {
-  const token = getAccessToken();
-  const response = await fetch(`${API_BASE}/chat`, {
+  const authHeaders = () => ({ Authorization: `Bearer ${getAccessToken()}` });
+  let response = await fetch(`${API_BASE}/chat`, {
     method: "POST",
-    headers: {
-      "Content-Type": "application/json",
-      Authorization: `Bearer ${token}`,
-    },
+    headers: { "Content-Type": "application/json", ...authHeaders() },
     body: JSON.stringify(body),
   });
 
@@ -83,25 +86,57 @@ export async function* streamChat(
     throw new Error("Failed to connect to chat stream");
   }
 
-  const reader = response.body.getReader();
-  const decoder = new TextDecoder();
-  let buffer = "";
-
-  while (true) {
-    const { done, value } = await reader.read();
-    if (done) break;
-
-    buffer += decoder.decode(value, { stream: true });
-    const lines = buffer.split("\n");
-    buffer = lines.pop() ?? "";
-
-    for (const line of lines) {
-      if (line.startsWith("data: ")) {
-        const data = line.slice(6).trim();
-        if (data) {
-          yield JSON.parse(data);
+  const runId = response.headers.get("X-Run-Id");
+  let lastEventId = "0";
+  let finished = false;
+
+  for (let attempt = 0; ; attempt++) {
+    const reader = response.body!.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    try {
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split("\n");
+        buffer = lines.pop() ?? "";
+
+        for (const line of lines) {
+          if (line.startsWith("id: ")) {
+            lastEventId = line.slice(4).trim();
+          } else if (line.startsWith("data: ")) {
+            const data = line.slice(6).trim();
+            if (data) {
+              const event = JSON.parse(data);
+              if (event.type === "done") finished = true;
+              yield event;
+            }
+          }
         }
       }
+    } catch (err) {
+      if (!runId || attempt >= CHAT_RESUME_ATTEMPTS) throw err;
+    }
+
+    if (finished || !runId || attempt >= CHAT_RESUME_ATTEMPTS) return;
+
+    // Reconnect (network may still be down: keep backing off)
+    while (true) {
+      await new Promise((resolve) => setTimeout(resolve, 1000 * 2 ** attempt));
+      try {
+        response = await fetch(`${API_BASE}/chat/runs/${runId}/events`, {
+          headers: { ...authHeaders(), "Last-Event-ID": lastEventId },
+        });
+        break;
+      } catch (err) {
+        if (++attempt >= CHAT_RESUME_ATTEMPTS) throw err;
+      }
+    }
+    if (!response.ok || !response.body) {
+      throw new Error("Failed to resume chat stream");
     }
   }
 }